@@ -81,6 +81,7 @@ setup(
     extras_require={
         #'dev': ['check-manifest'],
         'dev': ['coverage', 'sphinx'],
+        'batch': ['numpy'],
     },
 
     package_data={
@@ -0,0 +1,153 @@
+import asyncio
+from time import monotonic
+
+from sismic import model
+from sismic.interpreter import Interpreter
+
+__all__ = ['AsyncRunner']
+
+
+class AsyncRunner:
+    """
+    Run an interpreter in an *asyncio* event loop. The time of the interpreter is updated according to
+    the clock of the event loop, starting from its current value.
+
+    The interpreter is executed as soon as an event is queued using *queue* or *queue_nowait*, and when
+    the deadline returned by *Interpreter.next_deadline* is reached, so that time-based transitions can be
+    processed. If this deadline cannot be determined, the interpreter is executed every *delay* seconds.
+    Each execution is bounded by *delay* seconds, after which control is given back to the event loop.
+    The runner stops when the interpreter reaches a final configuration, or when *stop* is called.
+
+    This class requires Python 3.5 or higher, and is therefore not part of the *interpreter* module.
+
+    :param interpreter: an interpreter
+    :param delay: delay between two executions if the next deadline is unknown, and maximal duration of
+        an execution (in seconds)
+    :param callback: a function that accepts the (non-empty) list of macro steps computed by each execution
+    """
+
+    def __init__(self, interpreter: Interpreter, delay: float=0.05, callback=None):
+        self._interpreter = interpreter
+        self._delay = delay
+        self._callback = callback
+        self._wakeup = None  # asyncio.Event created by run, as it must belong to the running event loop
+        self._waiters = []  # Futures of the events that are not yet processed
+        self._stopping = False
+        self._running = False
+        self._task = None
+
+    @property
+    def interpreter(self):
+        """
+        Embedded interpreter
+        """
+        return self._interpreter
+
+    @property
+    def running(self) -> bool:
+        """
+        Boolean indicating whether this runner is running.
+        """
+        return self._running
+
+    def start(self):
+        """
+        Schedule the execution of *run* in the current event loop.
+
+        :return: an *asyncio.Task* instance
+        """
+        self._running = True
+        self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    async def run(self):
+        """
+        Execute the interpreter until it reaches a final configuration or until *stop* is called.
+        In this latter case, the active states are exited using *Interpreter.terminate*.
+        """
+        loop = asyncio.get_event_loop()
+        start = loop.time() - self._interpreter.time
+        self._wakeup = asyncio.Event()
+        self._running = True
+
+        try:
+            while not self._stopping:
+                self._wakeup.clear()
+                self._interpreter.time = loop.time() - start
+                started = monotonic()
+                steps = list(self._interpreter.iterexecute(timeout=self._delay))
+                if steps and self._callback:
+                    self._callback(steps)
+                if self._interpreter.final:
+                    break
+
+                if self._interpreter._events or monotonic() - started >= self._delay:
+                    # Budget exhausted or events queued by the callback, let other tasks run
+                    await asyncio.sleep(0)
+                else:
+                    self.__notify()
+                    deadline = self._interpreter.next_deadline()
+                    if deadline is None:
+                        timeout = self._delay
+                    elif deadline == float('inf'):
+                        timeout = None
+                    else:
+                        timeout = max(0, start + deadline - loop.time())
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+
+            if self._stopping:
+                step = self._interpreter.terminate()
+                if step and self._callback:
+                    self._callback([step])
+        finally:
+            self._running = False
+            self.__notify()
+
+    async def stop(self):
+        """
+        Stop the runner and exit the active states of the interpreter.
+        Return once the runner is stopped.
+        """
+        self._stopping = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if self._task is not None:
+            await self._task
+
+    def queue_nowait(self, event: model.Event):
+        """
+        Queue an event to the interpreter and wake up the runner. This method can be bound
+        to another interpreter (see *Interpreter.bind*).
+
+        :param event: an *Event* or *InternalEvent* instance
+        :return: *self* so it can be chained.
+        """
+        self._interpreter.queue(event)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return self
+
+    async def queue(self, event: model.Event):
+        """
+        Queue an event to the interpreter and wake up the runner.
+        If the runner is running, return once the queued events have been processed or once the runner is stopped.
+
+        :param event: an *Event* or *InternalEvent* instance
+        """
+        self.queue_nowait(event)
+        if self._running:
+            waiter = asyncio.Future()  # No loop.create_future before 3.5.2
+            self._waiters.append(waiter)
+            await waiter
+
+    def __notify(self):
+        """
+        Resolve the futures of the processed events.
+        """
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self._waiters = []
@@ -0,0 +1,146 @@
+import numpy
+
+from sismic import model
+from sismic.code import DummyEvaluator
+from sismic.exceptions import StatechartError, ExecutionError
+from sismic.interpreter import Interpreter
+
+__all__ = ['BatchInterpreter']
+
+
+class BatchInterpreter:
+    """
+    Execute many instances of a statechart that contains no guard and no action, using NumPy.
+
+    As the execution of such a statechart only depends on its events, it is compiled into a table that
+    associates to each reachable situation (an active configuration and the memory of its history states)
+    and each event the situation that results from sending this event to an *Interpreter* and executing it.
+    The situations of the instances are kept in a NumPy array, and a step of all the instances is a single
+    lookup in this table.
+
+    Events are identified by their position in *events*, and -1 stands for no event.
+    Contracts are not checked, and time has no influence on the execution.
+
+    :param statechart: statechart to interpret
+    :param size: number of instances
+    :param max_situations: upper bound on the number of reachable situations
+    :raise StatechartError: if the statechart contains code, except its preamble
+    :raise ExecutionError: if there are more than *max_situations* reachable situations
+    """
+
+    def __init__(self, statechart: model.Statechart, size: int=1, max_situations: int=65536):
+        for transition in statechart.transitions:
+            if transition.guard or transition.action:
+                raise StatechartError('{} has a guard or an action'.format(transition))
+        for name in statechart.states:
+            state = statechart.state_for(name)
+            if getattr(state, 'on_entry', None) or getattr(state, 'on_exit', None):
+                raise StatechartError('{} has an action'.format(state))
+
+        self._statechart = statechart
+        self._events = statechart.events_for()
+        self._configurations, table = self.__compile(max_situations)
+
+        # Last column (-1) corresponds to no event
+        self._table = numpy.array(table, dtype=numpy.int32)
+        self._situations = numpy.zeros(size, dtype=numpy.int32)
+
+    def __compile(self, max_situations: int) -> tuple:
+        """
+        Explore the situations that are reachable from the initial one.
+
+        :return: a list of configurations (bitmask of state ids) and a list of rows of the table
+        """
+        interpreter = Interpreter(self._statechart, evaluator_klass=DummyEvaluator, ignore_contract=True)
+        interpreter.execute()
+
+        situations = [(interpreter._configuration, frozenset(interpreter._memory.items()))]
+        ids = {situations[0]: 0}
+        table = []
+
+        for configuration, memory in situations:
+            row = []
+            for event in self._events:
+                interpreter._configuration = configuration
+                interpreter._memory = dict(memory)
+                interpreter.queue(model.Event(event)).execute()
+
+                situation = (interpreter._configuration, frozenset(interpreter._memory.items()))
+                if situation not in ids:
+                    if len(situations) == max_situations:
+                        raise ExecutionError('More than {} reachable situations'.format(max_situations))
+                    ids[situation] = len(situations)
+                    situations.append(situation)
+                row.append(ids[situation])
+            row.append(len(table))
+            table.append(row)
+
+        return [configuration for configuration, memory in situations], table
+
+    @property
+    def statechart(self):
+        """
+        Embedded statechart
+        """
+        return self._statechart
+
+    @property
+    def events(self) -> list:
+        """
+        List of event names. The id of an event is its position in this list.
+        """
+        return list(self._events)
+
+    @property
+    def situations(self) -> numpy.ndarray:
+        """
+        Array containing the situation of each instance. Instances that have the same situation have
+        the same active configuration and the same memory.
+        """
+        return self._situations
+
+    def __len__(self):
+        return len(self._situations)
+
+    def step(self, events) -> numpy.ndarray:
+        """
+        Send an event to each instance, and execute them as *Interpreter.execute* would.
+
+        :param events: an event id for every instance (array-like), or a single event id for all of them.
+            Use -1 for instances that do not receive an event.
+        :return: the array of situations
+        """
+        self._situations = self._table[self._situations, events]
+        return self._situations
+
+    def reset(self):
+        """
+        Put every instance in the initial situation.
+        """
+        self._situations[:] = 0
+
+    def configuration(self, index: int) -> list:
+        """
+        Return the active configuration of an instance, like *Interpreter.configuration*.
+
+        :param index: index of an instance
+        :return: list of active states names
+        """
+        hierarchy = self._statechart._hierarchy
+        names = hierarchy.names_for(self._configurations[self._situations[index]])
+        return sorted(names, key=lambda s: (hierarchy.depth[s], s))
+
+    def active(self, name: str) -> numpy.ndarray:
+        """
+        Return a boolean array indicating, for each instance, whether given state is active.
+
+        :param name: name of a state
+        :return: an array of booleans
+        """
+        bit = self._statechart._hierarchy.bit[name]
+        active = numpy.fromiter((configuration & bit != 0 for configuration in self._configurations),
+                                dtype=bool, count=len(self._configurations))
+        return active[self._situations]
+
+    def __repr__(self):
+        return '{}({}, {} instances)'.format(self.__class__.__name__, self._statechart, len(self))
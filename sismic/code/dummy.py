@@ -17,3 +17,6 @@ class DummyEvaluator(Evaluator):
 
     def _execute_code(self, code: str, additional_context: dict = None):
         return
+
+    def deadline_for(self, transition) -> float:
+        return float('inf')
@@ -1,4 +1,5 @@
 import abc
+import copy
 from sismic.model import Event, Transition, StateMixin, Statechart
 
 __all__ = ['Evaluator']
@@ -19,6 +20,10 @@ class Evaluator(metaclass=abc.ABCMeta):
         is expected to be an *Interpreter* instance
     :param initial_context: an optional dictionary to populate the context
     """
+
+    # Attributes that depend on the execution rather than on the statechart (see *InterpreterPool*)
+    _session_attributes = ('_context',)
+
     def __init__(self, interpreter=None, initial_context: dict = None):
         self._context = initial_context if initial_context else {}
         self._interpreter = interpreter
@@ -31,6 +36,37 @@ class Evaluator(metaclass=abc.ABCMeta):
         """
         return self._context
 
+    def _get_state(self):
+        """
+        Return the state of this evaluator, as an object that can be pickled (except for the values of the
+        context, see *Interpreter.snapshot*). By default, this is the context.
+
+        :return: the state of this evaluator
+        """
+        return self._context
+
+    def _set_state(self, state):
+        """
+        Restore a state returned by *_get_state*. The context is updated in place.
+
+        :param state: a state returned by *_get_state*
+        """
+        self._context.clear()
+        self._context.update(state)
+
+    def _fork(self, interpreter):
+        """
+        Return a copy of this evaluator for given interpreter (see *Interpreter.fork*).
+        By default, this is a shallow copy of the evaluator with a deep copy of its context.
+
+        :param interpreter: the interpreter that will use the copy
+        :return: an *Evaluator* instance
+        """
+        forked = copy.copy(self)
+        forked._interpreter = interpreter
+        forked._context = copy.deepcopy(self._context)
+        return forked
+
     @abc.abstractmethod
     def _evaluate_code(self, code: str, additional_context: dict = None) -> bool:
         """
@@ -75,6 +111,17 @@ class Evaluator(metaclass=abc.ABCMeta):
         if transition.guard:
             return self._evaluate_code(transition.guard, {'event': event})
 
+    def deadline_for(self, transition: Transition) -> float:
+        """
+        Return the next time (according to the clock of the interpreter) at which the value of the guard
+        of given transition can change only because time has elapsed (see *Interpreter.next_deadline*).
+        By default, *float('inf')* is returned if the transition has no guard, and *None* otherwise.
+
+        :param transition: the considered transition
+        :return: a time, *float('inf')* if the guard does not depend on time, or *None* if this time is unknown
+        """
+        return None if transition.guard else float('inf')
+
     def execute_action(self, transition: Transition, event: Event) -> bool:
         """
         Execute the action for given transition.
@@ -1,29 +1,130 @@
+from collections import OrderedDict
+from collections.abc import MutableMapping
 from functools import partial
 
+import ast
+import builtins
 import copy
+import sys
+import weakref
 from sismic.code import Evaluator
-from sismic.model import Event, InternalEvent, Transition, StateMixin
+from sismic.model import Event, InternalEvent, Transition, StateMixin, Statechart
 from sismic.exceptions import CodeEvaluationError
 
 __all__ = ['PythonEvaluator']
 
+# Functions whose calls do not prevent the static analysis of the variables that are used by a piece of code
+_TRANSPARENT_CALLS = ((frozenset(dir(builtins)) - {'eval', 'exec', 'globals', 'locals', 'vars', 'setattr',
+                                                   'delattr', '__import__'}) |
+                      {'active', 'send', 'after', 'idle'})
+
+# Names whose value can change without being written by the code of the statechart
+_VOLATILE_NAMES = frozenset(['time', 'active', 'event'])
+
+# Nodes of numeric literals (*ast.Num* before Python 3.8, *ast.Constant* does not exist before Python 3.6)
+_NUMBER_NODES = (ast.Constant,) if sys.version_info >= (3, 8) else (ast.Num,)
+
 
 class FrozenContext:
     """
     A shallow copy of a context. The keys of the underlying context are
     exposed as attributes.
+
+    :param context: the context to copy
+    :param names: if specified, only the variables whose name is in *names* are copied
     """
 
-    def __init__(self, context: dict):
-        self.__frozencontext = {k: copy.copy(v) for k, v in context.items()}
+    def __init__(self, context: dict, names=None):
+        if names is None:
+            self.__frozencontext = {k: copy.copy(v) for k, v in context.items()}
+        else:
+            self.__frozencontext = {k: copy.copy(context[k]) for k in names if k in context}
 
     def __getattr__(self, item):
+        # The underlying context is not set yet when a frozen context is being unpickled
+        if item == '_FrozenContext__frozencontext':
+            raise AttributeError(item)
         try:
             return self.__frozencontext[item]
         except KeyError:
             raise AttributeError('{} has no attribute {}'.format(self, item))
 
 
+class ForkedContext(MutableMapping):
+    """
+    A copy-on-access copy of a context. The values of the underlying context are deep-copied
+    only when they are accessed for the first time.
+
+    The underlying context must not be modified as long as *detach* has not been called.
+
+    :param context: the context to copy
+    """
+
+    def __init__(self, context):
+        self._base = dict(context)  # Variables of the underlying context that were not copied yet
+        self._own = {}  # Variables that were copied or written
+        self._deleted = set()  # Variables of the underlying context that were deleted
+        self._memo = {}  # Memo for copy.deepcopy, keeps the references between copied values
+
+    def detach(self):
+        """
+        Copy the values that were not copied yet, so that the underlying context can be modified.
+        """
+        if self._base is not None:
+            for key in list(self._base):
+                if key not in self._own and key not in self._deleted:
+                    self._own[key] = copy.deepcopy(self._base[key], self._memo)
+            self._base, self._deleted, self._memo = None, set(), {}
+
+    def __getitem__(self, key):
+        try:
+            return self._own[key]
+        except KeyError:
+            if self._base is None or key in self._deleted:
+                raise
+        value = self._own[key] = copy.deepcopy(self._base[key], self._memo)
+        return value
+
+    def __setitem__(self, key, value):
+        self._own[key] = value
+        self._deleted.discard(key)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._own.pop(key, None)
+        if self._base is not None and key in self._base:
+            self._deleted.add(key)
+
+    def __contains__(self, key):
+        return key in self._own or (self._base is not None and key in self._base and key not in self._deleted)
+
+    def __iter__(self):
+        yield from self._own
+        if self._base is not None:
+            for key in self._base:
+                if key not in self._own and key not in self._deleted:
+                    yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def peek_items(self) -> list:
+        """
+        Return the (name, value) pairs of this context, without copying the values that were not copied yet.
+        Such values are shared with the underlying context, and must not be modified.
+
+        :return: a list of (name, value) pairs
+        """
+        return [(key, self._own[key] if key in self._own else self._base[key]) for key in self]
+
+    def __reduce__(self):
+        return dict, (dict(self.items()),)
+
+    def __repr__(self):
+        return '{}({})'.format(self.__class__.__name__, dict(self.items()))
+
+
 class PythonEvaluator(Evaluator):
     """
     Evaluator that interprets Python code.
@@ -50,6 +151,20 @@ class PythonEvaluator(Evaluator):
         - A variable *__old__* that has an attribute *x* for every *x* in the context when either the state
           was entered (if the condition involves a state) or the transition was processed (if the condition
           involves a transition). The value of *__old__.x* is a shallow copy of *x* at that time.
+          To limit the cost of these copies, only the variables that are accessed through *__old__* by the
+          postconditions and invariants of the state or the transition are copied.
+
+    If *incremental_invariants* is set, an invariant is evaluated again only if one of the variables it uses
+    has been written since it was last satisfied, or if its state or transition has been entered or processed
+    since then. The written variables are the ones that are used by the code executed by this evaluator.
+    This relies on the assumption that the context is only modified by this code, and that a variable is
+    only modified by code that uses its name. In particular, writing in the context from outside the statechart,
+    or modifying a variable through another one that refers to the same object, is not detected.
+    Invariants that use *time*, *active* or *event*, or that call a function that is not a builtin, are
+    always evaluated. Leave *incremental_invariants* unset to check all the invariants, eg. while debugging.
+
+    The deadlines of guards that call *after* and *idle* with constant arguments are determined statically
+    (see *Interpreter.next_deadline*). Other functions called by a guard are assumed not to depend on time.
 
     Unless you override its entry in the context, the *__builtins__* of Python are automatically exposed.
     This implies you can use nearly everything from Python in your code.
@@ -57,24 +172,302 @@ class PythonEvaluator(Evaluator):
     If an exception occurred while executing or evaluating a piece of code, it is propagated by the
     evaluator.
 
+    Each piece of code is compiled only once. The code contained in the statechart is compiled when
+    *execute_statechart* is called, so syntax errors are reported before the execution starts. Other
+    pieces of code (eg. code added to the statechart afterwards, or code provided by a testing tool)
+    are compiled on first use and kept in a cache whose size is bounded by *code_cache_size* (0 disables it).
+
     :param interpreter: the interpreter that will use this evaluator,
         is expected to be an *Interpreter* instance
     :param initial_context: a dictionary that will be used as *__locals__*
+    :param incremental_invariants: set to True to skip invariants whose variables were not modified
     """
 
-    def __init__(self, interpreter=None, initial_context: dict = None):
+    code_cache_size = 256  # Maximal number of compiled pieces of code that are not part of the statechart
+    # Attributes that depend on the execution, see Evaluator._session_attributes
+    _session_attributes = ('_context', '_memory', '_idle_time', '_entry_time', '_clock', '_written', '_all_written',
+                           '_checked')
+
+    def __init__(self, interpreter=None, initial_context: dict = None, incremental_invariants: bool = False):
         super().__init__(interpreter, initial_context)
+        self.incremental_invariants = incremental_invariants
+        self._compiled = {}  # (code, mode) -> code object, for the code contained in the statechart
+        self._compiled_lru = OrderedDict()  # (code, mode) -> code object, for any other code
         self._memory = {}  # Associate to each state or transition the context on state entry and transition action
+        self._old_references = {}  # code -> names accessed through __old__ (None if they cannot be determined)
+        self._timers = {}  # guard -> (function, seconds) pairs for after and idle (None if they cannot be determined)
         self._idle_time = {}  # Associate a timer to each state name (idle timer)
         self._entry_time = {}  # Associate a timer to each state name (entry timer)
 
+        # Incremental checking of invariants
+        self._names = {}  # (code, mode) -> names used by code (None if they cannot be determined)
+        self._clock = 0  # Incremented each time some code is executed
+        self._written = {}  # variable name -> value of the clock when it was last written
+        self._all_written = 0  # value of the clock when any variable could have been written
+        self._checked = {}  # id(obj) -> invariant -> value of the clock when it was last satisfied
+
+        self._forks = {}  # id -> weak reference to a ForkedContext instance whose underlying context is ours
+
+    def _fork(self, interpreter):
+        # Compiled code and static analyses are shared
+        forked = copy.copy(self)
+        forked._interpreter = interpreter
+        forked._forks = {}
+
+        # The underlying context must not be modified by a copy-on-access context
+        if isinstance(self._context, ForkedContext):
+            self._context.detach()
+        forked._context = ForkedContext(self._context)
+        # References are removed as soon as the forked contexts are collected
+        forks, key = self._forks, id(forked._context)
+        forks[key] = weakref.ref(forked._context, lambda reference: forks.pop(key, None))
+
+        forked._memory = dict(self._memory)
+        forked._idle_time = dict(self._idle_time)
+        forked._entry_time = dict(self._entry_time)
+        forked._written = dict(self._written)
+        forked._checked = {key: dict(value) for key, value in self._checked.items()}
+        return forked
+
+    def __detach_forks(self):
+        """
+        Detach the contexts that were forked from this one, before the context is modified.
+        """
+        for reference in list(self._forks.values()):
+            forked_context = reference()
+            if forked_context is not None:
+                forked_context.detach()
+        self._forks = {}
+
+    def _get_state(self):
+        # Memories are associated to states and transitions by their id, which is specific to this process
+        statechart = self._interpreter.statechart
+        keys = {id(state): name for name, state in statechart._states.items()}
+        keys.update((id(transition), transition._id) for transition in statechart.transitions)
+
+        return (
+            self._context, self._entry_time, self._idle_time,
+            {keys[key]: memory for key, memory in self._memory.items()},
+            self._clock, self._written, self._all_written,
+            {keys[key]: checked for key, checked in self._checked.items()},
+        )
+
+    def _set_state(self, state):
+        context, entry_time, idle_time, memory, self._clock, written, self._all_written, checked = state
+        self.__detach_forks()
+        super()._set_state(context)
+        self._entry_time, self._idle_time, self._written = dict(entry_time), dict(idle_time), dict(written)
+
+        statechart = self._interpreter.statechart
+        keys = {transition._id: id(transition) for transition in statechart.transitions}
+        keys.update((name, id(state)) for name, state in statechart._states.items())
+        self._memory = {keys[key]: value for key, value in memory.items()}
+        self._checked = {keys[key]: dict(value) for key, value in checked.items()}
+
+    def _compile_code(self, code: str, mode: str):
+        """
+        Return a code object for given code, compiling it only if it was not previously compiled.
+
+        :param code: code to compile
+        :param mode: either "eval" or "exec"
+        :return: a code object
+        :raise SyntaxError: if code cannot be compiled
+        """
+        key = (code, mode)
+        compiled = self._compiled.get(key, None)
+        if compiled is not None:
+            return compiled
+
+        compiled = self._compiled_lru.pop(key, None)
+        if compiled is None:
+            compiled = compile(code, '<string>', mode)
+            if self.code_cache_size <= 0:
+                return compiled
+            if len(self._compiled_lru) >= self.code_cache_size:
+                self._compiled_lru.popitem(last=False)
+        self._compiled_lru[key] = compiled
+        return compiled
+
+    def __compile_element(self, obj, code: str, mode: str):
+        """
+        Compile given code of given statechart element, and keep the resulting code object.
+
+        :param obj: *StateMixin* or *Transition*, or a description of the code
+        :param code: code to compile, if any
+        :param mode: either "eval" or "exec"
+        :raise CodeEvaluationError: if code cannot be compiled
+        """
+        if not code or (code, mode) in self._compiled:
+            return
+        try:
+            self._compiled[(code, mode)] = compile(code, '<string>', mode)
+        except SyntaxError as e:
+            raise CodeEvaluationError('Invalid code in {}:\n{}'.format(obj, code)) from e
+
+    def _old_references_for(self, code: str):
+        """
+        Return the names of the variables that are accessed through *__old__* in given condition.
+        Return None if these names cannot be statically determined, eg. if *__old__* is used
+        otherwise than with an attribute access.
+
+        :param code: a condition
+        :return: a (possibly empty) set of names, or None
+        """
+        try:
+            return self._old_references[code]
+        except KeyError:
+            pass
+
+        try:
+            tree = ast.parse(code, mode='eval')
+        except SyntaxError:
+            names = None  # The error will be raised when the code is evaluated
+        else:
+            names = set()
+            nb_references, nb_accesses = 0, 0
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Name) and node.id == '__old__':
+                    nb_references += 1
+                elif (isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and
+                        node.value.id == '__old__'):
+                    nb_accesses += 1
+                    names.add(node.attr)
+            # Any reference to __old__ that is not an attribute access requires the whole context
+            names = frozenset(names) if nb_references == nb_accesses else None
+
+        self._old_references[code] = names
+        return names
+
+    def _names_for(self, code: str, mode: str):
+        """
+        Return the names of the variables that are used by given code. Return None if these names
+        cannot be statically determined, eg. if the code calls a function that is not a builtin.
+
+        :param code: a piece of code
+        :param mode: either "eval" or "exec"
+        :return: a set of names, or None
+        """
+        key = (code, mode)
+        try:
+            return self._names[key]
+        except KeyError:
+            pass
+
+        try:
+            tree = ast.parse(code, mode=mode)
+        except SyntaxError:
+            names = None  # The error will be raised when the code is evaluated
+        else:
+            names = set()
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Name):
+                    names.add(node.id)
+                elif isinstance(node, (ast.Global, ast.Nonlocal)):
+                    names.update(node.names)
+                elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and
+                        node.func.id not in _TRANSPARENT_CALLS):
+                    names = None
+                    break
+            names = frozenset(names) if names is not None else None
+
+        self._names[key] = names
+        return names
+
+    def _timers_for(self, guard: str):
+        """
+        Return the calls to *after* and *idle* in given guard. Return None if the time at which the value of
+        the guard can change cannot be statically determined, eg. if the guard uses *time*, or if *after* or
+        *idle* is not called with a constant number of seconds.
+
+        :param guard: a guard
+        :return: a (possibly empty) set of (function name, seconds) pairs, or None
+        """
+        try:
+            return self._timers[guard]
+        except KeyError:
+            pass
+
+        try:
+            tree = ast.parse(guard, mode='eval')
+        except SyntaxError:
+            timers = None  # The error will be raised when the code is evaluated
+        else:
+            timers = set()
+            nb_references, nb_calls = 0, 0
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Name) and node.id in ('after', 'idle', 'time'):
+                    nb_references += 1
+                elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and
+                        node.func.id in ('after', 'idle') and len(node.args) == 1 and not node.keywords and
+                        isinstance(node.args[0], _NUMBER_NODES) and
+                        type(ast.literal_eval(node.args[0])) in (int, float)):
+                    nb_calls += 1
+                    timers.add((node.func.id, ast.literal_eval(node.args[0])))
+            # Any other use of after, idle or time prevents the analysis
+            timers = frozenset(timers) if nb_references == nb_calls else None
+
+        self._timers[guard] = timers
+        return timers
+
+    def __set_written(self, code: str):
+        """
+        Register that the variables used by given code are about to be written.
+
+        :param code: code to execute
+        """
+        self._clock += 1
+        names = self._names_for(code, 'exec')
+        if names is None:
+            self._all_written = self._clock
+        else:
+            for name in names:
+                self._written[name] = self._clock
+
+    def __check_invariant(self, checked: dict, condition: str, context: dict) -> bool:
+        """
+        Return True if given invariant is satisfied. The invariant is not evaluated if none of the
+        variables it uses was written since it was last satisfied.
+
+        :param checked: mapping between invariants and the value of the clock when they were last satisfied
+        :param condition: invariant to check
+        :param context: additional context
+        :return: truth value of *condition*
+        """
+        last_checked = checked.get(condition, None)
+        if last_checked is not None and self._all_written <= last_checked:
+            names = self._names_for(condition, 'eval')
+            if (names is not None and _VOLATILE_NAMES.isdisjoint(names) and
+                    all(self._written.get(name, 0) <= last_checked for name in names)):
+                return True
+
+        if self._evaluate_code(condition, context):
+            checked[condition] = self._clock
+            return True
+        return False
+
     def __set_memory(self, obj):
         """
         Freeze current context and associate it to given *obj*.
+        Only the variables that are accessed through *__old__* by the postconditions and the invariants
+        of *obj* are copied. Nothing is done if there is no such variable.
 
         :param obj: *StateMixin* or *Transition*
         """
-        self._memory[id(obj)] = FrozenContext(self._context)
+        # Invariants can refer to this memory and must be checked again
+        self._checked.pop(id(obj), None)
+
+        names = set()
+        for condition in getattr(obj, 'postconditions', []) + getattr(obj, 'invariants', []):
+            references = self._old_references_for(condition)
+            if references is None:
+                self._memory[id(obj)] = FrozenContext(self._context)
+                return
+            names.update(references)
+
+        if names:
+            self._memory[id(obj)] = FrozenContext(self._context, names)
+        else:
+            self._memory.pop(id(obj), None)
 
     def __get_memory(self, obj):
         """
@@ -140,8 +533,11 @@ class PythonEvaluator(Evaluator):
         }
         exposed_context.update(additional_context if additional_context else {})
 
+        if self._forks:
+            self.__detach_forks()
+
         try:
-            return eval(code, exposed_context, self._context)
+            return eval(self._compile_code(code, 'eval'), exposed_context, self._context)
         except Exception as e:
             raise CodeEvaluationError('The above exception occurred while evaluating:\n{}'.format(code)) from e
 
@@ -162,11 +558,31 @@ class PythonEvaluator(Evaluator):
         }
         exposed_context.update(additional_context if additional_context else {})
 
+        if self._forks:
+            self.__detach_forks()
+
+        self.__set_written(code)
         try:
-            exec(code, exposed_context, self._context)
+            exec(self._compile_code(code, 'exec'), exposed_context, self._context)
         except Exception as e:
             raise CodeEvaluationError('The above exception occurred while executing:\n{}'.format(code)) from e
 
+    def execute_statechart(self, statechart: Statechart):
+        # Compile the code of the statechart before anything is executed
+        self.__compile_element('preamble', statechart.preamble, 'exec')
+
+        elements = [statechart.state_for(name) for name in statechart.states] + statechart.transitions
+        for element in elements:
+            self.__compile_element(element, getattr(element, 'on_entry', None), 'exec')
+            self.__compile_element(element, getattr(element, 'on_exit', None), 'exec')
+            self.__compile_element(element, getattr(element, 'guard', None), 'eval')
+            self.__compile_element(element, getattr(element, 'action', None), 'exec')
+            for condition in (getattr(element, 'preconditions', []) + getattr(element, 'postconditions', []) +
+                              getattr(element, 'invariants', [])):
+                self.__compile_element(element, condition, 'eval')
+
+        return super().execute_statechart(statechart)
+
     def evaluate_guard(self, transition: Transition, event: Event) -> bool:
         if transition.guard:
             context = {
@@ -176,6 +592,19 @@ class PythonEvaluator(Evaluator):
             }
             return self._evaluate_code(transition.guard, context)
 
+    def deadline_for(self, transition: Transition) -> float:
+        if not transition.guard:
+            return float('inf')
+        timers = self._timers_for(transition.guard)
+        if timers is None:
+            return None
+
+        deadlines = []
+        for name, seconds in timers:
+            timer = self._entry_time if name == 'after' else self._idle_time
+            deadlines.append(timer[transition.source] + seconds)
+        return min((deadline for deadline in deadlines if deadline > self._interpreter.time), default=float('inf'))
+
     def execute_onentry(self, state: StateMixin):
         # Set memory
         self.__set_memory(state)
@@ -205,4 +634,7 @@ class PythonEvaluator(Evaluator):
         context = {'event': event} if isinstance(obj, Transition) else {}
         context['__old__'] = self.__get_memory(obj)
 
+        if self.incremental_invariants:
+            checked = self._checked.setdefault(id(obj), {})
+            return filter(lambda c: not self.__check_invariant(checked, c, context), getattr(obj, 'invariants', []))
         return filter(lambda c: not self._evaluate_code(c, context), getattr(obj, 'invariants', []))
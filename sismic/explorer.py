@@ -0,0 +1,319 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+import hashlib
+import os
+
+from sismic import model
+from sismic.code.python import ForkedContext
+from sismic.exceptions import ContractError, ExecutionError
+from sismic.interpreter import Interpreter, _SnapshotPickler
+from sismic.stories import Story
+from sismic.workers import worker_setup, run_task, worker_interpreter, failure_signature
+
+__all__ = ['ExplorationFailure', 'Deadlock', 'ExplorationReport', 'explore']
+
+
+class ExplorationFailure:
+    """
+    A failure found by *explore*: events whose processing raised an exception with a same signature
+    (see *FuzzFailure*).
+
+    :param signature: the signature of the exception, a tuple that starts with the name of its class
+    :param story: a shortest story that raises this exception
+    :param message: the message of the exception raised by this story
+    :param count: the number of (situation, event) pairs that raised an exception with this signature
+    """
+
+    __slots__ = ('signature', 'story', 'message', 'count')
+
+    def __init__(self, signature: tuple, story: Story, message: str, count: int=1):
+        self.signature = signature
+        self.story = story
+        self.message = message
+        self.count = count
+
+    def __repr__(self):
+        return 'ExplorationFailure({}, count={})'.format(self.signature, self.count)
+
+
+class Deadlock:
+    """
+    A reachable situation that is not final, and in which no event of the alphabet leads to a transition.
+
+    :param story: a shortest story that leads to this situation
+    :param configuration: the active configuration, see *Interpreter.configuration*
+    """
+
+    __slots__ = ('story', 'configuration')
+
+    def __init__(self, story: Story, configuration: list):
+        self.story = story
+        self.configuration = configuration
+
+    def __repr__(self):
+        return 'Deadlock({})'.format(', '.join(self.configuration))
+
+
+class ExplorationReport:
+    """
+    Result of *explore*.
+
+    :param situations: number of distinct situations that were reached
+    :param configurations: list of the reachable active configurations, see *Interpreter.configuration*
+    :param entered_states: list of the names of the states that were entered, in lexicographic order
+    :param unreachable_states: list of the names of the states that were never entered, in lexicographic order
+    :param deadlocks: list of *Deadlock* instances
+    :param failures: list of *ExplorationFailure* instances, in the order they were found
+    :param complete: False if the exploration was stopped by *max_situations*
+    """
+
+    __slots__ = ('situations', 'configurations', 'entered_states', 'unreachable_states', 'deadlocks', 'failures',
+                 'complete')
+
+    def __init__(self, situations: int, configurations: list, entered_states: list, unreachable_states: list,
+                 deadlocks: list, failures: list, complete: bool):
+        self.situations = situations
+        self.configurations = configurations
+        self.entered_states = entered_states
+        self.unreachable_states = unreachable_states
+        self.deadlocks = deadlocks
+        self.failures = failures
+        self.complete = complete
+
+    def __repr__(self):
+        return 'ExplorationReport({} situations, {} deadlocks, {} failures{})'.format(
+            self.situations, len(self.deadlocks), len(self.failures), '' if self.complete else ', incomplete')
+
+
+def _canonical(value):
+    """
+    Return a value that is pickled the same way for equal dictionaries and sets, whatever the order in which
+    their items were inserted. Lists and tuples are traversed, other values are returned unchanged.
+    """
+    if isinstance(value, dict):
+        return dict, _sorted((_canonical(key), _canonical(item)) for key, item in value.items())
+    elif isinstance(value, (set, frozenset)):
+        return set, _sorted(_canonical(item) for item in value)
+    elif type(value) in (list, tuple):
+        return type(value)(_canonical(item) for item in value)
+    return value
+
+
+def _sorted(values) -> tuple:
+    """
+    Sort given values, or their pickled representation if they cannot be compared.
+    """
+    values = list(values)
+    try:
+        return tuple(sorted(values))
+    except TypeError:
+        return tuple(sorted(values, key=_pickled))
+
+
+def _pickled(value) -> bytes:
+    """
+    Pickle given value without memo, so that equal values are pickled the same way whether they share objects
+    or not.
+    """
+    output = BytesIO()
+    pickler = _SnapshotPickler(output)
+    pickler.fast = True
+    pickler.dump(value)
+    return output.getvalue()
+
+
+def _situation_key(interpreter: Interpreter, abstraction, digest_size: int) -> bytes:
+    """
+    Return a digest of the configuration, the memory of history states and the (abstracted) context of
+    given interpreter.
+    """
+    context = interpreter.context
+    if abstraction:
+        value = abstraction(context)
+    elif isinstance(context, ForkedContext):
+        value = dict(context.peek_items())  # The values are only read, there is no need to copy them
+    else:
+        value = context
+    value = _canonical((interpreter._configuration, interpreter._memory, value))
+    if hasattr(hashlib, 'blake2b'):
+        return hashlib.blake2b(_pickled(value), digest_size=digest_size).digest()
+    return hashlib.sha512(_pickled(value)).digest()[:digest_size]  # blake2b requires Python 3.6
+
+
+def _expand(interpreter: Interpreter, situations: list, events: list, abstraction, digest_size: int, errors: tuple,
+            visited=()) -> list:
+    """
+    Send each event to each situation, and return the outcomes.
+
+    :param interpreter: an interpreter whose state is replaced by the situations
+    :param situations: list of (key, snapshot) pairs
+    :param events: list of *Event* instances
+    :param abstraction: see *explore*
+    :param digest_size: size of the keys, in bytes
+    :param errors: exceptions to catch
+    :param visited: keys for which no snapshot is needed
+    :return: for each situation, a (configuration, final, outcomes) tuple where *outcomes* contains, for each
+        event, either (True, key, snapshot, configuration, entered states, processed) or
+        (False, signature, message, entered states).
+    """
+    results = []
+    for key, snapshot in situations:
+        interpreter.restore(snapshot)
+        if interpreter.final:
+            results.append((interpreter._configuration, True, []))
+            continue
+
+        outcomes = []
+        for event in events:
+            forked = interpreter.fork()
+            entered, processed = set(), False
+            try:
+                for macro_step in forked.queue(event).iterexecute():
+                    for step in macro_step.steps:
+                        entered.update(step.entered_states)
+                        processed = processed or bool(step.transition)
+            except errors as e:
+                outcomes.append((False, failure_signature(e), str(e), entered))
+                continue
+
+            new_key = _situation_key(forked, abstraction, digest_size)
+            new_snapshot = None if new_key in visited else forked.snapshot()
+            outcomes.append((True, new_key, new_snapshot, forked._configuration, entered, processed))
+        results.append((interpreter._configuration, False, outcomes))
+    return results
+
+
+def _expand_chunk(situations: list, events: list, abstraction, digest_size: int, errors: tuple) -> list:
+    return _expand(worker_interpreter(), situations, events, abstraction, digest_size, errors)
+
+
+def explore(statechart: model.Statechart, events: list=None, abstraction=None, evaluator_klass=None,
+            initial_context: dict=None, ignore_contract: bool=False, errors=(ContractError, ExecutionError),
+            max_situations: int=1000000, digest_size: int=16, max_workers: int=1,
+            chunksize: int=64) -> ExplorationReport:
+    """
+    Explore, in a breadth-first order, every situation that is reachable by sending events of given alphabet
+    to an interpreter of given statechart, and report the unreachable states, the deadlocks and the failures
+    (eg. contract violations).
+
+    A situation is identified by the active configuration, the memory of history states and the context
+    of the interpreter, or the value returned by *abstraction* for this context. The context (or its
+    abstraction) must therefore take finitely many values. Equal dictionaries and sets identify a same situation,
+    whatever the order of their items, but other values must not be self-referential and are compared by their
+    pickled representation. Only a digest of *digest_size* bytes is kept
+    for each visited situation, so two distinct situations can be (very unlikely) considered as the same one.
+    A successor of a situation is obtained by restoring a snapshot of this situation, queuing an event and
+    calling *execute*. Time does not elapse during the exploration.
+
+    Each failure comes with a shortest story that raises it, and each deadlock with a shortest story that leads
+    to it. Situations in which a failure occurs are not explored further.
+
+    :param statechart: statechart to explore
+    :param events: list of *Event* instances or event names, by default *statechart.events_for()*
+    :param abstraction: an optional callable that takes a context and returns a picklable value. By default,
+        the whole context is used, and its values must be picklable.
+    :param evaluator_klass: an optional callable that returns an *Evaluator* instance, see *Interpreter*
+    :param initial_context: an optional initial context for the interpreters
+    :param ignore_contract: set to True to ignore contract checking
+    :param errors: exceptions that are reported as failures, others are propagated
+    :param max_situations: upper bound on the number of explored situations
+    :param digest_size: size of the digest of a situation, in bytes (at most 64)
+    :param max_workers: number of processes that expand the situations, or None for the number of processors.
+        If it is greater than 1, *abstraction* must be picklable.
+    :param chunksize: number of situations that are expanded at once by a process
+    :return: an *ExplorationReport* instance
+    """
+    events = statechart.events_for() if events is None else events
+    events = [model.Event(event) if isinstance(event, str) else event for event in events]
+    interpreter_kwargs = {'evaluator_klass': evaluator_klass, 'initial_context': initial_context,
+                          'ignore_contract': ignore_contract}
+    max_workers = max_workers if max_workers else (os.cpu_count() or 1)
+
+    interpreter = Interpreter(statechart, **interpreter_kwargs)
+    entered, configurations, deadlocks, failures = set(), set(), [], {}
+    try:
+        for macro_step in interpreter.iterexecute():
+            for step in macro_step.steps:
+                entered.update(step.entered_states)
+    except errors as e:
+        signature = failure_signature(e)
+        failures[signature] = ExplorationFailure(signature, Story(), str(e))
+        return _report(statechart, 0, configurations, entered, deadlocks, failures, True)
+
+    root = _situation_key(interpreter, abstraction, digest_size)
+    visited = {root: None}  # key -> (key of the parent, index of the event), or None for the initial situation
+    configurations.add(interpreter._configuration)
+    frontier = deque([(root, interpreter.snapshot())])
+
+    def story_for(key, event_index=None):
+        story = [] if event_index is None else [events[event_index]]
+        while visited[key] is not None:
+            key, event_index = visited[key]
+            story.append(events[event_index])
+        return Story(reversed(story))
+
+    def chunks():
+        # Expand the situations in chunks, in breadth-first order
+        if max_workers == 1:
+            while frontier:
+                chunk = [frontier.popleft() for _ in range(min(chunksize, len(frontier)))]
+                yield chunk, _expand(interpreter, chunk, events, abstraction, digest_size, errors, visited)
+        else:
+            setup = worker_setup(statechart, interpreter_kwargs)
+            with ProcessPoolExecutor(max_workers) as executor:
+                pending = deque()  # (chunk, future), in breadth-first order
+                while frontier or pending:
+                    while frontier and len(pending) < 2 * max_workers:
+                        chunk = [frontier.popleft() for _ in range(min(chunksize, len(frontier)))]
+                        pending.append((chunk, executor.submit(
+                            run_task, setup, _expand_chunk, (chunk, events, abstraction, digest_size, errors))))
+                    chunk, future = pending.popleft()
+                    yield chunk, future.result()
+
+    complete = True
+    for chunk, results in chunks():
+        for (key, _), (configuration, final, outcomes) in zip(chunk, results):
+            progress = final
+            for event_index, outcome in enumerate(outcomes):
+                if not outcome[0]:
+                    _, signature, message, new_entered = outcome
+                    entered.update(new_entered)
+                    progress = True  # Not a deadlock, even if every event leads to a failure
+                    if signature in failures:
+                        failures[signature].count += 1
+                    else:
+                        failures[signature] = ExplorationFailure(signature, story_for(key, event_index), message)
+                    continue
+
+                _, new_key, snapshot, new_configuration, new_entered, processed = outcome
+                entered.update(new_entered)
+                progress = progress or processed
+                if new_key not in visited and complete:
+                    if len(visited) == max_situations:
+                        complete = False
+                        continue
+                    visited[new_key] = (key, event_index)
+                    configurations.add(new_configuration)
+                    frontier.append((new_key, snapshot))
+
+            if not progress:
+                deadlocks.append(Deadlock(story_for(key), _names_for(statechart, configuration)))
+
+    return _report(statechart, len(visited), configurations, entered, deadlocks, failures, complete)
+
+
+def _names_for(statechart: model.Statechart, configuration: int) -> list:
+    """
+    Return the names of the states of given configuration, as *Interpreter.configuration* does.
+    """
+    hierarchy = statechart._hierarchy
+    return sorted(hierarchy.names_for(configuration), key=lambda s: (hierarchy.depth[s], s))
+
+
+def _report(statechart: model.Statechart, situations: int, configurations: set, entered: set, deadlocks: list,
+            failures: dict, complete: bool) -> ExplorationReport:
+    configurations = sorted(_names_for(statechart, configuration) for configuration in configurations)
+    unreachable = sorted(set(statechart.states).difference(entered))
+    return ExplorationReport(situations, configurations, sorted(entered), unreachable, deadlocks,
+                             list(failures.values()), complete)
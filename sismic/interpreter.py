@@ -1,13 +1,23 @@
-from collections import deque
+from array import array
+from collections import deque, OrderedDict
+from collections.abc import Sequence
+from contextlib import contextmanager
+import copy
+from functools import wraps
+from io import BytesIO
 from itertools import combinations
+from time import monotonic
+import threading
+from types import ModuleType
+import importlib
+import pickle
 
 from sismic import model
 from sismic.exceptions import NonDeterminismError, ConflictingTransitionsError
 from sismic.exceptions import InvariantError, PreconditionError, PostconditionError
 from sismic.code import PythonEvaluator
-from functools import wraps
 
-__all__ = ['Interpreter', 'log_trace', 'run_in_background']
+__all__ = ['Interpreter', 'InterpreterPool', 'CompactTrace', 'log_trace', 'log_compact_trace', 'run_in_background']
 
 
 class Interpreter:
@@ -21,20 +31,42 @@ class Interpreter:
     :param initial_context: an optional initial context that will be provided to the evaluator.
         By default, an empty context is provided
     :param ignore_contract: set to True to ignore contract checking during the execution.
+    :param thread_safe: set to True to allow several threads to queue events while the interpreter is
+        executed by another thread (see *wait*).
+    :param capacity: if *thread_safe* is set, the maximal number of queued external events. *queue* blocks
+        until there is room for a new external event. Default is 0, no limit. A *ValueError* is raised if
+        a capacity is set for an interpreter that is not thread-safe.
+
+    The structural part of the selection of transitions (ie. the transitions that match an event name from a given
+    configuration, the inner-first/source-state filtering and the order in which transitions are processed) is
+    cached for the last *transition_cache_size* (configuration, event name) pairs, and recomputed when states or
+    transitions are added to or removed from the statechart. Guards are still evaluated at each step.
+    Similarly, the stabilization step computed for a configuration is cached for the last *stabilization_cache_size*
+    configurations, unless it depends on the memory of a history state. Set these sizes to 0 to disable the caches.
     """
 
+    transition_cache_size = 256  # Maximal number of (configuration, event name) pairs whose transition plan is kept
+    stabilization_cache_size = 256  # Maximal number of configurations whose stabilization step is kept
+
     def __init__(self, statechart: model.Statechart, evaluator_klass=None,
-                 initial_context: dict=None, ignore_contract: bool=False):
+                 initial_context: dict=None, ignore_contract: bool=False, thread_safe: bool=False,
+                 capacity: int=0):
+        if capacity and not thread_safe:
+            raise ValueError('A capacity requires a thread-safe interpreter')
+
         # Internal variables
         self._ignore_contract = ignore_contract
         self._statechart = statechart
 
         self._initialized = False
         self._time = 0  # Internal clock
-        self._memory = {}  # History states memory
-        self._configuration = set()  # Set of active states
-        self._events = deque()  # Events queue
+        self._memory = {}  # History state name -> bitmask of the states to enter
+        self._configuration = 0  # Active states, as a bitmask (see Statechart._hierarchy)
+        self._events = _SynchronizedEvents(capacity=capacity) if thread_safe else deque()  # Events queue
         self._bound = []  # List of bound event callbacks
+        self._transition_plans = OrderedDict()  # (configuration, event name) -> _TransitionPlan, in LRU order
+        self._stabilization_steps = OrderedDict()  # configuration -> (entered, exited) or None, in LRU order
+        self._caches_version = statechart._version  # Version of the statechart for the two caches above
 
         # Evaluator
         self._evaluator = (evaluator_klass if evaluator_klass else PythonEvaluator)(self, initial_context)
@@ -62,7 +94,8 @@ class Interpreter:
         List of active states names, ordered by depth. Ties are broken according to the lexicographic order
         on the state name.
         """
-        return sorted(self._configuration, key=lambda s: (self._statechart.depth_for(s), s))
+        hierarchy = self._statechart._hierarchy
+        return sorted(hierarchy.names_for(self._configuration), key=lambda s: (hierarchy.depth[s], s))
 
     @property
     def context(self) -> dict:
@@ -76,7 +109,7 @@ class Interpreter:
         """
         Boolean indicating whether this interpreter is in a final configuration.
         """
-        return self._initialized and len(self._configuration) == 0
+        return self._initialized and self._configuration == 0
 
     @property
     def statechart(self):
@@ -85,6 +118,86 @@ class Interpreter:
         """
         return self._statechart
 
+    @property
+    def thread_safe(self) -> bool:
+        """
+        Boolean indicating whether events can be queued by several threads.
+        """
+        return isinstance(self._events, _SynchronizedEvents)
+
+    def fork(self) -> 'Interpreter':
+        """
+        Return a copy of this interpreter, that can be executed independently (eg. to explore what would happen
+        if some event were queued now).
+
+        The copy shares the statechart and the structural caches of this interpreter, and its evaluator is
+        obtained by the *_fork* method of the evaluator. For a *PythonEvaluator*, the compiled code is shared and
+        the values of the context are copied when they are accessed for the first time by the copy.
+        The configuration, the memory of history states, the queued events and the time are copied.
+        Callables bound to this interpreter (see *bind*) are not bound to the copy.
+
+        The statechart must not be modified while forked interpreters are in use.
+        Values of the context that are modified in place from outside the statechart are visible in the forks
+        that did not access them yet.
+
+        :return: an *Interpreter* instance
+        """
+        forked = copy.copy(self)
+        forked.__dict__.pop('execute_once', None)  # Installed by log_trace or log_compact_trace
+        forked._memory = dict(self._memory)
+        forked._events = self._events.copy() if self.thread_safe else deque(self._events)  # No deque.copy on 3.4
+        forked._bound = []
+        forked._evaluator = self._evaluator._fork(forked)
+        return forked
+
+    def snapshot(self, persistent_id=None) -> bytes:
+        """
+        Return a snapshot of the current state of this interpreter, that can be restored using *restore*.
+
+        The snapshot contains the configuration, the memory of history states, the time, the queued events,
+        and the state of the evaluator (for a *PythonEvaluator*, this is the context, the timers used by *after*
+        and *idle*, and the memory used by *__old__*). It does neither contain the statechart nor the bound
+        callables, and can only be restored by an interpreter of the same statechart (or of a statechart built
+        the same way, eg. imported from the same file).
+
+        The snapshot is pickled. The values of the context that cannot be pickled (eg. classes or functions
+        defined in the preamble) can be handled by *persistent_id*, in which case a corresponding
+        *persistent_load* must be provided to *restore*. Modules are handled by default.
+
+        :param persistent_id: an optional callable that takes an object and returns either None (the object is
+            pickled) or a picklable identifier for this object. See the *persistent_id* method of *pickle.Pickler*.
+        :return: a *bytes* instance
+        :raise pickle.PicklingError: if a value cannot be pickled
+        """
+        state = (
+            _SNAPSHOT_FORMAT, self._initialized, self._time, self._configuration, self._memory,
+            list(self._events), self._evaluator._get_state(),
+        )
+        output = BytesIO()
+        _SnapshotPickler(output, persistent_id).dump(state)
+        return output.getvalue()
+
+    def restore(self, snapshot: bytes, persistent_load=None):
+        """
+        Restore given snapshot, obtained by *snapshot*.
+
+        :param snapshot: a *bytes* instance returned by *snapshot*
+        :param persistent_load: an optional callable that takes an identifier returned by the *persistent_id*
+            callable that was provided to *snapshot*, and returns the corresponding object.
+        :return: *self* so it can be chained.
+        :raise ValueError: if given snapshot was not created by *snapshot*
+        """
+        state = _SnapshotUnpickler(BytesIO(snapshot), persistent_load).load()
+        if not isinstance(state, tuple) or state[0] != _SNAPSHOT_FORMAT:
+            raise ValueError('{} is not a snapshot'.format(snapshot[:16]))
+
+        _, self._initialized, self._time, self._configuration, memory, events, evaluator_state = state
+        self._memory = dict(memory)
+        self._events.clear()
+        self._events.extendleft(reversed(events))  # Queued as internal events, so it never blocks
+        self._evaluator._set_state(evaluator_state)
+        return self
+
     def bind(self, interpreter_or_callable):
         """
         Bind an interpreter or a callable to the current interpreter.
@@ -107,6 +220,7 @@ class Interpreter:
         """
         Queue an event to the interpreter.
         Internal events are propagated to bound callables (see *bind* method).
+        If the interpreter is thread-safe and has a capacity, this method blocks while the queue is full.
 
         :param event: an *Event* or *InternalEvent* instance. If internal, the event is
             prepended to the events queue and propagated to bound interpreters or callables.
@@ -123,29 +237,150 @@ class Interpreter:
             raise ValueError('{} is not an Event instance'.format(event))
         return self
 
+    def wait(self, timeout: float=None) -> bool:
+        """
+        Block until an event is queued, or until *timeout* seconds have elapsed.
+        This is intended to be called by the thread that executes a thread-safe interpreter, eg. with
+        *next_deadline* to compute the timeout. It returns immediately if the interpreter is not thread-safe.
+
+        :param timeout: an optional upper bound (in seconds) on the waiting time
+        :return: True if an event is queued, False otherwise
+        """
+        if self.thread_safe:
+            return self._events.wait(timeout)
+        return len(self._events) > 0
+
+    def ingest(self, events, summary: bool=False):
+        """
+        Queue and process the given events, one after the other.
+        This is equivalent to (but faster than) calling *queue* and then *execute* for each event.
+
+        Items can be *Event* instances or (timestamp, event) pairs. For a pair, the time of the internal clock
+        is set to *timestamp* before the event is queued.
+
+        :param events: an iterable of *Event* instances or of (timestamp, event) pairs
+        :param summary: set to True to return a summary instead of the macro steps. In this case, the macro steps
+            are not kept.
+        :return: A list of *MacroStep* instances or, if *summary* is set, a dict that associates to *events*,
+            *macro_steps*, *micro_steps*, *transitions* and *ignored_events* (events that did not trigger any
+            transition) their number.
+        :raise ValueError: if an event is not an *Event* instance
+        """
+        returned_steps = []
+        counts = dict.fromkeys(['events', 'macro_steps', 'micro_steps', 'transitions', 'ignored_events'], 0)
+        append_event = self._events.append
+
+        for item in events:
+            if isinstance(item, tuple):
+                self._time, event = item
+            else:
+                event = item
+
+            # External events are neither checked nor propagated by *queue*
+            if type(event) is model.Event:
+                append_event(event)
+            else:
+                self.queue(event)
+
+            macro_step = self.execute_once()
+            while macro_step:
+                if summary:
+                    steps = macro_step.steps
+                    transitions = sum(1 for step in steps if step.transition)
+                    counts['macro_steps'] += 1
+                    counts['micro_steps'] += len(steps)
+                    counts['transitions'] += transitions
+                    if transitions == 0 and steps[0].event is not None:
+                        counts['ignored_events'] += 1
+                else:
+                    returned_steps.append(macro_step)
+                macro_step = self.execute_once()
+            counts['events'] += 1
+
+        return counts if summary else returned_steps
+
     def execute(self, max_steps: int=-1) -> list:
         """
         Repeatedly calls *execute_once* and return a list containing
         the returned values of *execute_once*.
 
         Notice that this does NOT return an iterator but computes the whole list first
-        before returning it.
+        before returning it. See *iterexecute* for a lazy variant.
 
         :param max_steps: An upper bound on the number steps that are computed and returned.
             Default is -1, no limit. Set to a positive integer to avoid infinite loops
             in the statechart execution.
         :return: A list of *MacroStep* instances
         """
-        returned_steps = []
+        return list(self.iterexecute(max_steps))
+
+    def iterexecute(self, max_steps: int=-1, timeout: float=None):
+        """
+        Repeatedly calls *execute_once* and yields the returned values of *execute_once*, until
+        *execute_once* returns *None*.
+
+        Unlike *execute*, macro steps are computed lazily: the next macro step is only computed
+        when the previous one has been consumed.
+
+        :param max_steps: An upper bound on the number steps that are computed and yielded.
+            Default is -1, no limit. Set to a positive integer to avoid infinite loops
+            in the statechart execution.
+        :param timeout: An optional upper bound (in seconds, wall-clock time) on the time spent
+            in this generator. It is checked before each macro step but the first one.
+        :return: A generator of *MacroStep* instances
+        """
+        deadline = None if timeout is None else monotonic() + timeout
         i = 0
         macro_step = self.execute_once()
         while macro_step:
-            returned_steps.append(macro_step)
+            yield macro_step
             i += 1
-            if 0 < max_steps == i:
+            if 0 < max_steps == i or (deadline is not None and monotonic() >= deadline):
                 break
             macro_step = self.execute_once()
-        return returned_steps
+
+    def next_deadline(self) -> float:
+        """
+        Return the next time at which an eventless transition of an active state could be triggered only
+        because time has elapsed, as reported by *Evaluator.deadline_for* for the guards of these transitions.
+        With a *PythonEvaluator*, this is known for guards that call *after* and *idle* with constant arguments.
+        The interpreter is assumed to be stable, ie. *execute* was called after the last event was queued.
+
+        A driver can wait until this time (or until an event is queued) instead of regularly executing
+        the interpreter, or can directly set the time of a simulated clock to this value.
+
+        :return: a time, *float('inf')* if there is no such time, or *None* if it cannot be determined
+            (eg. if a guard depends on *time*). The current time is returned if the interpreter was
+            not yet executed.
+        """
+        if not self._initialized:
+            return self._time
+
+        deadline = float('inf')
+        for bit, transition in self._transition_plan(None).candidates:
+            candidate = self._evaluator.deadline_for(transition)
+            if candidate is None:
+                return None
+            deadline = min(deadline, candidate)
+        return deadline
+
+    def terminate(self) -> model.MacroStep:
+        """
+        Exit every active state, from the deepest ones, executing their *on exit* action and checking
+        their postconditions. The interpreter is then in a final configuration.
+        Queued events are not processed.
+
+        :return: a macro step or *None* if the interpreter was already in a final configuration
+        """
+        if not self._initialized or self.final:
+            self._initialized = True
+            return None
+
+        hierarchy = self._statechart._hierarchy
+        exited_states = sorted(hierarchy.names_for(self._configuration), key=lambda s: (-hierarchy.depth[s], s))
+        step = model.MicroStep(exited_states=exited_states)
+        self._execute_step(step)
+        return model.MacroStep(time=self.time, steps=[step])
 
     def execute_once(self) -> model.MacroStep:
         """
@@ -197,7 +432,7 @@ class Interpreter:
         macro_step = model.MacroStep(time=self.time, steps=returned_steps)
 
         # Check state invariants
-        for name in self._configuration:
+        for name in self._statechart._hierarchy.names_for(self._configuration):
             state = self._statechart.state_for(name)
             self.__evaluate_contract_conditions(state, 'invariants', macro_step)
 
@@ -220,24 +455,23 @@ class Interpreter:
         :param event: event to consider
         :return: a list of *Transition* instances
         """
-        transitions = set()
+        plan = self._transition_plan(getattr(event, 'name', None))
+        selected = 0  # Bitmask of transition ids
 
         # Retrieve the firable transitions for all active state
-        for transition in self._statechart.transitions:
-            if (transition.event == getattr(event, 'name', None) and transition.source in self._configuration and
-                    (transition.guard is None or self._evaluator.evaluate_guard(transition, event))):
-                transitions.add(transition)
+        for bit, transition in plan.candidates:
+            if transition.guard is None or self._evaluator.evaluate_guard(transition, event):
+                selected |= bit
 
         # inner-first/source-state
-        removed_transitions = set()
-        for transition in transitions:
-            source_state_descendants = self._statechart.descendants_for(transition.source)
-            for other_transition in transitions:
-                if other_transition.source in source_state_descendants:
-                    removed_transitions.add(transition)
-                    break
-
-        return transitions.difference(removed_transitions)
+        kept = plan.kept.get(selected, None)
+        if kept is None:
+            hierarchy = self._statechart._hierarchy
+            transitions = [transition for bit, transition in plan.candidates if selected & bit]
+            sources = hierarchy.mask_for(transition.source for transition in transitions)
+            kept = tuple(t for t in transitions if not sources & hierarchy.descendants_mask[t.source])
+            plan.kept[selected] = kept
+        return list(kept)
 
     def _sort_transitions(self, transitions: list) -> list:
         """
@@ -250,6 +484,17 @@ class Interpreter:
             transitions (*ConflictingTransitionsError*).
         """
         if len(transitions) > 1:
+            # Transitions share their event and were selected from the current configuration
+            plan = self._transition_plan(next(iter(transitions)).event)
+            key = 0  # Bitmask of transition ids
+            for transition in transitions:
+                key |= 1 << transition._id
+            ordered = plan.ordered.get(key, None)
+            if ordered is not None:
+                return list(ordered)
+
+            hierarchy = self._statechart._hierarchy
+
             # If more than one transition, we check (1) they are from separate regions and (2) they do not conflict
             # Two transitions conflict if one of them leaves the parallel state
             for t1, t2 in combinations(transitions, 2):
@@ -270,14 +515,13 @@ class Interpreter:
                 # come from nested parallel regions!
                 for transition in [t1, t2]:
                     last_before_lca = transition.source
-                    for state in self._statechart.ancestors_for(transition.source):
+                    for state in hierarchy.ancestors[transition.source]:
                         if state == lca:
                             break
                         last_before_lca = state
                     # Target must be a descendant (or self) of this state
-                    if (transition.target and
-                            (transition.target not in
-                             [last_before_lca] + self._statechart.descendants_for(last_before_lca))):
+                    if (transition.target and transition.target != last_before_lca and
+                            transition.target not in hierarchy.descendants_set[last_before_lca]):
                         raise ConflictingTransitionsError(
                             'Conflicting transitions: {t1} and {t2}'
                             '\nConfiguration is {c}\nEvent is {e}\nTransitions are:{t}\n'
@@ -285,10 +529,49 @@ class Interpreter:
                         )
 
             # Define an arbitrary order based on the depth and the name of source states.
-            transitions = sorted(transitions, key=lambda t: (-self._statechart.depth_for(t.source), t.source))
+            transitions = sorted(transitions, key=lambda t: (-hierarchy.depth[t.source], t.source))
+            plan.ordered[key] = tuple(transitions)
 
         return transitions
 
+    def _transition_plan(self, event_name: str=None) -> '_TransitionPlan':
+        """
+        Return the transition plan for the current configuration and given event name.
+        Plans are kept in a LRU cache, see *transition_cache_size*.
+
+        :param event_name: name of the event to consider, or None for eventless transitions
+        :return: a *_TransitionPlan* instance
+        """
+        self._check_caches()
+        plans = self._transition_plans
+        key = (self._configuration, event_name)
+        plan = plans.get(key, None)
+        if plan is not None:
+            plans.move_to_end(key)
+            return plan
+
+        index = self._statechart._transitions_index.get(event_name, {})
+        candidates = []
+        for name in self._statechart._hierarchy.names_for(self._configuration):
+            for transition in index.get(name, ()):
+                candidates.append((1 << transition._id, transition))
+        plan = _TransitionPlan(candidates)
+
+        if self.transition_cache_size > 0:
+            if len(plans) >= self.transition_cache_size:
+                plans.popitem(last=False)
+            plans[key] = plan
+        return plan
+
+    def _check_caches(self):
+        """
+        Clear the structural caches of this interpreter if the statechart was modified since they were filled.
+        """
+        if self._caches_version != self._statechart._version:
+            self._transition_plans.clear()
+            self._stabilization_steps.clear()
+            self._caches_version = self._statechart._version
+
     def _compute_transitions_steps(self, event: model.Event, transitions: list) -> list:
         """
         Return a (possibly empty) list of micro steps. Each micro step corresponds to the process of a transition
@@ -298,6 +581,7 @@ class Interpreter:
         :param transitions: the transitions that should be processed
         :return: a list of micro steps.
         """
+        hierarchy = self._statechart._hierarchy
         returned_steps = []
         for transition in transitions:
             # Internal transition
@@ -320,13 +604,13 @@ class Interpreter:
                 last_before_lca = state
 
             # Take all the descendants of this state and list the ones that are active
-            for descendant in self._statechart.descendants_for(last_before_lca)[::-1]:  # Mind the reversed order!
+            for descendant in reversed(hierarchy.descendants[last_before_lca]):  # Mind the reversed order!
                 # Only leave states that are currently active
-                if descendant in self._configuration:
+                if self._configuration & hierarchy.bit[descendant]:
                     exited_states.append(descendant)
 
             # Add last_before_lca as it is a child of LCA that must be exited
-            if last_before_lca in self._configuration:
+            if self._configuration & hierarchy.bit[last_before_lca]:
                 exited_states.append(last_before_lca)
 
             # Entered states
@@ -352,27 +636,50 @@ class Interpreter:
 
         :return: A *MicroStep* instance or *None* if this statechart can not be more stabilized
         """
+        self._check_caches()
+        configuration = self._configuration
+        cache = self._stabilization_steps
+        if configuration in cache:
+            cache.move_to_end(configuration)
+            cached = cache[configuration]
+            return None if cached is None else model.MicroStep(entered_states=list(cached[0]),
+                                                                exited_states=list(cached[1]))
+
+        hierarchy = self._statechart._hierarchy
+        active_names = hierarchy.names_for(configuration)
+        step = None
+
         # Check if we are in a set of "stable" states
-        leaves_names = self._statechart.leaf_for(list(self._configuration))
+        leaves_names = [name for name in active_names if not configuration & hierarchy.descendants_mask[name]]
         leaves = map(self._statechart.state_for, leaves_names)
-        leaves = sorted(leaves, key=lambda s: (-self._statechart.depth_for(s.name), s.name))
+        leaves = sorted(leaves, key=lambda s: (-hierarchy.depth[s.name], s.name))
 
         # Final states?
         if len(leaves) > 0 and all([isinstance(s, model.FinalState) for s in leaves]):
             # Leave all states
-            exited_states = sorted(self._configuration, key=lambda s: (-self._statechart.depth_for(s), s))
-            return model.MicroStep(exited_states=exited_states)
-
-        # Otherwise, develop history, compound and orthogonal states.
-        for leaf in leaves:
-            if isinstance(leaf, model.HistoryStateMixin):
-                states_to_enter = self._memory.get(leaf.name, [leaf.memory])
-                states_to_enter.sort(key=lambda x: (self._statechart.depth_for(x), x))
-                return model.MicroStep(entered_states=states_to_enter, exited_states=[leaf.name])
-            elif isinstance(leaf, model.OrthogonalState) and self._statechart.children_for(leaf.name):
-                return model.MicroStep(entered_states=sorted(self._statechart.children_for(leaf.name)))
-            elif isinstance(leaf, model.CompoundState) and leaf.initial:
-                return model.MicroStep(entered_states=[leaf.initial])
+            exited_states = sorted(active_names, key=lambda s: (-hierarchy.depth[s], s))
+            step = model.MicroStep(exited_states=exited_states)
+        else:
+            # Otherwise, develop history, compound and orthogonal states.
+            for leaf in leaves:
+                if isinstance(leaf, model.HistoryStateMixin):
+                    memory = self._memory.get(leaf.name, None)
+                    states_to_enter = [leaf.memory] if memory is None else hierarchy.names_for(memory)
+                    states_to_enter.sort(key=lambda x: (hierarchy.depth[x], x))
+                    # Depends on the memory, do not cache
+                    return model.MicroStep(entered_states=states_to_enter, exited_states=[leaf.name])
+                elif isinstance(leaf, model.OrthogonalState) and self._statechart.children_for(leaf.name):
+                    step = model.MicroStep(entered_states=sorted(self._statechart.children_for(leaf.name)))
+                    break
+                elif isinstance(leaf, model.CompoundState) and leaf.initial:
+                    step = model.MicroStep(entered_states=[leaf.initial])
+                    break
+
+        if self.stabilization_cache_size > 0:
+            if len(cache) >= self.stabilization_cache_size:
+                cache.popitem(last=False)
+            cache[configuration] = None if step is None else (tuple(step.entered_states), tuple(step.exited_states))
+        return step
 
     def _execute_step(self, step: model.MicroStep):
         """
@@ -380,6 +687,7 @@ class Interpreter:
 
         :param step: *MicroStep* instance
         """
+        hierarchy = self._statechart._hierarchy
         entered_states = list(map(self._statechart.state_for, step.entered_states))
         exited_states = list(map(self._statechart.state_for, step.exited_states))
 
@@ -399,16 +707,16 @@ class Interpreter:
                 child = self._statechart.state_for(child_name)
                 if isinstance(child, model.DeepHistoryState):
                     # This MUST contain at least one element!
-                    active = self._configuration.intersection(self._statechart.descendants_for(state.name))
-                    assert len(active) >= 1
-                    self._memory[child.name] = list(active)
+                    active = self._configuration & hierarchy.descendants_mask[state.name]
+                    assert active != 0
+                    self._memory[child.name] = active
                 elif isinstance(child, model.ShallowHistoryState):
                     # This MUST contain exactly one element!
-                    active = self._configuration.intersection(self.statechart.children_for(state.name))
-                    assert len(active) == 1
-                    self._memory[child.name] = list(active)
+                    active = self._configuration & hierarchy.mask_for(self._statechart.children_for(state.name))
+                    assert active & (active - 1) == 0 and active != 0
+                    self._memory[child.name] = active
         # Update configuration
-        self._configuration = self._configuration.difference(step.exited_states)
+        self._configuration &= ~hierarchy.mask_for(step.exited_states)
 
         # Execute transition
         if step.transition and step.transition.action:
@@ -432,7 +740,7 @@ class Interpreter:
             self._evaluator.execute_onentry(state)
 
         # Update configuration
-        self._configuration = self._configuration.union(step.entered_states)
+        self._configuration |= hierarchy.mask_for(step.entered_states)
 
     def __stabilize(self) -> list:
         """
@@ -475,6 +783,285 @@ class Interpreter:
         return '{}[{}]({})'.format(self.__class__.__name__, self._statechart, ', '.join(self.configuration))
 
 
+class InterpreterPool:
+    """
+    A set of executions (called sessions) of a same statechart, identified by keys.
+
+    The sessions share a single interpreter, so the statechart, its compiled code and the structural caches
+    are held once. A session only holds what depends on its execution: the configuration, the queued events,
+    the memory of history states, the time, and the attributes of the evaluator listed in its
+    *_session_attributes* (for a *PythonEvaluator*, the context, the timers and the memory used
+    by *__old__*). A session is loaded into the shared interpreter each time it is used.
+
+    Callables cannot be bound to the shared interpreter, and a pool is not thread-safe.
+
+    :param statechart: statechart to interpret
+    :param evaluator_klass: An optional callable (eg. a class) that takes an interpreter and an optional initial
+        context as input and return an *Evaluator* instance. By default, the *PythonEvaluator* class will be used.
+    :param ignore_contract: set to True to ignore contract checking during the execution.
+    :param interpreter_klass: An optional subclass of *Interpreter* for the shared interpreter.
+    """
+
+    _interpreter_attributes = ('_initialized', '_time', '_configuration', '_memory', '_events')
+
+    def __init__(self, statechart: model.Statechart, evaluator_klass=None, ignore_contract: bool=False,
+                 interpreter_klass=None):
+        self._interpreter = (interpreter_klass if interpreter_klass else Interpreter)(
+            statechart, evaluator_klass=evaluator_klass, ignore_contract=ignore_contract)
+        self._initial_session = self.__save()  # Compiles the statechart once
+        self._sessions = {}  # key -> tuple of values (None for empty containers)
+        self._current = None  # Key of the session that is loaded in the shared interpreter
+
+    def add(self, key, initial_context: dict=None):
+        """
+        Create a new session for given key.
+
+        :param key: a hashable value that identifies the session
+        :param initial_context: an optional initial context for the evaluator of this session
+        :return: *self* so it can be chained.
+        :raise KeyError: if a session exists for this key
+        :raise ValueError: if a session is in use
+        """
+        if key in self._sessions:
+            raise KeyError('A session exists for {}'.format(key))
+        if self._current is not None:
+            raise ValueError('Session {} is in use'.format(self._current))
+
+        self.__load(tuple(self.__copy(value) for value in self._initial_session))
+        evaluator = self._interpreter._evaluator
+        evaluator._context = initial_context if initial_context else {}
+        evaluator.execute_statechart(self._interpreter.statechart)
+        self._sessions[key] = self.__save()
+        return self
+
+    def remove(self, key):
+        """
+        Remove the session of given key.
+
+        :param key: key of a session
+        :raise KeyError: if there is no session for this key
+        :raise ValueError: if the session is in use
+        """
+        if key == self._current:
+            raise ValueError('Session {} is in use'.format(key))
+        del self._sessions[key]
+
+    @contextmanager
+    def session(self, key) -> Interpreter:
+        """
+        Load the session of given key into the shared interpreter, and return this interpreter.
+        This method must be used as a context manager, and the session is saved when the context is left.
+        The interpreter must not be used outside this context.
+
+        :param key: key of a session
+        :return: an *Interpreter* instance
+        :raise KeyError: if there is no session for this key
+        :raise ValueError: if a session is already in use
+        """
+        if self._current is not None:
+            raise ValueError('Session {} is in use'.format(self._current))
+        self.__load(self._sessions[key])
+        self._current = key
+        try:
+            yield self._interpreter
+        finally:
+            self._sessions[key] = self.__save()
+            self._current = None
+
+    def queue(self, key, event: model.Event):
+        """
+        Queue an event to the session of given key.
+
+        :param key: key of a session
+        :param event: an *Event* or *InternalEvent* instance
+        :return: *self* so it can be chained.
+        """
+        with self.session(key) as interpreter:
+            interpreter.queue(event)
+        return self
+
+    def execute(self, key, max_steps: int=-1) -> list:
+        """
+        Call *execute* on the session of given key.
+
+        :param key: key of a session
+        :param max_steps: An upper bound on the number steps that are computed and returned.
+        :return: A list of *MacroStep* instances
+        """
+        with self.session(key) as interpreter:
+            return interpreter.execute(max_steps)
+
+    def __save(self) -> tuple:
+        """
+        Return the values of the attributes of the loaded session. Empty containers are replaced by None.
+        """
+        values = [getattr(self._interpreter, name) for name in self._interpreter_attributes]
+        evaluator = self._interpreter._evaluator
+        values.extend(getattr(evaluator, name) for name in evaluator._session_attributes)
+        return tuple(None if isinstance(value, (dict, deque)) and not value else value for value in values)
+
+    @staticmethod
+    def __copy(value):
+        """
+        Return a copy of given value if it is a container, so sessions never share a mutable container.
+        The values of a dictionary are copied if they are dictionaries (eg. *_checked* of a *PythonEvaluator*).
+        """
+        if isinstance(value, dict):
+            return {k: dict(v) if isinstance(v, dict) else v for k, v in value.items()}
+        elif isinstance(value, (deque, list, set)):
+            return copy.copy(value)
+        return value
+
+    def __load(self, session: tuple):
+        """
+        Load given session into the shared interpreter.
+        """
+        evaluator = self._interpreter._evaluator
+        attributes = [(self._interpreter, name) for name in self._interpreter_attributes]
+        attributes.extend((evaluator, name) for name in evaluator._session_attributes)
+        for (target, name), value in zip(attributes, session):
+            if value is None:
+                value = deque() if name == '_events' else {}
+            setattr(target, name, value)
+
+    def __contains__(self, key):
+        return key in self._sessions
+
+    def __iter__(self):
+        return iter(self._sessions)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __repr__(self):
+        return '{}({}, {} sessions)'.format(self.__class__.__name__, self._interpreter.statechart, len(self))
+
+
+_SNAPSHOT_FORMAT = 'sismic-snapshot-1'
+
+
+class _SnapshotPickler(pickle.Pickler):
+    """
+    Pickler for *Interpreter.snapshot*, that pickles modules by name and delegates to an optional
+    *persistent_id* callable.
+    """
+
+    def __init__(self, file, persistent_id=None):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self._persistent_id = persistent_id
+
+    def persistent_id(self, obj):
+        if isinstance(obj, ModuleType):
+            return 'module', obj.__name__
+        if self._persistent_id is not None:
+            identifier = self._persistent_id(obj)
+            if identifier is not None:
+                return 'custom', identifier
+        return None
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    """
+    Unpickler for *Interpreter.restore*.
+    """
+
+    def __init__(self, file, persistent_load=None):
+        super().__init__(file)
+        self._persistent_load = persistent_load
+
+    def persistent_load(self, pid):
+        kind, identifier = pid
+        if kind == 'module':
+            return importlib.import_module(identifier)
+        if self._persistent_load is None:
+            raise pickle.UnpicklingError('A persistent_load callable is required to restore this snapshot')
+        return self._persistent_load(identifier)
+
+
+class _SynchronizedEvents(deque):
+    """
+    A thread-safe queue of events for a thread-safe interpreter.
+
+    External events are appended (or extended) by any thread, and block while *capacity* events are queued.
+    Internal events are prepended by the thread that executes the interpreter, and never block.
+    Iterating over the queue iterates over a copy of it, so it can be snapshotted while events are queued.
+    Events are consumed by this thread, that can wait for them without polling.
+
+    :param iterable: initial events
+    :param capacity: maximal number of queued external events, 0 for no limit
+    """
+
+    def __init__(self, iterable=(), capacity: int=0):
+        super().__init__(iterable)
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+
+    def append(self, event):
+        with self._not_full:
+            if self.capacity > 0:
+                while len(self) >= self.capacity:
+                    self._not_full.wait()
+            super().append(event)
+            self._not_empty.notify()
+
+    def appendleft(self, event):
+        with self._lock:
+            super().appendleft(event)
+            self._not_empty.notify()
+
+    def extend(self, events):
+        for event in events:
+            self.append(event)
+
+    def extendleft(self, events):
+        with self._lock:
+            super().extendleft(events)
+            self._not_empty.notify()
+
+    def popleft(self):
+        with self._lock:
+            event = super().popleft()
+            self._not_full.notify()
+            return event
+
+    def clear(self):
+        with self._lock:
+            super().clear()
+            self._not_full.notify_all()
+
+    def wait(self, timeout: float=None) -> bool:
+        with self._not_empty:
+            return bool(self._not_empty.wait_for(self.__len__, timeout))
+
+    def copy(self):
+        return _SynchronizedEvents(self, self.capacity)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(super().__iter__()))
+
+    def __reduce__(self):
+        return deque, (list(self),)
+
+
+class _TransitionPlan:
+    """
+    Structural data about the transitions that can be selected from a given configuration for a given event name.
+
+    Sets of transitions are represented by bitmasks of transition ids (see *Transition._id*).
+
+    :param candidates: (bit, transition) pairs for the transitions whose source is active and that are triggered
+        by the event name
+    """
+
+    def __init__(self, candidates: list):
+        self.candidates = candidates
+        self.kept = {}  # transitions whose guard holds -> tuple of inner-first/source-state ones
+        self.ordered = {}  # kept transitions -> tuple of transitions in processing order
+
+
 def log_trace(interpreter: Interpreter) -> list:
     """
     Return a list that will be populated by each value returned by the *execute_once* method
@@ -497,6 +1084,126 @@ def log_trace(interpreter: Interpreter) -> list:
     return trace
 
 
+class CompactTrace(Sequence):
+    """
+    A read-only sequence of *MacroStep* that stores its steps in typed arrays (see module *array*) instead of
+    keeping the *MacroStep* and *MicroStep* instances. *MacroStep* instances are created each time they are
+    accessed, and are equal to the recorded ones.
+
+    Events, transitions and state names are interned: each distinct value is stored once, and steps only
+    refer to its index. Events are interned by type, name and data (if the data are hashable), transitions
+    by identity.
+    """
+
+    def __init__(self):
+        self._times = array('d')  # Time of each macro step
+        self._steps = array('q', [0])  # Offsets of the micro steps of each macro step
+        self._events = array('i')  # Event index of each micro step, -1 if none
+        self._transitions = array('i')  # Transition index of each micro step, -1 if none
+        self._entered_offsets = array('q', [0])  # Offsets of the entered states of each micro step
+        self._entered = array('i')
+        self._exited_offsets = array('q', [0])  # Offsets of the exited states of each micro step
+        self._exited = array('i')
+
+        self._event_values, self._event_indexes = [], {}  # (type, name, data items) -> index
+        self._transition_values, self._transition_indexes = [], {}  # id(transition) -> index
+        self._state_values, self._state_indexes = [], {}  # name -> index
+
+    @staticmethod
+    def _intern(values: list, indexes: dict, key, value) -> int:
+        index = indexes.get(key, None)
+        if index is None:
+            index = indexes[key] = len(values)
+            values.append(value)
+        return index
+
+    def record(self, macro_step: model.MacroStep):
+        """
+        Append given macro step to this trace.
+
+        :param macro_step: a *MacroStep* instance
+        """
+        for step in macro_step.steps:
+            event = step.event
+            if event is None:
+                self._events.append(-1)
+            else:
+                try:
+                    key = (type(event), event.name, frozenset(event.data.items()))
+                    self._events.append(self._intern(self._event_values, self._event_indexes, key, event))
+                except TypeError:  # Unhashable data, event is not interned
+                    self._events.append(len(self._event_values))
+                    self._event_values.append(event)
+
+            transition = step.transition
+            if transition:
+                self._transitions.append(self._intern(self._transition_values, self._transition_indexes,
+                                                      id(transition), transition))
+            else:
+                self._transitions.append(-1)
+
+            for names, offsets, column in ((step.entered_states, self._entered_offsets, self._entered),
+                                           (step.exited_states, self._exited_offsets, self._exited)):
+                for name in names:
+                    column.append(self._intern(self._state_values, self._state_indexes, name, name))
+                offsets.append(len(column))
+
+        self._times.append(macro_step.time)
+        self._steps.append(len(self._events))
+
+    def _micro_step(self, i: int) -> model.MicroStep:
+        event = self._events[i]
+        transition = self._transitions[i]
+        states = self._state_values
+        return model.MicroStep(
+            event=None if event < 0 else self._event_values[event],
+            transition=None if transition < 0 else self._transition_values[transition],
+            entered_states=[states[j] for j in self._entered[self._entered_offsets[i]:self._entered_offsets[i + 1]]],
+            exited_states=[states[j] for j in self._exited[self._exited_offsets[i]:self._exited_offsets[i + 1]]],
+        )
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('trace index out of range')
+
+        steps = [self._micro_step(i) for i in range(self._steps[index], self._steps[index + 1])]
+        time = self._times[index]
+        return model.MacroStep(time=int(time) if time.is_integer() else time, steps=steps)
+
+    def __len__(self):
+        return len(self._times)
+
+    def __repr__(self):
+        return 'CompactTrace({} macro steps)'.format(len(self))
+
+
+def log_compact_trace(interpreter: Interpreter) -> CompactTrace:
+    """
+    Return a *CompactTrace* that will be populated by each value returned by the *execute_once* method
+    of given interpreter. This is a memory-efficient alternative to *log_trace*.
+
+    :param interpreter: an *Interpreter* instance
+    :return: a *CompactTrace* instance
+    """
+    func = interpreter.execute_once
+    trace = CompactTrace()
+
+    @wraps(func)
+    def new_func(*args, **kwargs):
+        step = func(*args, **kwargs)
+        if step:
+            trace.record(step)
+        return step
+
+    interpreter.execute_once = new_func
+    return trace
+
+
 def run_in_background(interpreter: Interpreter, delay: float=0.05, callback=None):
     """
     Run given interpreter in background. The time is updated according to
@@ -504,30 +1211,35 @@ def run_in_background(interpreter: Interpreter, delay: float=0.05, callback=None
     You can manually stop the thread using the added *stop* of the returned Thread object.
     This is for convenience only and should be avoided, because a call to *stop* puts the interpreter in
     an empty (and thus final) configuration, without properly leaving the active states.
+    See *asynchronous.AsyncRunner* for an alternative that does not rely on polling.
 
     :param interpreter: an interpreter
-    :param delay: delay between each call to *execute()*
-    :param callback: a function that accepts the result of *execute*.
+    :param delay: delay between each call to *iterexecute()*, also used as its time budget.
+        There is no delay if the previous call exhausted its budget.
+    :param callback: a function that accepts the list of macro steps computed by each call to *iterexecute*.
     :return: started thread (instance of *threading.Thread*)
     """
     import time
-    import threading
 
     def _task():
         starttime = time.time()
         while not interpreter.final:
             interpreter.time = time.time() - starttime
-            steps = interpreter.execute()
+            # Bound the execution by *delay*, so that the clock is updated while many steps are pending
+            steps = list(interpreter.iterexecute(timeout=delay))
             if callback:
                 callback(steps)
-            time.sleep(delay)
+            if time.time() - starttime - interpreter.time < delay:
+                if interpreter.thread_safe:
+                    interpreter.wait(delay)  # Wake up as soon as an event is queued
+                else:
+                    time.sleep(delay)
     thread = threading.Thread(target=_task)
 
     def stop_thread():
-        interpreter._configuration = []
+        interpreter._configuration = 0
 
     thread.stop = stop_thread
 
     thread.start()
     return thread
-
@@ -3,6 +3,8 @@ class ContractMixin:
     Mixin with a contract: preconditions, postconditions and invariants.
     """
 
+    __slots__ = ()
+
     def __init__(self):
         self.preconditions = []
         self.postconditions = []
@@ -16,6 +18,8 @@ class StateMixin:
     :param name: name of the state
     """
 
+    __slots__ = ()
+
     def __init__(self, name: str):
         self._name = name
 
@@ -41,6 +45,8 @@ class ActionStateMixin:
     :param on_exit: code to execute when state is exited
     """
 
+    __slots__ = ()
+
     def __init__(self, on_entry: str = None, on_exit: str = None):
         self.on_entry = on_entry
         self.on_exit = on_exit
@@ -50,14 +56,14 @@ class TransitionStateMixin:
     """
     A simple state can host transitions
     """
-    pass
+    __slots__ = ()
 
 
 class CompositeStateMixin:
     """
     Composite state can have children states.
     """
-    pass
+    __slots__ = ()
 
 
 class HistoryStateMixin:
@@ -67,6 +73,8 @@ class HistoryStateMixin:
     :param memory: name of the initial state
     """
 
+    __slots__ = ()
+
     def __init__(self, memory: str = None):
         self.memory = memory
 
@@ -80,11 +88,12 @@ class BasicState(ContractMixin, StateMixin, ActionStateMixin, TransitionStateMix
     :param on_exit: code to execute when state is exited
     """
 
+    __slots__ = ('preconditions', 'postconditions', 'invariants', '_name', 'on_entry', 'on_exit')
+
     def __init__(self, name: str, on_entry: str = None, on_exit: str = None):
         ContractMixin.__init__(self)
         StateMixin.__init__(self, name)
         ActionStateMixin.__init__(self, on_entry, on_exit)
-        TransitionStateMixin.__init__(self)
 
 
 class CompoundState(ContractMixin, StateMixin, ActionStateMixin, TransitionStateMixin, CompositeStateMixin):
@@ -97,12 +106,12 @@ class CompoundState(ContractMixin, StateMixin, ActionStateMixin, TransitionState
     :param on_exit: code to execute when state is exited
     """
 
+    __slots__ = ('preconditions', 'postconditions', 'invariants', '_name', 'on_entry', 'on_exit', 'initial')
+
     def __init__(self, name: str, initial: str = None, on_entry: str = None, on_exit: str = None):
         ContractMixin.__init__(self)
         StateMixin.__init__(self, name)
         ActionStateMixin.__init__(self, on_entry, on_exit)
-        TransitionStateMixin.__init__(self)
-        CompositeStateMixin.__init__(self)
         self.initial = initial
 
 
@@ -115,12 +124,12 @@ class OrthogonalState(ContractMixin, StateMixin, ActionStateMixin, TransitionSta
     :param on_exit: code to execute when state is exited
     """
 
+    __slots__ = ('preconditions', 'postconditions', 'invariants', '_name', 'on_entry', 'on_exit')
+
     def __init__(self, name: str, on_entry: str = None, on_exit: str = None):
         ContractMixin.__init__(self)
         StateMixin.__init__(self, name)
         ActionStateMixin.__init__(self, on_entry, on_exit)
-        TransitionStateMixin.__init__(self)
-        CompositeStateMixin.__init__(self)
 
 
 class ShallowHistoryState(ContractMixin, StateMixin, ActionStateMixin, HistoryStateMixin):
@@ -133,6 +142,9 @@ class ShallowHistoryState(ContractMixin, StateMixin, ActionStateMixin, HistorySt
     :param on_exit: code to execute when state is exited
     :param memory: name of the initial state
     """
+
+    __slots__ = ('preconditions', 'postconditions', 'invariants', '_name', 'on_entry', 'on_exit', 'memory')
+
     def __init__(self, name: str, on_entry: str=None, on_exit: str=None, memory: str=None):
         ContractMixin.__init__(self)
         StateMixin.__init__(self, name)
@@ -150,6 +162,9 @@ class DeepHistoryState(ContractMixin, StateMixin, ActionStateMixin, HistoryState
     :param on_exit: code to execute when state is exited
     :param memory: name of the initial state
     """
+
+    __slots__ = ('preconditions', 'postconditions', 'invariants', '_name', 'on_entry', 'on_exit', 'memory')
+
     def __init__(self, name: str, on_entry: str=None, on_exit: str=None, memory: str=None):
         ContractMixin.__init__(self)
         StateMixin.__init__(self, name)
@@ -166,6 +181,8 @@ class FinalState(ContractMixin, StateMixin, ActionStateMixin):
     :param on_exit: code to execute when state is exited
     """
 
+    __slots__ = ('preconditions', 'postconditions', 'invariants', '_name', 'on_entry', 'on_exit')
+
     def __init__(self, name: str, on_entry: str = None, on_exit: str = None):
         ContractMixin.__init__(self)
         StateMixin.__init__(self, name)
@@ -186,13 +203,17 @@ class Transition(ContractMixin):
     :param action: action as code (if any)
     """
 
+    __slots__ = ('preconditions', 'postconditions', 'invariants', '_source', '_target', '_event', 'guard', 'action',
+                 '_id')
+
     def __init__(self, source: str, target: str = None, event: str = None, guard: str = None, action: str = None):
         ContractMixin.__init__(self)
         self._source = source
         self._target = target
-        self.event = event
+        self._event = event
         self.guard = guard
         self.action = action
+        self._id = None  # Id assigned by the statechart this transition is added to, see Statechart.add_transition
 
     @property
     def source(self):
@@ -202,6 +223,10 @@ class Transition(ContractMixin):
     def target(self):
         return self._target
 
+    @property
+    def event(self):
+        return self._event
+
     @property
     def internal(self):
         """
@@ -8,6 +8,8 @@ class Event:
     :param data: additional data (mapping, dict-like)
     """
 
+    __slots__ = ('name', 'data')
+
     def __init__(self, name: str, **additional_parameters):
         self.name = name
         self.data = additional_parameters
@@ -18,6 +20,9 @@ class Event:
                 self.data == other.data)
 
     def __getattr__(self, attr):
+        # *data* is not set yet when an event is being copied or unpickled
+        if attr == 'data':
+            raise AttributeError(attr)
         try:
             return self.data[attr]
         except:
@@ -39,4 +44,4 @@ class InternalEvent(Event):
     """
     Subclass of Event that represents an internal event.
     """
-    pass
+    __slots__ = ()
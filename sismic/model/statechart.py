@@ -4,6 +4,122 @@ from sismic.exceptions import StatechartError
 __all__ = ['Statechart']
 
 
+class _Hierarchy:
+    """
+    Precomputed hierarchy tables for the states of a statechart: depth, ancestors and descendants
+    of each state, and a sparse table built on an Euler tour of the states to answer lowest common
+    ancestor queries in constant time.
+
+    Each state is also associated to a bit (based on its id), so that a set of states can be represented
+    by an integer bitmask. The descendants of each state are available as such a bitmask.
+
+    Instances are built by a *Statechart* on demand, and are discarded as soon as its hierarchy changes.
+
+    :param parent: mapping between a state name and the name of its parent
+    :param children: mapping between a state name (or None) and the names of its children
+    :param ids: mapping between a state name and its id
+    """
+
+    def __init__(self, parent: dict, children: dict, ids: dict):
+        self.parent = dict(parent)
+        self.names = {state_id: name for name, state_id in ids.items()}  # id -> name
+        self.bit = {name: 1 << state_id for name, state_id in ids.items()}  # name -> bit
+        self.descendants_mask = {}  # name -> bitmask of descendants
+        self.depth = {}  # name -> depth (1-indexed)
+        self.ancestors = {}  # name -> tuple of ancestors, by decreasing depth
+        self.descendants = {}  # name -> tuple of descendants, by increasing depth
+        self.descendants_set = {}  # name -> frozenset of descendants
+
+        # Ancestors and depth, top-down
+        queue = list(children[None])
+        for name in queue:
+            parent_name = parent[name]
+            self.ancestors[name] = (parent_name,) + self.ancestors[parent_name] if parent_name else ()
+            self.depth[name] = len(self.ancestors[name]) + 1
+            queue.extend(children[name])
+
+        # Descendants, breadth-first as in Statechart.descendants_for
+        for name in queue:
+            descendants = list(children[name])
+            for descendant in descendants:
+                descendants.extend(children[descendant])
+            self.descendants[name] = tuple(descendants)
+            self.descendants_set[name] = frozenset(descendants)
+            self.descendants_mask[name] = self.mask_for(descendants)
+
+        # Euler tour (iterative, to support deep hierarchies)
+        self._tour = []  # Sequence of visited names
+        self._first = {}  # name -> index of its first occurrence in the tour
+        for root in children[None]:
+            stack = [(root, iter(children[root]))]
+            self._first[root] = len(self._tour)
+            self._tour.append(root)
+            while stack:
+                name, remaining = stack[-1]
+                child = next(remaining, None)
+                if child is None:
+                    stack.pop()
+                    if stack:
+                        self._tour.append(stack[-1][0])
+                else:
+                    self._first[child] = len(self._tour)
+                    self._tour.append(child)
+                    stack.append((child, iter(children[child])))
+
+        # Sparse table: self._sparse[k][i] is the shallowest name in self._tour[i:i + 2**k]
+        self._sparse = [self._tour]
+        k = 1
+        while (1 << k) <= len(self._tour):
+            previous = self._sparse[-1]
+            half = 1 << (k - 1)
+            self._sparse.append([
+                self._shallowest(previous[i], previous[i + half])
+                for i in range(len(self._tour) - (1 << k) + 1)
+            ])
+            k += 1
+
+    def mask_for(self, names) -> int:
+        """
+        Return the bitmask that represents given state names.
+
+        :param names: an iterable of state names
+        :return: a bitmask
+        """
+        mask = 0
+        for name in names:
+            mask |= self.bit[name]
+        return mask
+
+    def names_for(self, mask: int) -> list:
+        """
+        Return the state names that are represented by given bitmask, by increasing id.
+
+        :param mask: a bitmask
+        :return: a list of state names
+        """
+        names = []
+        while mask:
+            lowest = mask & -mask
+            names.append(self.names[lowest.bit_length() - 1])
+            mask ^= lowest
+        return names
+
+    def _shallowest(self, name_first: str, name_second: str) -> str:
+        return name_first if self.depth[name_first] <= self.depth[name_second] else name_second
+
+    def common_ancestor(self, name_first: str, name_second: str) -> str:
+        """
+        Return the deepest state that is an ancestor of, or equal to, both given states.
+
+        :param name_first: name of first state
+        :param name_second: name of second state
+        :return: name of deepest common ancestor (or self)
+        """
+        i, j = sorted((self._first[name_first], self._first[name_second]))
+        k = (j - i + 1).bit_length() - 1
+        return self._shallowest(self._sparse[k][i], self._sparse[k][j - (1 << k) + 1])
+
+
 class Statechart:
     """
     Python structure for a statechart
@@ -22,6 +138,12 @@ class Statechart:
         self._parent = {}  # name -> parent.name
         self._children = {None: []}  # name -> list of names
         self._transitions = []  # list of Transition objects
+        self._transitions_index = {}  # event name (None if eventless) -> source name -> list of Transition objects
+        self._state_ids = {}  # name -> id, ids are never reused
+        self._next_state_id = 0
+        self._next_transition_id = 0  # Id of the next added transition (see Transition._id), ids are never reused
+        self._hierarchy_tables = None  # Cached _Hierarchy instance, reset when the hierarchy changes
+        self._version = 0  # Incremented each time states or transitions change, see _structure_changed
 
     @property
     def root(self):
@@ -85,6 +207,9 @@ class Statechart:
         self._parent[state.name] = parent
         self._children[state.name] = []
         self._children[parent].append(state.name)
+        self._state_ids[state.name] = self._next_state_id
+        self._next_state_id += 1
+        self._structure_changed(hierarchy=True)
 
     def remove_state(self, name: str):
         """
@@ -119,8 +244,10 @@ class Statechart:
         self._states.pop(name)
         parent = self._parent.pop(name)
         self._children.pop(name)
+        self._state_ids.pop(name)
 
         self._children[parent].remove(name)
+        self._structure_changed(hierarchy=True)
 
     def rename_state(self, old_name: str, new_name: str):
         """
@@ -147,6 +274,10 @@ class Statechart:
             if transition.target == old_name:
                 transition._target = new_name
 
+        for sources in self._transitions_index.values():
+            if old_name in sources:
+                sources[new_name] = sources.pop(old_name)
+
         for other_state in self._states.values():
             # Change initial (CompoundState)
             if isinstance(other_state, CompoundState):
@@ -170,6 +301,8 @@ class Statechart:
         self._states[new_name] = self._states.pop(old_name)
         self._parent[new_name] = self._parent.pop(old_name)
         self._children[new_name] = self._children.pop(old_name)
+        self._state_ids[new_name] = self._state_ids.pop(old_name)
+        self._structure_changed(hierarchy=True)
 
         # Rename state!
         state._name = new_name
@@ -198,6 +331,7 @@ class Statechart:
         self._parent[name] = new_parent
         self._children[old_parent].remove(name)
         self._children.setdefault(new_parent, []).append(name)
+        self._structure_changed(hierarchy=True)
 
         # Check memory property
         if isinstance(state, HistoryStateMixin):
@@ -252,6 +386,26 @@ class Statechart:
 
         return self._children[name]
 
+    def _structure_changed(self, hierarchy: bool=False):
+        """
+        Notify that states or transitions were changed. This increments *_version*, so that the structural
+        data cached by interpreters (see *Interpreter.transition_cache_size*) are recomputed.
+
+        :param hierarchy: set to True if the hierarchy of states changed
+        """
+        self._version += 1
+        if hierarchy:
+            self._hierarchy_tables = None
+
+    @property
+    def _hierarchy(self) -> _Hierarchy:
+        """
+        Hierarchy tables of this statechart, computed on demand.
+        """
+        if self._hierarchy_tables is None:
+            self._hierarchy_tables = _Hierarchy(self._parent, self._children, self._state_ids)
+        return self._hierarchy_tables
+
     def ancestors_for(self, name: str) -> list:
         """
         Return an ordered list of ancestors for the given state.
@@ -263,12 +417,7 @@ class Statechart:
         """
         self.state_for(name)  # Raise StatechartError if state does not exist
 
-        ancestors = []
-        parent = self._parent[name]
-        while parent:
-            ancestors.append(parent)
-            parent = self._parent[parent]
-        return ancestors
+        return list(self._hierarchy.ancestors[name])
 
     def descendants_for(self, name: str) -> list:
         """
@@ -281,14 +430,7 @@ class Statechart:
         """
         self.state_for(name)  # Raise StatechartError if state does not exist
 
-        descendants = []
-        states_to_consider = [name]
-        while states_to_consider:
-            name = states_to_consider.pop(0)
-            for child in self.children_for(name):
-                states_to_consider.append(child)
-                descendants.append(child)
-        return descendants
+        return list(self._hierarchy.descendants[name])
 
     def depth_for(self, name: str) -> int:
         """
@@ -300,8 +442,7 @@ class Statechart:
         """
         self.state_for(name)  # Raise StatechartError if state does not exist
 
-        ancestors = self.ancestors_for(name)
-        return len(ancestors) + 1
+        return self._hierarchy.depth[name]
 
     def least_common_ancestor(self, name_first: str, name_second: str) -> str:
         """
@@ -316,11 +457,12 @@ class Statechart:
         self.state_for(name_first)  # Raise StatechartError if state does not exist
         self.state_for(name_second)
 
-        s1_anc = self.ancestors_for(name_first)
-        s2_anc = self.ancestors_for(name_second)
-        for state in s1_anc:
-            if state in s2_anc:
-                return state
+        hierarchy = self._hierarchy
+        ancestor = hierarchy.common_ancestor(name_first, name_second)
+        # A state is not one of its own ancestors
+        if ancestor == name_first or ancestor == name_second:
+            return hierarchy.parent[ancestor]
+        return ancestor
 
     def leaf_for(self, names: list) -> list:
         """
@@ -338,17 +480,9 @@ class Statechart:
         for name in names:
             self.state_for(name)  # Raise a StatechartError if it does not exist!
 
-        leaves = []
-        # TODO: Need a more efficient way to compute this set
-        for name in names:
-            keep = True
-            for descendant in self.descendants_for(name):
-                if descendant in names:
-                    keep = False
-                    break
-            if keep:
-                leaves.append(name)
-        return leaves
+        hierarchy = self._hierarchy
+        mask = hierarchy.mask_for(names)
+        return [name for name in names if not mask & hierarchy.descendants_mask[name]]
 
     # ######### TRANSITIONS ##########
 
@@ -361,7 +495,9 @@ class Statechart:
 
     def add_transition(self, transition: Transition):
         """
-        Register given transition and register it on the source state
+        Register given transition and register it on the source state.
+        The transition receives an id that is specific to this statechart, so it should not be added to
+        another statechart.
 
         :param transition: transition to add
         :raise StatechartError:
@@ -380,6 +516,9 @@ class Statechart:
             raise StatechartError('Unknown target state for {}'.format(transition))
 
         self._transitions.append(transition)
+        transition._id = self._next_transition_id
+        self._next_transition_id += 1
+        self._index_transition(transition)
 
     def remove_transition(self, transition: Transition):
         """
@@ -389,9 +528,11 @@ class Statechart:
         :raise StatechartError: if transition is not registered
         """
         try:
-            self._transitions.remove(transition)
+            removed = self._transitions.pop(self._transitions.index(transition))
         except ValueError:
             raise StatechartError('Transition {} does not exist'.format(transition))
+        removed._id = None
+        self._unindex_transition(removed)
 
     def rotate_transition(self, transition: Transition, **kwargs):
         """
@@ -412,20 +553,52 @@ class Statechart:
         if transition not in self._transitions:
             raise StatechartError('Unknown transition {}'.format(transition))
 
-        # Rotate using source
-        if 'new_source' in kwargs:
-            new_source_state = self.state_for(kwargs['new_source'])
-            if not isinstance(new_source_state, TransitionStateMixin):
-                raise StatechartError('{} cannot have transitions'.format(new_source_state))
-            transition._source = new_source_state.name
-
-        # Rotate using target
-        if 'new_target' in kwargs:
-            if kwargs['new_target'] is None:
-                transition._target = None
-            else:
-                new_target_state = self.state_for(kwargs['new_target'])
-                transition._target = new_target_state.name
+        # The index depends on the source, so the transition is re-indexed whatever happens
+        indexed = self._unindex_transition(transition)
+        try:
+            # Rotate using source
+            if 'new_source' in kwargs:
+                new_source_state = self.state_for(kwargs['new_source'])
+                if not isinstance(new_source_state, TransitionStateMixin):
+                    raise StatechartError('{} cannot have transitions'.format(new_source_state))
+                transition._source = new_source_state.name
+
+            # Rotate using target
+            if 'new_target' in kwargs:
+                if kwargs['new_target'] is None:
+                    transition._target = None
+                else:
+                    new_target_state = self.state_for(kwargs['new_target'])
+                    transition._target = new_target_state.name
+        finally:
+            if indexed:
+                self._index_transition(transition)
+
+    def _index_transition(self, transition: Transition):
+        """
+        Register given transition in the (event, source) index.
+
+        :param transition: a *Transition* instance
+        """
+        sources = self._transitions_index.setdefault(transition.event, {})
+        sources.setdefault(transition.source, []).append(transition)
+        self._structure_changed()
+
+    def _unindex_transition(self, transition: Transition) -> bool:
+        """
+        Unregister given transition from the (event, source) index.
+        Transitions are compared by identity, not by equality.
+
+        :param transition: a *Transition* instance
+        :return: True if the transition was indexed
+        """
+        transitions = self._transitions_index.get(transition.event, {}).get(transition.source, [])
+        for i, other in enumerate(transitions):
+            if other is transition:
+                del transitions[i]
+                self._structure_changed()
+                return True
+        return False
 
     def transitions_from(self, source: str) -> list:
         """
@@ -443,6 +616,23 @@ class Statechart:
                 transitions.append(transition)
         return transitions
 
+    def transitions_for(self, source: str, event: str=None) -> list:
+        """
+        Return the list of transitions whose source is given name and that can be triggered by
+        given event name. If *event* is None, the eventless transitions of *source* are returned.
+
+        Unlike *transitions_from* and *transitions_with*, this method relies on an index and
+        does not iterate over all the transitions of the statechart.
+
+        :param source: name of source state
+        :param event: name of the event, or None for eventless transitions
+        :return: a list of *Transition* instances
+        :raise StatechartError: if state does not exist
+        """
+        self.state_for(source)  # Raise StatechartError if state does not exist
+
+        return list(self._transitions_index.get(event, {}).get(source, []))
+
     def transitions_to(self, target: str) -> list:
         """
         Return the list of transitions whose target is given name.
@@ -18,6 +18,8 @@ class MicroStep:
     :param exited_states: possibly empty list of exited states
     """
 
+    __slots__ = ('event', 'transition', 'entered_states', 'exited_states')
+
     def __init__(self, event: Event = None, transition: Transition = None,
                  entered_states: list = None, exited_states: list = None):
         self.event = event
@@ -45,6 +47,8 @@ class MacroStep:
     :param steps: a list of *MicroStep* instances
     """
 
+    __slots__ = ('_time', '_steps')
+
     def __init__(self, time: int, steps: list):
         self._time = time
         self._steps = steps
@@ -1,7 +1,12 @@
-from sismic.model import Event, InternalEvent
+from itertools import islice
+import time
+from sismic.exceptions import ContractError, ExecutionError
+from sismic.model import Event, InternalEvent, Statechart
+from sismic.workers import worker_interpreter, run_in_pool, failure_signature
 import random
 
-__all__ = ['Pause', 'Story', 'random_stories_generator', 'story_from_trace']
+__all__ = ['Pause', 'Story', 'StoryResult', 'random_stories_generator', 'story_from_trace', 'tell_stories',
+           'FuzzFailure', 'FuzzReport', 'fuzz', 'CoverageGuidedGenerator']
 
 
 class Pause:
@@ -37,20 +42,28 @@ class Story(list):
         Tells the whole story to the interpreter.
 
         :param interpreter: an interpreter instance
-        :param args: additional positional arguments that are passed to *interpreter.execute*.
-        :param kwargs: additional keywords arguments that are passed to *interpreter.execute*.
+        :param args: additional positional arguments that are passed to *interpreter.iterexecute*.
+        :param kwargs: additional keywords arguments that are passed to *interpreter.iterexecute*.
         :return: the resulting trace of execution (a list of *MacroStep*)
         """
-        trace = []
+        return list(self.itertell(interpreter, *args, **kwargs))
+
+    def itertell(self, interpreter, *args, **kwargs):
+        """
+        Tells the whole story to the interpreter, and lazily yields the resulting macro steps.
+        The items of the story are told only when the macro steps of the previous ones have been consumed.
+
+        :param interpreter: an interpreter instance
+        :param args: additional positional arguments that are passed to *interpreter.iterexecute*.
+        :param kwargs: additional keywords arguments that are passed to *interpreter.iterexecute*.
+        :return: a generator of *MacroStep* instances
+        """
         for item in self:
             if isinstance(item, Event):
                 interpreter.queue(item)
             elif isinstance(item, Pause):
                 interpreter.time += item.duration
-            step = interpreter.execute(*args, **kwargs)
-            if step:
-                trace.extend(step)
-        return trace
+            yield from interpreter.iterexecute(*args, **kwargs)
 
     def tell_by_step(self, interpreter, *args, **kwargs):
         """
@@ -74,7 +87,7 @@ class Story(list):
         return 'Story({})'.format(super().__repr__())
 
 
-def random_stories_generator(items, length: int=None, number: int=None):
+def random_stories_generator(items, length: int=None, number: int=None, seed=None):
     """
     A generator that returns random stories whose elements come from *items*.
     Parameter *items* can be any iterable containing events and/or pauses.
@@ -82,14 +95,17 @@ def random_stories_generator(items, length: int=None, number: int=None):
     :param items: Items to pick from
     :param length: Length of the story, or *len(items)*
     :param number: number of stories to generate (None = infinite)
+    :param seed: if specified, the stories are generated by a *random.Random* instance initialized with
+        this seed, and are thus reproducible. Otherwise, the *random* module is used.
     :return: An infinite Story generator
     """
     length = length if length else len(items)
     number = number if number else -1
+    rand = random if seed is None else random.Random(seed)
     while number != 0:
         story = Story()
         for _ in range(length):
-            story.append(random.choice(items))  # Not random.sample, replacements needed
+            story.append(rand.choice(items))  # Not random.sample, replacements needed
         yield story
         number -= 1
 
@@ -119,3 +135,355 @@ def story_from_trace(trace: list) -> Story:
             story.append(macrostep.event)
     return story
 
+
+class StoryResult:
+    """
+    The result of telling a story with *tell_stories*.
+
+    :param configuration: the active configuration at the end of the story
+    :param violation: the message of the contract violation that interrupted the story, if any
+    :param trace: the trace of execution (a list of *MacroStep*), if requested
+    """
+
+    __slots__ = ('configuration', 'violation', 'trace')
+
+    def __init__(self, configuration: list, violation: str=None, trace: list=None):
+        self.configuration = configuration
+        self.violation = violation
+        self.trace = trace
+
+    def __eq__(self, other):
+        return (isinstance(other, StoryResult) and self.configuration == other.configuration and
+                self.violation == other.violation and self.trace == other.trace)
+
+    def __repr__(self):
+        return 'StoryResult({}, {})'.format(self.configuration, 'violated' if self.violation else 'satisfied')
+
+
+def _tell_chunk(stories: list, traces: bool) -> list:
+    results = []
+    for story in stories:
+        interpreter = worker_interpreter().fork()
+        trace, violation = [], None
+        try:
+            for macro_step in story.itertell(interpreter):
+                if traces:
+                    trace.append(macro_step)
+        except ContractError as e:
+            violation = str(e)
+        results.append(StoryResult(interpreter.configuration, violation, trace if traces else None))
+    return results
+
+
+def tell_stories(statechart: Statechart, stories, evaluator_klass=None, initial_context: dict=None,
+                 ignore_contract: bool=False, traces: bool=False, max_workers: int=None, chunksize: int=64):
+    """
+    Tell each story to a new interpreter of given statechart, using a pool of processes, and lazily yield
+    a *StoryResult* for each story, in the order of *stories*.
+
+    The statechart is pickled once and sent with each chunk of stories. A process creates an interpreter for
+    the first chunk it receives, and forks it for each story (see *Interpreter.fork*). Stories are sent to
+    the processes by chunks of *chunksize* stories, and at most two chunks per process are pending at any time.
+    A story that violates a contract is interrupted, and the message of the *ContractError* is part of its
+    result. Other exceptions are propagated.
+
+    The statechart, the stories, *evaluator_klass*, *initial_context* and, if requested, the traces must be
+    picklable.
+
+    :param statechart: statechart to interpret
+    :param stories: an iterable of *Story* instances
+    :param evaluator_klass: an optional callable that returns an *Evaluator* instance, see *Interpreter*
+    :param initial_context: an optional initial context for the interpreters
+    :param ignore_contract: set to True to ignore contract checking
+    :param traces: set to True to include the trace of each story in its result
+    :param max_workers: number of processes, by default the number of processors
+    :param chunksize: number of stories that are sent at once to a process
+    :return: a generator of *StoryResult* instances
+    """
+    interpreter_kwargs = {
+        'evaluator_klass': evaluator_klass,
+        'initial_context': initial_context,
+        'ignore_contract': ignore_contract,
+    }
+    stories = iter(stories)
+    chunks = iter(lambda: list(islice(stories, chunksize)), [])
+    tasks = ((_tell_chunk, (chunk, traces)) for chunk in chunks)
+    for results in run_in_pool(statechart, interpreter_kwargs, max_workers, tasks):
+        yield from results
+
+
+class FuzzFailure:
+    """
+    A failure found by *fuzz*: stories whose telling raised an exception with a same signature.
+
+    :param signature: the signature of the exception, a tuple that starts with the name of its class. For a
+        *ContractError*, it also contains the object and the assertion. Otherwise, it contains the first
+        line of the message.
+    :param seed: the seed of the first story that raised this exception
+    :param story: the first story that raised this exception. It can be generated again by
+        *random_stories_generator* with the same *items*, *length* and *seed*.
+    :param message: the message of the exception raised by this story
+    :param count: the number of stories that raised an exception with this signature
+    """
+
+    __slots__ = ('signature', 'seed', 'story', 'message', 'count')
+
+    def __init__(self, signature: tuple, seed: str, story: Story, message: str, count: int=1):
+        self.signature = signature
+        self.seed = seed
+        self.story = story
+        self.message = message
+        self.count = count
+
+    def __repr__(self):
+        return 'FuzzFailure({}, seed={!r}, count={})'.format(self.signature, self.seed, self.count)
+
+
+class FuzzReport:
+    """
+    The report of *fuzz*.
+
+    :param stories: number of stories that were told
+    :param duration: elapsed time (in seconds, wall-clock time)
+    :param failures: a list of *FuzzFailure* instances, one per signature, by order of discovery
+    """
+
+    def __init__(self, stories: int, duration: float, failures: list):
+        self.stories = stories
+        self.duration = duration
+        self.failures = failures
+
+    @property
+    def stories_per_second(self) -> float:
+        """
+        Number of stories that were told per second.
+        """
+        return self.stories / self.duration if self.duration > 0 else 0.0
+
+    def __repr__(self):
+        return 'FuzzReport({} stories, {:.0f} stories/s, {} failures)'.format(
+            self.stories, self.stories_per_second, len(self.failures))
+
+
+def _fuzz_chunk(items: list, length: int, seed, start: int, stop: int, errors: tuple) -> tuple:
+    failures = []
+    for i in range(start, stop):
+        story_seed = '{}-{}'.format(seed, i)
+        story = next(random_stories_generator(items, length, 1, story_seed))
+        interpreter = worker_interpreter().fork()
+        try:
+            for _ in story.itertell(interpreter):
+                pass
+        except errors as e:
+            failures.append((story_seed, failure_signature(e), str(e)))
+    return stop - start, failures
+
+
+def fuzz(statechart: Statechart, items, length: int=None, number: int=None, duration: float=None, seed=0,
+         errors=(ContractError, ExecutionError), evaluator_klass=None, initial_context: dict=None,
+         max_workers: int=None, chunksize: int=256) -> FuzzReport:
+    """
+    Tell random stories to interpreters of given statechart, using a pool of processes, and collect
+    the stories that raise one of *errors*. Failures are deduplicated by signature (see *FuzzFailure*).
+
+    The i-th story is generated by *random_stories_generator* with seed *'{seed}-{i}'*, so a failing story
+    can be generated again from the seed of its failure. Stories are generated by the processes, and only
+    the failures are sent back. See *tell_stories* for the requirements on the parameters.
+
+    At least one of *number* and *duration* should be specified. Otherwise, stories are told until the
+    process is interrupted.
+
+    :param statechart: statechart to interpret
+    :param items: items to pick from, see *random_stories_generator*
+    :param length: length of the stories, or *len(items)*
+    :param number: maximal number of stories to tell
+    :param duration: maximal duration (in seconds). New stories are not told once it is exceeded.
+    :param seed: seed from which the seeds of the stories are derived
+    :param errors: the classes of the exceptions to collect. Other exceptions are propagated.
+    :param evaluator_klass: an optional callable that returns an *Evaluator* instance, see *Interpreter*
+    :param initial_context: an optional initial context for the interpreters
+    :param max_workers: number of processes, by default the number of processors
+    :param chunksize: number of stories that are told at once by a process
+    :return: a *FuzzReport* instance
+    """
+    items = list(items)
+    length = length if length else len(items)
+    interpreter_kwargs = {'evaluator_klass': evaluator_klass, 'initial_context': initial_context}
+    errors = tuple(errors)
+    starttime = time.monotonic()
+
+    def tasks():
+        start = 0
+        while number is None or start < number:
+            if duration is not None and time.monotonic() - starttime >= duration:
+                return
+            stop = start + chunksize if number is None else min(start + chunksize, number)
+            yield _fuzz_chunk, (items, length, seed, start, stop, errors)
+            start = stop
+
+    told = 0
+    failures = {}  # signature -> FuzzFailure
+    for count, chunk_failures in run_in_pool(statechart, interpreter_kwargs, max_workers, tasks()):
+        told += count
+        for story_seed, signature, message in chunk_failures:
+            failure = failures.get(signature, None)
+            if failure is None:
+                story = next(random_stories_generator(items, length, 1, story_seed))
+                failures[signature] = FuzzFailure(signature, story_seed, story, message)
+            else:
+                failure.count += 1
+
+    return FuzzReport(told, time.monotonic() - starttime, list(failures.values()))
+
+
+class CoverageGuidedGenerator:
+    """
+    A generator of stories that aims to enter every state and to process every transition of a statechart.
+
+    Stories are told to interpreters of the statechart, and the states and transitions that are covered
+    by the resulting traces are recorded. A story that covers a new state or a new transition is kept in
+    the *corpus*, and new stories are obtained by randomly mutating the stories of the corpus (adding,
+    inserting, replacing or removing an item, or splicing two stories), in the style of AFL.
+
+    Iterating over this generator yields the stories that are added to the corpus. The iteration stops when
+    every state and every transition is covered, or when *patience* consecutive stories did not cover anything
+    new. A story that raises a *ContractError* or an *ExecutionError* is interrupted, and the states and
+    transitions covered before are taken into account.
+
+    :param statechart: statechart to interpret
+    :param items: items to pick from, see *random_stories_generator*
+    :param length: maximal length of the stories, or *len(items)*
+    :param patience: number of consecutive stories without new coverage after which the generation stops
+    :param seed: if specified, the generation is reproducible
+    :param evaluator_klass: an optional callable that returns an *Evaluator* instance, see *Interpreter*
+    :param initial_context: an optional initial context for the interpreters
+    :param ignore_contract: set to True to ignore contract checking
+    """
+
+    def __init__(self, statechart: Statechart, items, length: int=None, patience: int=1000, seed=None,
+                 evaluator_klass=None, initial_context: dict=None, ignore_contract: bool=False):
+        from sismic.interpreter import Interpreter
+
+        self._interpreter = Interpreter(statechart, evaluator_klass=evaluator_klass,
+                                        initial_context=initial_context, ignore_contract=ignore_contract)
+        self._items = list(items)
+        self._length = length if length else len(self._items)
+        self._patience = patience
+        self._random = random.Random(seed)
+
+        self.corpus = []  # Stories that covered something new, in order
+        self.executions = 0  # Number of stories that were told
+        self._entered = set()  # Names of the entered states
+        self._processed = {}  # id(transition) -> processed transition
+        self._favored = {}  # state name or id(transition) -> shortest story that covers it
+
+    @property
+    def statechart(self):
+        """
+        Statechart whose coverage is tracked
+        """
+        return self._interpreter.statechart
+
+    @property
+    def entered_states(self) -> list:
+        """
+        List of the names of the states that were entered, in lexicographic order.
+        """
+        return sorted(self._entered)
+
+    @property
+    def processed_transitions(self) -> list:
+        """
+        List of the transitions that were processed.
+        """
+        return list(self._processed.values())
+
+    @property
+    def complete(self) -> bool:
+        """
+        Boolean indicating whether every state was entered and every transition was processed.
+        """
+        return (len(self._entered) == len(self.statechart.states) and
+                len(self._processed) == len(self.statechart.transitions))
+
+    def execute(self, story: Story) -> bool:
+        """
+        Tell given story to a new interpreter and record the states and transitions it covers.
+
+        :param story: a story
+        :return: True if the story covered a new state or a new transition
+        """
+        interpreter = self._interpreter.fork()
+        entered, processed = set(), {}
+        self.executions += 1
+        try:
+            for macro_step in story.itertell(interpreter):
+                for step in macro_step.steps:
+                    entered.update(step.entered_states)
+                    if step.transition:
+                        processed[id(step.transition)] = step.transition
+        except (ContractError, ExecutionError):
+            pass
+
+        # Keep the shortest story that covers each state and transition
+        for key in list(entered) + list(processed):
+            favored = self._favored.get(key, None)
+            if favored is None or len(story) < len(favored):
+                self._favored[key] = story
+
+        covered = not entered.issubset(self._entered) or not processed.keys() <= self._processed.keys()
+        self._entered.update(entered)
+        self._processed.update(processed)
+        return covered
+
+    def mutate(self, story: Story) -> Story:
+        """
+        Return a random mutation of given story, obtained by applying one to three random operations.
+
+        :param story: a story
+        :return: a new story
+        """
+        rand, items = self._random, self._items
+        story = Story(story)
+        for _ in range(rand.choice([1, 1, 2, 3])):
+            operation = rand.randrange(8)
+            position = rand.randrange(len(story)) if story else 0
+            if operation < 4 or not story or (operation == 7 and not self.corpus):
+                story.append(rand.choice(items))
+            elif operation == 4:
+                story.insert(position, rand.choice(items))
+            elif operation == 5:
+                story[position] = rand.choice(items)
+            elif operation == 6:
+                del story[position]
+            else:
+                other = rand.choice(self.corpus)
+                story[position:] = other[rand.randrange(len(other) + 1):]
+        return Story(story[:self._length])
+
+    def __iter__(self):
+        unproductive = 0
+        while not self.complete and unproductive < self._patience:
+            story = self.mutate(self.__parent())
+            if self.execute(story):
+                unproductive = 0
+                self.corpus.append(story)
+                yield story
+            else:
+                unproductive += 1
+
+    def __parent(self) -> Story:
+        """
+        Return a story to mutate. As in AFL, the shortest story that covers a state or a transition is
+        chosen more often than the other stories of the corpus.
+        """
+        if not self.corpus:
+            return Story()
+        if self._random.random() < 0.8:
+            return self._random.choice(list(self._favored.values()))
+        return self._random.choice(self.corpus)
+
+    def __repr__(self):
+        return '{}({}, {} executions, {}/{} states, {}/{} transitions)'.format(
+            self.__class__.__name__, self.statechart, self.executions, len(self._entered),
+            len(self.statechart.states), len(self._processed), len(self.statechart.transitions))
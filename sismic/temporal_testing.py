@@ -1,5 +1,6 @@
-from sismic.model import Statechart, BasicState, FinalState, Transition, CompoundState, OrthogonalState
-from collections import defaultdict
+from sismic.model import Statechart, BasicState, FinalState, Transition, CompoundState, OrthogonalState, Event
+from sismic.exceptions import CodeEvaluationError, ConflictingTransitionsError, NonDeterminismError
+from collections import defaultdict, deque
 from uuid import uuid4
 
 
@@ -74,6 +75,18 @@ class Condition:
         """
         pass
 
+    def _node(self, depth: int):
+        """
+        Compiles this condition for a *Monitor*. Conditions that do not override this method can be used in
+        tester statecharts, but not in monitors.
+
+        :param depth: the depth of the state that would represent the condition in a tester statechart.
+        :return: a node of the monitor.
+        :raise NotImplementedError: if this condition cannot be monitored.
+        """
+        raise NotImplementedError('{} cannot be monitored, as it does not implement _node'.format(
+            self.__class__.__name__))
+
     def __invert__(self):
         """
         Inverts this condition.
@@ -135,6 +148,9 @@ class TrueCondition(Condition):
     def __repr__(self):
         return self.__class__.__name__ + "()"
 
+    def _node(self, depth: int):
+        return _TrueNode(depth)
+
 
 class FalseCondition(Condition):
     """
@@ -151,6 +167,9 @@ class FalseCondition(Condition):
     def __repr__(self):
         return self.__class__.__name__ + "()"
 
+    def _node(self, depth: int):
+        return Not(TrueCondition())._node(depth)
+
 
 class UndeterminedCondition(Condition):
     """
@@ -168,6 +187,9 @@ class UndeterminedCondition(Condition):
     def __repr__(self):
         return self.__class__.__name__ + "()"
 
+    def _node(self, depth: int):
+        return _UndeterminedNode(depth)
+
 
 class EnterAnyState(Condition):
     """
@@ -187,6 +209,9 @@ class EnterAnyState(Condition):
     def __repr__(self):
         return self.__class__.__name__ + '()'
 
+    def _node(self, depth: int):
+        return _EventNode(depth, Condition.STATE_ENTERED_EVENT)
+
 
 class EnterState(Condition):
     """
@@ -220,6 +245,9 @@ class EnterState(Condition):
         states_s = map(lambda x: "'{}'".format(x), self.states)
         return self.__class__.__name__ + '({})'.format(reduce(lambda x, y: x + ', ' + y, states_s))
 
+    def _node(self, depth: int):
+        return _EventNode(depth, Condition.STATE_ENTERED_EVENT, lambda event: event.state in self.states)
+
 
 class ExitState(Condition):
     """
@@ -253,6 +281,9 @@ class ExitState(Condition):
         states_s = map(lambda x: "'{}'".format(x), self.states)
         return self.__class__.__name__ + '({})'.format(reduce(lambda x, y: x + ', ' + y, states_s))
 
+    def _node(self, depth: int):
+        return _EventNode(depth, Condition.STATE_EXITED_EVENT, lambda event: event.state in self.states)
+
 
 class ExitAnyState(Condition):
     """
@@ -272,6 +303,9 @@ class ExitAnyState(Condition):
     def __repr__(self):
         return self.__class__.__name__ + '()'
 
+    def _node(self, depth: int):
+        return _EventNode(depth, Condition.STATE_EXITED_EVENT)
+
 
 class CheckGuard(Condition):
     """
@@ -302,6 +336,9 @@ class CheckGuard(Condition):
         statechart.add_transition(Transition(source=ip('test'), target=success_id, guard=self.guard))
         statechart.add_transition(Transition(source=ip('composite'), target=failure_id))
 
+    def _node(self, depth: int):
+        return _CheckGuardNode(depth, self.guard)
+
 
 class ConsumeEvent(Condition):
     """
@@ -333,6 +370,9 @@ class ConsumeEvent(Condition):
                                              event=Condition.CONSUMED_EVENT_EVENT,
                                              guard=condition))
 
+    def _node(self, depth: int):
+        return _EventNode(depth, Condition.CONSUMED_EVENT_EVENT, lambda event: event.event.name in self.events)
+
 
 class ExecutionStart(Condition):
     """
@@ -349,6 +389,9 @@ class ExecutionStart(Condition):
         statechart.add_state(BasicState(id), parent=parent_id)
         statechart.add_transition(Transition(source=id, target=success_id, event=Condition.EXECUTION_STARTED_EVENT))
 
+    def _node(self, depth: int):
+        return _EventNode(depth, Condition.EXECUTION_STARTED_EVENT)
+
 
 class ExecutionStop(Condition):
     """
@@ -365,6 +408,9 @@ class ExecutionStop(Condition):
         statechart.add_state(BasicState(id), parent=parent_id)
         statechart.add_transition(Transition(source=id, target=success_id, event=Condition.EXECUTION_STOPPED_EVENT))
 
+    def _node(self, depth: int):
+        return _EventNode(depth, Condition.EXECUTION_STOPPED_EVENT)
+
 
 class StartStep(Condition):
     """
@@ -381,6 +427,9 @@ class StartStep(Condition):
         statechart.add_state(BasicState(id), parent=parent_id)
         statechart.add_transition(Transition(source=id, target=success_id, event=Condition.STEP_STARTED_EVENT))
 
+    def _node(self, depth: int):
+        return _EventNode(depth, Condition.STEP_STARTED_EVENT)
+
 
 class EndStep(Condition):
     """
@@ -397,6 +446,9 @@ class EndStep(Condition):
         statechart.add_state(BasicState(id), parent=parent_id)
         statechart.add_transition(Transition(source=id, target=success_id, event=Condition.STEP_ENDED_EVENT))
 
+    def _node(self, depth: int):
+        return _EventNode(depth, Condition.STEP_ENDED_EVENT)
+
 
 class ConsumeAnyEvent(Condition):
     """
@@ -414,6 +466,9 @@ class ConsumeAnyEvent(Condition):
         statechart.add_state(BasicState(id), parent=parent_id)
         statechart.add_transition(Transition(source=id, target=success_id, event=Condition.CONSUMED_EVENT_EVENT))
 
+    def _node(self, depth: int):
+        return _EventNode(depth, Condition.CONSUMED_EVENT_EVENT)
+
 
 class ConsumeAnyEventBut(Condition):
     """
@@ -437,7 +492,7 @@ class ConsumeAnyEventBut(Condition):
     def add_to(self, statechart: Statechart, id: str, parent_id: str, status_id: str, success_id: str, failure_id: str):
         from functools import reduce
 
-        conditions = map(lambda x: "(not(event.event.name == '{}'))", self.events)
+        conditions = map(lambda x: "(not(event.event.name == '{}'))".format(x), self.events)
         condition = reduce(lambda x, y: x + ' and ' + y, conditions)
 
         statechart.add_state(BasicState(id), parent=parent_id)
@@ -446,6 +501,10 @@ class ConsumeAnyEventBut(Condition):
                                              event=Condition.CONSUMED_EVENT_EVENT,
                                              guard=condition))
 
+    def _node(self, depth: int):
+        return _EventNode(depth, Condition.CONSUMED_EVENT_EVENT,
+                          lambda event: event.event.name not in self.events)
+
 
 class TransitionProcess(Condition):
     """
@@ -484,12 +543,22 @@ class TransitionProcess(Condition):
         elif self.event == '':
             condition_event = '(event.event is None)'
         else:
-            condition_event = '(event.event.name == "{}")'.format(self.event)
+            condition_event = '(event.event is not None and event.event.name == "{}")'.format(self.event)
 
         statechart.add_state(BasicState(id), parent=parent_id)
         statechart.add_transition(Transition(source=id, target=success_id, event=Condition.TRANSITION_PROCESSED_EVENT,
                                              guard=condition_source + ' and ' + condition_target + ' and ' + condition_event))
 
+    def _node(self, depth: int):
+        def predicate(event):
+            return ((self.source is None or event.source == self.source) and
+                    (self.target is None or event.target == self.target) and
+                    (self.event is None or
+                     (event.event is None if self.event == '' else
+                      event.event is not None and event.event.name == self.event)))
+
+        return _EventNode(depth, Condition.TRANSITION_PROCESSED_EVENT, predicate)
+
 
 class And(Condition):
     """
@@ -580,6 +649,9 @@ class And(Condition):
     def __repr__(self):
         return self.__class__.__name__ + "({}, {})".format(self.a, self.b)
 
+    def _node(self, depth: int):
+        return _ParallelNode(depth, self.a._node(depth + 2), self.b._node(depth + 2), _AND_PAYLOAD)
+
 
 class Or(Condition):
     """
@@ -664,6 +736,9 @@ class Or(Condition):
     def __repr__(self):
         return self.__class__.__name__ + "({}, {})".format(self.a, self.b)
 
+    def _node(self, depth: int):
+        return _ParallelNode(depth, self.a._node(depth + 2), self.b._node(depth + 2), _OR_PAYLOAD)
+
 
 class Xor(Condition):
     """
@@ -772,6 +847,9 @@ class Xor(Condition):
     def __repr__(self):
         return self.__class__.__name__ + "({}, {})".format(self.a, self.b)
 
+    def _node(self, depth: int):
+        return _ParallelNode(depth, self.a._node(depth + 2), self.b._node(depth + 2), _XOR_PAYLOAD)
+
 
 class Not(Condition):
     """
@@ -804,6 +882,9 @@ class Not(Condition):
     def __repr__(self):
         return self.__class__.__name__ + '({})'.format(self.condition)
 
+    def _node(self, depth: int):
+        return _NotNode(depth, self.condition._node(depth + 1))
+
 
 class Then(Condition):
     """
@@ -847,6 +928,9 @@ class Then(Condition):
     def __repr__(self):
         return self.__class__.__name__ + "({}, {})".format(self.a, self.b)
 
+    def _node(self, depth: int):
+        return _ThenNode(depth, self.a._node(depth + 1), self.b._node(depth + 1))
+
 
 class Before(Condition):
     """
@@ -921,6 +1005,9 @@ class Before(Condition):
     def __repr__(self):
         return self.__class__.__name__ + "({}, {})".format(self.a, self.b)
 
+    def _node(self, depth: int):
+        return _ParallelNode(depth, self.a._node(depth + 2), self.b._node(depth + 2), _BEFORE_PAYLOAD)
+
 
 class During(Condition):
     """
@@ -997,6 +1084,9 @@ class During(Condition):
     def __repr__(self):
         return self.__class__.__name__ + "({}, {}, {})".format(self.cond, self.start, self.length)
 
+    def _node(self, depth: int):
+        return _DuringNode(depth, self.cond._node(depth + 2), self.start, self.length)
+
 
 class IfElse(Condition):
     """
@@ -1030,6 +1120,9 @@ class IfElse(Condition):
     def __repr__(self):
         return self.__class__.__name__ + "({}, {}, {})".format(self.condition, self.a, self.b)
 
+    def _node(self, depth: int):
+        return Or(And(self.condition, self.a), And(Not(self.condition), self.b))._node(depth)
+
 
 class DelayedCondition(Condition):
     """
@@ -1063,6 +1156,9 @@ class DelayedCondition(Condition):
     def __repr__(self):
         return self.__class__.__name__ + "({}, {})".format(self.condition, self.delay)
 
+    def _node(self, depth: int):
+        return _DelayedNode(depth, self.condition._node(depth), self.delay)
+
 
 class DelayedTrueCondition(Condition):
     """
@@ -1088,6 +1184,9 @@ class DelayedTrueCondition(Condition):
     def __repr__(self):
         return self.__class__.__name__ + '({})'.format(self.delay)
 
+    def _node(self, depth: int):
+        return DelayedCondition(TrueCondition(), self.delay)._node(depth)
+
 
 class DelayedFalseCondition(Condition):
     """
@@ -1109,6 +1208,9 @@ class DelayedFalseCondition(Condition):
     def __repr__(self):
         return self.__class__.__name__ + '({})'.format(self.delay)
 
+    def _node(self, depth: int):
+        return DelayedCondition(FalseCondition(), self.delay)._node(depth)
+
 
 class ActiveState(Condition):
     """
@@ -1151,6 +1253,9 @@ class ActiveState(Condition):
     def __repr__(self):
         return self.__class__.__name__ + '("{}")'.format(self.state)
 
+    def _node(self, depth: int):
+        return _ActiveStateNode(depth, self.state)
+
 
 class InactiveState(Condition):
     """
@@ -1179,6 +1284,9 @@ class InactiveState(Condition):
     def __repr__(self):
         return self.__class__.__name__ + '("{}")'.format(self.state)
 
+    def _node(self, depth: int):
+        return Not(ActiveState(self.state))._node(depth)
+
 
 class SynchronousCondition(Condition):
     """
@@ -1223,6 +1331,9 @@ class SynchronousCondition(Condition):
     def __repr__(self):
         return self.__class__.__name__ + '("{}")'.format(self.condition)
 
+    def _node(self, depth: int):
+        return _SynchronousNode(depth, self.condition._node(depth + 1))
+
 
 def _add_parallel_condition(statechart: Statechart,
                             id: str,
@@ -1335,6 +1446,26 @@ class TemporalExpression:
         """
         pass
 
+    def _node(self):
+        """
+        Compiles this expression for a *Monitor*.
+
+        :return: the root node of the monitor.
+        :raise NotImplementedError: if this expression cannot be monitored.
+        """
+        raise NotImplementedError('{} cannot be monitored, as it does not implement _node'.format(
+            self.__class__.__name__))
+
+    def generate_monitor(self, initial_context: dict=None) -> 'Monitor':
+        """
+        Generates a runtime monitor for this expression. A monitor gives the same verdict than an interpreter
+        of the statechart generated by *generate_statechart*, but is far cheaper to execute (see *Monitor*).
+
+        :param initial_context: an optional initial context, used to evaluate the guards of *CheckGuard* conditions.
+        :return: a *Monitor* instance.
+        """
+        return Monitor(self, initial_context)
+
     def __repr__(self):
         return self.__class__.__name__ + "({}, {}, {})".format(self.decision,
                                                                self.premise.__repr__(),
@@ -1408,6 +1539,9 @@ class FirstTime(TemporalExpression):
 
         return statechart
 
+    def _node(self):
+        return _FirstTimeNode(self.decision, SynchronousCondition(self.premise)._node(3), self.consequence._node(3))
+
 
 class EveryTime(TemporalExpression):
     """
@@ -1477,6 +1611,10 @@ class EveryTime(TemporalExpression):
 
         return statechart
 
+    def _node(self):
+        return _FirstTimeNode(self.decision, SynchronousCondition(self.premise)._node(3), self.consequence._node(4),
+                              every_time=True)
+
 
 class LastTime(TemporalExpression):
     """
@@ -1578,6 +1716,9 @@ class LastTime(TemporalExpression):
 
         return statechart
 
+    def _node(self):
+        return _LastTimeNode(self.decision, SynchronousCondition(self.premise)._node(3), self.consequence._node(4))
+
 
 class AtLeastOnce(TemporalExpression):
     """
@@ -1662,3 +1803,719 @@ class AtLeastOnce(TemporalExpression):
                                              event=Condition.EXECUTION_STOPPED_EVENT))
 
         return statechart
+
+    def _node(self):
+        return _AtLeastOnceNode(self.decision, SynchronousCondition(self.premise)._node(3), self.consequence._node(3))
+
+
+class Monitor:
+    """
+    A runtime monitor for a temporal expression, see *TemporalExpression.generate_monitor*.
+
+    A monitor gives the same verdict than an interpreter of the tester statechart generated by
+    *generate_statechart*, but it does not interpret a statechart: the conditions of the expression are compiled
+    into small automata that are directly fed with the events that are sent to tester statecharts (see
+    *ExecutionWatcher* and *teststory_from_trace*). As an interpreter, a monitor has a *time* attribute and
+    provides *queue*, *execute_once*, *execute* and *iterexecute* methods. Attribute *final* is True if the
+    expression is verified.
+
+    A monitor mimics the steps of an interpreter, and raises the same *NonDeterminismError* and
+    *ConflictingTransitionsError* exceptions. The only differences are:
+
+    - If the two conditions of a *Before* condition are verified during the same step, at the same depth in the
+      tester statechart, *Before* is not verified, as documented. A tester statechart considers them in an order
+      that depends on the (random) names of its states.
+    - The guard of a *CheckGuard* condition is evaluated in the context of the monitor. Variable *time* is
+      exposed, but the functions of a *PythonEvaluator* (eg. *active* or *after*) are not.
+
+    :param expression: a temporal expression
+    :param initial_context: an optional initial context, used to evaluate the guards of *CheckGuard* conditions
+    """
+
+    def __init__(self, expression: 'TemporalExpression', initial_context: dict=None):
+        self.time = 0
+        self._context = initial_context if initial_context else {}
+        self._expression = expression
+        self._root = expression._node()
+        self._events = deque()  # External events, preceded by internal (node, value) pairs
+        self._sent = []  # Internal (depth, node, value) events sent during the current step
+        self._source = 0  # Depth of the source of the last processed transition
+        self._step = 0  # Number of the current step
+        self._initialized = False
+
+        # Status of the states of ActiveState conditions
+        nodes = [self._root]
+        for node in nodes:
+            nodes.extend(node.children)
+        self._active_states = {node.state: False for node in nodes if isinstance(node, _ActiveStateNode)}
+
+    @property
+    def context(self) -> dict:
+        """
+        The context used to evaluate the guards of *CheckGuard* conditions.
+        """
+        return self._context
+
+    @property
+    def final(self) -> bool:
+        """
+        Boolean indicating whether the expression is verified, ie. whether the tester statechart would be
+        in a final configuration.
+        """
+        return self._root.rule is not None and self._root.rule == self._root.decision
+
+    def queue(self, event: Event):
+        """
+        Queue an event to this monitor. Events are ignored once the verdict is known.
+
+        :param event: an *Event* instance
+        :return: *self* so it can be chained.
+        """
+        if self._root.rule is None:
+            self._events.append(event)
+        return self
+
+    def _send(self, node: '_Node', value):
+        """
+        Send an internal event to given node. The source of the last processed transition determines
+        the order in which the internal events sent during a step are processed (see *Interpreter._sort_transitions*).
+        """
+        self._sent.append((self._source, node, value))
+
+    def execute_once(self) -> bool:
+        """
+        Process the eventless transitions, or the next internal event, or the next queued event.
+
+        :return: False if nothing happened
+        """
+        if not self._initialized:
+            self._initialized = True
+            self._root.enter(self)
+            return True
+
+        self._step += 1
+        root = self._root
+        if root.rule is None and root.eventless(self):
+            if self._sent:
+                self._flush()
+            return True
+        if not self._events:
+            return False
+
+        event = self._events.popleft()
+        if isinstance(event, tuple):
+            node, value = event
+            if root.rule is None and node.active:
+                node.receive(self, value)
+        else:
+            tracked = False
+            if event.name in (Condition.STATE_ENTERED_EVENT, Condition.STATE_EXITED_EVENT):
+                entered = event.name == Condition.STATE_ENTERED_EVENT
+                state = getattr(event, 'state', None)
+                tracked = self._active_states.get(state, entered) != entered
+                if tracked:
+                    self._active_states[state] = entered
+            if root.rule is None:
+                root.dispatch(self, event)
+                if tracked and root.rule is not None:
+                    raise ConflictingTransitionsError(
+                        'Conflicting transitions: {} decides the rule while the status of {} changes'
+                        .format(event, state))
+        if self._sent:
+            self._flush()
+        return True
+
+    def _flush(self):
+        # Deepest sources are processed first, and internal events are prepended to the queue
+        self._sent.sort(key=lambda sent: -sent[0])
+        for _, node, value in self._sent:
+            self._events.appendleft((node, value))
+        self._sent.clear()
+
+    def iterexecute(self, max_steps: int=-1):
+        """
+        Repeatedly call *execute_once* until nothing happens, and lazily yield True for each step.
+
+        :param max_steps: An upper bound on the number steps. Default is -1, no limit.
+        :return: a generator of True values
+        """
+        i = 0
+        while max_steps != i and self.execute_once():
+            i += 1
+            yield True
+
+    def execute(self, max_steps: int=-1) -> int:
+        """
+        Repeatedly call *execute_once* until nothing happens.
+
+        :param max_steps: An upper bound on the number steps. Default is -1, no limit.
+        :return: the number of steps
+        """
+        return sum(self.iterexecute(max_steps))
+
+    def __repr__(self):
+        return '{}({})'.format(self.__class__.__name__, self._expression)
+
+
+class _Node:
+    """
+    Part of a *Monitor* that represents a condition. A node is entered and exited as the states that represent
+    the condition in a tester statechart, and calls the *resolved* method of its parent when the condition
+    becomes verified or not verified. As in a statechart, a node that was entered during the current step
+    does not react before the next step.
+
+    :param depth: depth of the state that represents the condition in the tester statechart
+    """
+
+    def __init__(self, depth: int):
+        self.depth = depth
+        self.parent = None
+        self.children = []
+        self.active = False
+        self.since = 0  # Step at which the node was entered
+
+    def _child(self, node: '_Node') -> '_Node':
+        node.parent = self
+        self.children.append(node)
+        return node
+
+    def enter(self, monitor: Monitor):
+        self.active = True
+        self.since = monitor._step
+
+    def exit(self):
+        self.active = False
+
+    def holds_root(self) -> bool:
+        """
+        Return True if the state that represents the condition is active (see *DelayedCondition*).
+        """
+        return self.active
+
+    def eventless(self, monitor: Monitor) -> bool:
+        """
+        Process the eventless transitions, and return True if one of them was processed.
+        """
+        return False
+
+    def dispatch(self, monitor: Monitor, event: Event) -> bool:
+        """
+        Process the transitions for given event, and return True if one of them was processed.
+        """
+        return False
+
+    def receive(self, monitor: Monitor, value):
+        """
+        Process an internal event that was sent to this node.
+        """
+
+    def resolved(self, monitor: Monitor, child: '_Node', verdict: bool):
+        """
+        Called by a child when its condition is verified (*verdict* is True) or not verified.
+        """
+        self.parent.resolved(monitor, self, verdict)
+
+    def _fire(self, monitor: Monitor, verdict: bool, depth: int=None):
+        """
+        Process a transition, from a state of given depth (by default, the one of this node), to the state
+        that follows the verification of the condition.
+        """
+        monitor._source = self.depth if depth is None else depth
+        self.parent.resolved(monitor, self, verdict)
+
+    def __repr__(self):
+        return self.__class__.__name__
+
+
+class _TrueNode(_Node):
+    def eventless(self, monitor):
+        if self.since < monitor._step:
+            self._fire(monitor, True)
+            return True
+        return False
+
+
+class _UndeterminedNode(_Node):
+    pass
+
+
+class _EventNode(_Node):
+    """
+    A condition that is verified when an event of given name, for which *predicate* holds, is received.
+    """
+
+    def __init__(self, depth: int, name: str, predicate=None):
+        super().__init__(depth)
+        self.name = name
+        self.predicate = predicate
+
+    def dispatch(self, monitor, event):
+        if (event.name == self.name and self.since < monitor._step and
+                (self.predicate is None or self.predicate(event))):
+            self._fire(monitor, True)
+            return True
+        return False
+
+
+class _CheckGuardNode(_Node):
+    def __init__(self, depth: int, guard: str):
+        super().__init__(depth)
+        self.guard = guard
+        self.code = compile(guard, '<string>', 'eval')
+        self.checking = False  # True once the state that represents the condition was exited
+
+    def enter(self, monitor):
+        super().enter(monitor)
+        self.checking = False
+
+    def holds_root(self):
+        return self.active and not self.checking
+
+    def eventless(self, monitor):
+        if self.since == monitor._step:
+            return False
+        if not self.checking:
+            self.checking = True
+            self.since = monitor._step
+            return True
+
+        try:
+            verdict = bool(eval(self.code, {'time': monitor.time, 'event': None}, monitor._context))
+        except Exception as e:
+            raise CodeEvaluationError('The above exception occurred while evaluating:\n{}'.format(self.guard)) from e
+        self._fire(monitor, verdict, self.depth + 1 if verdict else self.depth)
+        return True
+
+
+class _ActiveStateNode(_Node):
+    def __init__(self, depth: int, state: str):
+        super().__init__(depth)
+        self.state = state
+
+    def eventless(self, monitor):
+        if self.since < monitor._step:
+            self._fire(monitor, monitor._active_states[self.state])
+            return True
+        return False
+
+
+class _NotNode(_Node):
+    def __init__(self, depth: int, condition: _Node):
+        super().__init__(depth)
+        self.condition = self._child(condition)
+
+    def enter(self, monitor):
+        super().enter(monitor)
+        self.condition.enter(monitor)
+
+    def exit(self):
+        super().exit()
+        self.condition.exit()
+
+    def eventless(self, monitor):
+        return self.condition.eventless(monitor)
+
+    def dispatch(self, monitor, event):
+        return self.condition.dispatch(monitor, event)
+
+    def resolved(self, monitor, child, verdict):
+        self.parent.resolved(monitor, self, not verdict)
+
+
+class _ThenNode(_Node):
+    def __init__(self, depth: int, a: _Node, b: _Node):
+        super().__init__(depth)
+        self.a = self._child(a)
+        self.b = self._child(b)
+        self.current = a
+
+    def enter(self, monitor):
+        super().enter(monitor)
+        self.current = self.a
+        self.a.enter(monitor)
+
+    def exit(self):
+        super().exit()
+        self.current.exit()
+
+    def eventless(self, monitor):
+        return self.current.eventless(monitor)
+
+    def dispatch(self, monitor, event):
+        return self.current.dispatch(monitor, event)
+
+    def resolved(self, monitor, child, verdict):
+        if child is self.a and verdict:
+            self.a.exit()
+            self.current = self.b
+            self.b.enter(monitor)
+        else:
+            self.parent.resolved(monitor, self, verdict)
+
+
+class _SynchronousNode(_Node):
+    def __init__(self, depth: int, condition: _Node):
+        super().__init__(depth)
+        self.condition = self._child(condition)
+        self.verdict = None  # Verdict of the condition, until the end of the step
+        self.verdict_since = 0
+
+    def enter(self, monitor):
+        super().enter(monitor)
+        self.verdict = None
+        self.condition.enter(monitor)
+
+    def exit(self):
+        super().exit()
+        self.condition.exit()
+
+    def eventless(self, monitor):
+        return self.verdict is None and self.condition.eventless(monitor)
+
+    def dispatch(self, monitor, event):
+        if self.verdict is None:
+            return self.condition.dispatch(monitor, event)
+        if event.name == Condition.STEP_ENDED_EVENT and self.verdict_since < monitor._step:
+            self._fire(monitor, self.verdict, self.depth + 1)
+            return True
+        return False
+
+    def resolved(self, monitor, child, verdict):
+        self.condition.exit()
+        self.verdict = verdict
+        self.verdict_since = monitor._step
+
+
+class _DelayedNode(_Node):
+    def __init__(self, depth: int, condition: _Node, delay: float):
+        super().__init__(depth)
+        self.condition = self._child(condition)
+        self.delay = delay
+        self.waiting = True
+        self.entry_time = 0
+
+    def enter(self, monitor):
+        super().enter(monitor)
+        self.waiting = True
+        self.entry_time = monitor.time
+
+    def exit(self):
+        super().exit()
+        self.condition.exit()
+
+    def holds_root(self):
+        # The condition is a sibling of the state that represents the delay
+        return self.active and self.waiting
+
+    def eventless(self, monitor):
+        if not self.waiting:
+            return self.condition.eventless(monitor)
+        if self.since < monitor._step and monitor.time - self.delay >= self.entry_time:
+            self.waiting = False
+            self.condition.enter(monitor)
+            return True
+        return False
+
+    def dispatch(self, monitor, event):
+        return not self.waiting and self.condition.dispatch(monitor, event)
+
+
+class _ParallelNode(_Node):
+    """
+    Two conditions that are checked in parallel, and whose verdicts are combined by a payload
+    (see *_add_parallel_condition*). The payload is given by *table*, that maps each of its states to a dict
+    from (verdict is the one of a, verdict) pairs to either a state or the verdict of the combination.
+    """
+
+    def __init__(self, depth: int, a: _Node, b: _Node, table: dict):
+        super().__init__(depth)
+        self.a = self._child(a)
+        self.b = self._child(b)
+        self.table = table
+        self.state = 'waiting'
+
+    def enter(self, monitor):
+        super().enter(monitor)
+        self.state = 'waiting'
+        self.a.enter(monitor)
+        self.b.enter(monitor)
+
+    def exit(self):
+        super().exit()
+        self.a.exit()
+        self.b.exit()
+
+    def eventless(self, monitor):
+        fired = self.a.active and self.a.eventless(monitor)
+        return (self.b.active and self.b.eventless(monitor)) or fired
+
+    def dispatch(self, monitor, event):
+        fired = self.a.active and self.a.dispatch(monitor, event)
+        return (self.b.active and self.b.dispatch(monitor, event)) or fired
+
+    def resolved(self, monitor, child, verdict):
+        child.exit()
+        monitor._send(self, (child is self.a, verdict))
+
+    def receive(self, monitor, value):
+        # No other transition is processed during this step, so its source does not matter
+        target = self.table[self.state].get(value, None)
+        if isinstance(target, bool):
+            self._fire(monitor, target)
+        elif target is not None:
+            self.state = target
+
+
+_AND_PAYLOAD = {
+    'waiting': {(True, True): 'partial', (False, True): 'partial', (True, False): False, (False, False): False},
+    'partial': {(True, True): True, (False, True): True, (True, False): False, (False, False): False},
+}
+
+_OR_PAYLOAD = {
+    'waiting': {(True, False): 'partial', (False, False): 'partial', (True, True): True, (False, True): True},
+    'partial': {(True, False): False, (False, False): False, (True, True): True, (False, True): True},
+}
+
+_XOR_PAYLOAD = {
+    'waiting': {(True, True): 'a_success', (True, False): 'a_failure',
+                (False, True): 'b_success', (False, False): 'b_failure'},
+    'a_success': {(False, False): True, (False, True): False},
+    'a_failure': {(False, True): True, (False, False): False},
+    'b_success': {(True, False): True, (True, True): False},
+    'b_failure': {(True, True): True, (True, False): False},
+}
+
+_BEFORE_PAYLOAD = {
+    'waiting': {(True, True): True, (False, True): False, (True, False): False},
+}
+
+
+class _DuringNode(_Node):
+    def __init__(self, depth: int, condition: _Node, start: float, length: float):
+        super().__init__(depth)
+        self.condition = self._child(condition)
+        self.start = start
+        self.length = length
+        self.valid = False  # State of the time block
+        self.valid_since = 0
+        self.entry_time = 0
+
+    def enter(self, monitor):
+        super().enter(monitor)
+        self.valid = False
+        self.valid_since = monitor._step
+        self.entry_time = monitor.time
+        self.condition.enter(monitor)
+
+    def exit(self):
+        super().exit()
+        self.condition.exit()
+
+    def eventless(self, monitor):
+        fired = self.condition.active and self.condition.eventless(monitor)
+        if self.valid_since == monitor._step:
+            return fired
+        if not self.valid and monitor.time - self.start >= self.entry_time:
+            self.valid = True
+            self.valid_since = monitor._step
+            self.entry_time = monitor.time
+            return True
+        if self.valid and monitor.time - self.length >= self.entry_time:
+            if fired:
+                raise ConflictingTransitionsError('Conflicting transitions: the condition of {} is verified when '
+                                                  'its time interval expires'.format(self))
+            self._fire(monitor, False, self.depth + 2)
+            return True
+        return fired
+
+    def dispatch(self, monitor, event):
+        return self.condition.active and self.condition.dispatch(monitor, event)
+
+    def resolved(self, monitor, child, verdict):
+        child.exit()
+        monitor._send(self, verdict)
+
+    def receive(self, monitor, value):
+        self._fire(monitor, value and self.valid, self.depth + 2)
+
+
+class _ExpressionNode(_Node):
+    """
+    Root node of a *Monitor*. Attribute *rule* is set to True or False when the rule is satisfied
+    or not satisfied.
+    """
+
+    def __init__(self, decision: bool, premise: _Node, consequence: _Node):
+        super().__init__(1)
+        self.decision = decision
+        self.premise = self._child(premise)
+        self.consequence = self._child(consequence)
+        self.rule = None
+
+    def enter(self, monitor):
+        super().enter(monitor)
+        self.rule = None
+        self.premise.enter(monitor)
+
+    def _rule(self, satisfied: bool):
+        self.premise.exit()
+        self.consequence.exit()
+        self.rule = satisfied
+
+    def _stop(self, monitor: Monitor, node: _Node, event: Event, satisfied: bool) -> bool:
+        """
+        Dispatch given event to given node, and process the transition that is triggered by
+        *Condition.EXECUTION_STOPPED_EVENT* from the state that represents the condition of this node, if any.
+        The transitions of its descendants have priority.
+        """
+        outer = event.name == Condition.EXECUTION_STOPPED_EVENT and node.holds_root() and node.since < monitor._step
+        fired = node.dispatch(monitor, event)
+        if outer:
+            if fired and not node.children:
+                raise NonDeterminismError('Non-determinist choice between transitions from {}'.format(node))
+            if not fired:
+                self._rule(satisfied)
+                return True
+        return fired
+
+
+class _FirstTimeNode(_ExpressionNode):
+    def __init__(self, decision: bool, premise: _Node, consequence: _Node, every_time: bool=False):
+        super().__init__(decision, premise, consequence)
+        self.every_time = every_time
+
+    def eventless(self, monitor):
+        if self.premise.active:
+            return self.premise.eventless(monitor)
+        return self.consequence.active and self.consequence.eventless(monitor)
+
+    def dispatch(self, monitor, event):
+        if self.premise.active:
+            return self._stop(monitor, self.premise, event, True)
+        return self.consequence.active and self._stop(monitor, self.consequence, event, False)
+
+    def resolved(self, monitor, child, verdict):
+        child.exit()
+        if child is self.premise:
+            (self.consequence if verdict else self.premise).enter(monitor)
+        elif verdict and self.every_time:
+            self.premise.enter(monitor)
+        else:
+            self._rule(verdict)
+
+
+class _LastTimeNode(_ExpressionNode):
+    def __init__(self, decision: bool, premise: _Node, consequence: _Node):
+        super().__init__(decision, premise, consequence)
+        self.premise_success = False
+        self.premise_since = 0
+        self.waiting = True  # Until the premise is verified
+        self.verdict = None  # Verdict of the consequence
+        self.verdict_since = 0
+
+    def enter(self, monitor):
+        super().enter(monitor)
+        self.premise_success = False
+        self.waiting = True
+        self.verdict = None
+
+    def eventless(self, monitor):
+        fired = False
+        if self.premise_success:
+            if self.premise_since < monitor._step:
+                self.premise_success = False
+                self.premise.enter(monitor)
+                fired = True
+        elif self.premise.active:
+            fired = self.premise.eventless(monitor)
+        return (self.consequence.active and self.consequence.eventless(monitor)) or fired
+
+    def dispatch(self, monitor, event):
+        premise_fired = self.premise.active and self.premise.dispatch(monitor, event)
+        consequence_fired = False
+        if self.consequence.active:
+            consequence_fired = self._stop(monitor, self.consequence, event, False)
+        elif event.name == Condition.EXECUTION_STOPPED_EVENT:
+            if self.waiting:
+                self._rule(True)
+                consequence_fired = True
+            elif self.verdict is not None and self.verdict_since < monitor._step:
+                self._rule(self.verdict)
+                consequence_fired = True
+
+        if premise_fired and self.rule is not None:
+            raise ConflictingTransitionsError('Conflicting transitions: the premise of {} evolves while the rule '
+                                              'is decided'.format(self))
+        return premise_fired or consequence_fired
+
+    def resolved(self, monitor, child, verdict):
+        child.exit()
+        if child is self.consequence:
+            self.verdict = verdict
+            self.verdict_since = monitor._step
+        elif verdict:
+            self.premise_success = True
+            self.premise_since = monitor._step
+            monitor._send(self, None)
+        else:
+            self.premise.enter(monitor)
+
+    def receive(self, monitor, value):
+        # The consequence is checked again
+        self.waiting = False
+        self.verdict = None
+        self.consequence.exit()
+        self.consequence.enter(monitor)
+
+
+class _AtLeastOnceNode(_ExpressionNode):
+    def __init__(self, decision: bool, premise: _Node, consequence: _Node):
+        super().__init__(decision, premise, consequence)
+        self.premise_success = False
+        self.premise_since = 0
+        self.checked = False
+
+    def enter(self, monitor):
+        super().enter(monitor)
+        self.premise_success = False
+        self.checked = False
+
+    def eventless(self, monitor):
+        if self.premise_success:
+            if self.premise_since == monitor._step:
+                return False
+            self.premise_success = False
+            monitor._source = self.premise.depth
+            monitor._send(self, None)
+            self.consequence.enter(monitor)
+            return True
+        if self.premise.active:
+            return self.premise.eventless(monitor)
+        return self.consequence.active and self.consequence.eventless(monitor)
+
+    def dispatch(self, monitor, event):
+        if self.premise.active:
+            fired = self.premise.dispatch(monitor, event)
+        else:
+            fired = self.consequence.active and self.consequence.dispatch(monitor, event)
+
+        if event.name == Condition.EXECUTION_STOPPED_EVENT:
+            if fired:
+                raise ConflictingTransitionsError('Conflicting transitions: the premise or the consequence of {} '
+                                                  'evolves while the rule is decided'.format(self))
+            self._rule(not self.checked)
+            return True
+        return fired
+
+    def resolved(self, monitor, child, verdict):
+        child.exit()
+        if child is self.consequence and verdict:
+            self._rule(True)
+        elif child is self.premise and verdict:
+            self.premise_success = True
+            self.premise_since = monitor._step
+        else:
+            self.premise.enter(monitor)
+
+    def receive(self, monitor, value):
+        self.checked = True
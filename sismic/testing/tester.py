@@ -1,6 +1,7 @@
 from sismic.stories import Story, Pause
 from sismic.model import Event, Statechart, MacroStep
 from sismic.interpreter import Interpreter
+from sismic.temporal_testing import TemporalExpression, Monitor
 from sismic import exceptions
 
 __all__ = ['ExecutionWatcher', 'teststory_from_trace']
@@ -34,7 +35,8 @@ class ExecutionWatcher:
 
     It provides a method, namely *watch_with* which takes a tester statechart
     (and a set of optional parameters that can be used to tune the interpreter that will be built upon this tester statechart)
-    and returns the resulting *Interpreter* instance for this tester.
+    and returns the resulting *Interpreter* instance for this tester. Method *monitor_with* takes a temporal expression
+    and returns a *Monitor* instance, that gives the same verdict than the tester statechart of this expression.
 
     If started (using *start*), whenever something happens during the execution of the tested interpreter, events are
     automatically sent to every associated tester statecharts.
@@ -87,6 +89,24 @@ class ExecutionWatcher:
 
         return tester
 
+    def monitor_with(self, expression: TemporalExpression, initial_context: dict=None) -> Monitor:
+        """
+        Watch the execution of the tested interpreter with a runtime monitor for given temporal expression.
+        The monitor gives the same verdict than the tester statechart generated by the expression, but is
+        far cheaper to execute (see *TemporalExpression.generate_monitor*).
+
+        :param expression: a temporal expression (instance of *TemporalExpression*)
+        :param initial_context: an optional initial context for the monitor
+        :return: the *Monitor* instance for given expression.
+        """
+        context = initial_context if initial_context else {}
+        context['context'] = ExecutionWatcher.DynamicContext(self._tested)
+
+        monitor = expression.generate_monitor(initial_context=context)
+        self._testers.append(monitor)
+
+        return monitor
+
     def start(self):
         """
         Send a *started* event to the tester statecharts, and starts watching the execution of
@@ -0,0 +1,95 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import os
+import pickle
+
+from sismic.exceptions import ContractError
+from sismic.interpreter import Interpreter
+from sismic.model import Statechart
+
+__all__ = ['worker_setup', 'run_task', 'worker_interpreter', 'run_in_pool', 'failure_signature']
+
+
+_worker_setup = None  # Setup of the interpreter of a worker process
+_worker_interpreter = None  # Interpreter of a worker process, forked for each task
+
+
+def worker_setup(statechart: Statechart, interpreter_kwargs: dict) -> bytes:
+    """
+    Return what a worker process needs to create its interpreter, to be sent with each task (see *run_task*).
+    The statechart is pickled once, and a process only unpickles it for the first task it receives.
+
+    :param statechart: statechart to interpret
+    :param interpreter_kwargs: additional keyword arguments for the interpreter
+    :return: a *bytes* instance
+    """
+    return pickle.dumps((statechart, interpreter_kwargs), pickle.HIGHEST_PROTOCOL)
+
+
+def run_task(setup: bytes, function, args: tuple):
+    """
+    Call given function with given arguments in a worker process, after creating the interpreter of
+    this process if it was not created for the same setup.
+
+    :param setup: a value returned by *worker_setup*
+    :param function: a picklable function, that can use *worker_interpreter*
+    :param args: arguments for this function
+    :return: the value returned by the function
+    """
+    global _worker_setup, _worker_interpreter
+    if setup != _worker_setup:
+        statechart, interpreter_kwargs = pickle.loads(setup)
+        _worker_interpreter = Interpreter(statechart, **interpreter_kwargs)
+        _worker_setup = setup
+    return function(*args)
+
+
+def worker_interpreter() -> Interpreter:
+    """
+    Return the interpreter of the current worker process, created by *run_task*.
+    The tasks are expected to fork it rather than to execute it.
+
+    :return: an *Interpreter* instance
+    """
+    return _worker_interpreter
+
+
+def run_in_pool(statechart: Statechart, interpreter_kwargs: dict, max_workers: int, tasks):
+    """
+    Run the tasks in a pool of processes, and yield their results in the order of the tasks.
+    At most two tasks per process are pending at any time.
+
+    :param statechart: statechart to interpret
+    :param interpreter_kwargs: additional keyword arguments for the interpreter of each process
+    :param max_workers: number of processes, by default the number of processors
+    :param tasks: an iterable of (function, arguments) pairs, see *run_task*
+    :return: a generator of the values returned by the tasks
+    """
+    max_workers = max_workers if max_workers else (os.cpu_count() or 1)
+    setup = worker_setup(statechart, interpreter_kwargs)
+    tasks = iter(tasks)
+
+    with ProcessPoolExecutor(max_workers) as executor:
+        pending = deque()  # Futures, in the order of the tasks
+        for function, args in islice(tasks, 2 * max_workers):
+            pending.append(executor.submit(run_task, setup, function, args))
+        while pending:
+            result = pending.popleft().result()
+            for function, args in islice(tasks, 1):
+                pending.append(executor.submit(run_task, setup, function, args))
+            yield result
+
+
+def failure_signature(exception: Exception) -> tuple:
+    """
+    Return the signature of given exception, used to deduplicate failures. It is a tuple that starts with
+    the name of its class. For a *ContractError*, it also contains the object and the assertion. Otherwise,
+    it contains the first line of the message.
+
+    :param exception: an exception
+    :return: a tuple
+    """
+    if isinstance(exception, ContractError):
+        return type(exception).__name__, str(exception.obj), exception.condition
+    return type(exception).__name__, str(exception).split('\n', 1)[0]
@@ -0,0 +1,102 @@
+import asyncio
+import time
+import unittest
+from sismic import io
+from sismic.interpreter import Interpreter
+from sismic.model import Event
+
+try:
+    from sismic.asynchronous import AsyncRunner
+except SyntaxError:  # async def requires Python 3.5
+    AsyncRunner = None
+
+
+TIMER_YAML = """
+    statechart:
+      name: timer
+      root state:
+        name: root
+        initial: s1
+        states:
+          - name: s1
+            transitions:
+              - target: s2
+                guard: after(0.05)
+          - name: s2
+            type: final
+"""
+
+
+@unittest.skipIf(AsyncRunner is None, 'AsyncRunner requires Python 3.5')
+class AsyncRunnerTests(unittest.TestCase):
+    def setUp(self):
+        with open('tests/yaml/simple.yaml') as f:
+            self.sc = io.import_from_yaml(f)
+        self.interpreter = Interpreter(self.sc)
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    def run_until_complete(self, coroutine):
+        return self.loop.run_until_complete(asyncio.wait_for(coroutine, 5))
+
+    def test_final_configuration(self):
+        runner = AsyncRunner(self.interpreter)
+        task = runner.start()
+        self.run_until_complete(runner.queue(Event('goto s2')))
+        self.assertEqual(self.interpreter.configuration, ['root', 's3'])
+        self.run_until_complete(runner.queue(Event('goto final')))
+        self.run_until_complete(task)
+        self.assertTrue(self.interpreter.final)
+        self.assertFalse(runner.running)
+
+    def test_runner_created_outside_the_event_loop(self):
+        runner = AsyncRunner(self.interpreter, delay=60)
+        runner.queue_nowait(Event('goto s2'))
+        runner.queue_nowait(Event('goto final'))
+
+        # The runner is executed in a loop that did not exist when it was created
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(asyncio.wait_for(runner.run(), 5))
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+        self.assertTrue(self.interpreter.final)
+
+    def test_no_polling(self):
+        runner = AsyncRunner(self.interpreter, delay=60)
+        runner.start()
+        self.run_until_complete(asyncio.sleep(0))
+        starttime = time.monotonic()
+        self.run_until_complete(runner.queue(Event('goto s2')))
+        self.assertLess(time.monotonic() - starttime, 1)
+        self.assertEqual(self.interpreter.configuration, ['root', 's3'])
+        self.run_until_complete(runner.stop())
+
+    def test_stop(self):
+        steps = []
+        runner = AsyncRunner(self.interpreter, callback=steps.extend)
+        runner.start()
+        self.run_until_complete(runner.queue(Event('goto s2')))
+        self.run_until_complete(runner.stop())
+        self.assertTrue(self.interpreter.final)
+        self.assertEqual(steps[-1].exited_states, ['s3', 'root'])
+        self.assertEqual(len(self.interpreter._events), 0)
+
+    def test_time(self):
+        interpreter = Interpreter(io.import_from_yaml(TIMER_YAML))
+        self.run_until_complete(AsyncRunner(interpreter, delay=0.01).run())
+        self.assertTrue(interpreter.final)
+        self.assertGreaterEqual(interpreter.time, 0.05)
+
+    def test_next_deadline(self):
+        interpreter = Interpreter(io.import_from_yaml(TIMER_YAML))
+        starttime = time.monotonic()
+        self.run_until_complete(AsyncRunner(interpreter, delay=60).run())
+        self.assertTrue(interpreter.final)
+        self.assertLess(time.monotonic() - starttime, 5)
@@ -0,0 +1,90 @@
+import random
+import unittest
+from sismic import io
+from sismic.exceptions import StatechartError, ExecutionError
+from sismic.interpreter import Interpreter
+from sismic.model import Event
+
+try:
+    import numpy
+    from sismic.batch import BatchInterpreter
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class BatchInterpreterTests(unittest.TestCase):
+    def setUp(self):
+        with open('tests/yaml/deep_history.yaml') as f:
+            self.sc = io.import_from_yaml(f)
+        self.batch = BatchInterpreter(self.sc, size=3)
+
+    def test_initial_situation(self):
+        interpreter = Interpreter(self.sc)
+        interpreter.execute()
+        self.assertEqual(len(self.batch), 3)
+        for index in range(3):
+            self.assertEqual(self.batch.configuration(index), interpreter.configuration)
+
+    def test_step(self):
+        events = self.batch.events
+        self.batch.step([events.index('next1'), -1, events.index('pause')])
+        self.assertEqual(self.batch.active('s12').tolist(), [True, False, False])
+        self.assertEqual(self.batch.active('pause').tolist(), [False, False, True])
+
+        self.batch.step(events.index('continue'))
+        self.assertEqual(self.batch.active('s12').tolist(), [True, False, False])
+        self.assertEqual(self.batch.active('active').tolist(), [True, True, True])
+
+        self.batch.reset()
+        self.assertEqual(self.batch.active('s11').tolist(), [True, True, True])
+
+    def test_code_is_rejected(self):
+        for filename in ['actions', 'timer', 'internal']:
+            with open('tests/yaml/{}.yaml'.format(filename)) as f:
+                sc = io.import_from_yaml(f)
+            with self.assertRaises(StatechartError):
+                BatchInterpreter(sc)
+
+    def test_max_situations(self):
+        with self.assertRaises(ExecutionError):
+            BatchInterpreter(self.sc, max_situations=2)
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class DifferentialTests(unittest.TestCase):
+    """
+    A BatchInterpreter and as many Interpreter instances receive the same random events.
+    """
+
+    def check(self, filename, size=20, steps=30):
+        with open('tests/yaml/{}.yaml'.format(filename)) as f:
+            sc = io.import_from_yaml(f)
+        batch = BatchInterpreter(sc, size=size)
+        interpreters = [Interpreter(sc) for _ in range(size)]
+        for interpreter in interpreters:
+            interpreter.execute()
+
+        rand = random.Random(filename)
+        for _ in range(steps):
+            events = [rand.randrange(-1, len(batch.events)) for _ in range(size)]
+            batch.step(numpy.array(events))
+            for index, (interpreter, event) in enumerate(zip(interpreters, events)):
+                if event != -1:
+                    interpreter.queue(Event(batch.events[event])).execute()
+                self.assertEqual(batch.configuration(index), interpreter.configuration)
+
+    def test_simple(self):
+        self.check('simple')
+
+    def test_composite(self):
+        self.check('composite')
+
+    def test_history(self):
+        self.check('history')
+
+    def test_deep_history(self):
+        self.check('deep_history')
+
+    def test_nested_parallel(self):
+        self.check('nested_parallel')
@@ -1,6 +1,8 @@
 import unittest
+from functools import partial
 from sismic import io
 from sismic.interpreter import Interpreter
+from sismic.code import PythonEvaluator
 from sismic.model import Event, Transition, StateMixin
 from sismic.exceptions import PreconditionError, PostconditionError, InvariantError
 
@@ -60,3 +62,23 @@ class ElevatorContractTests(unittest.TestCase):
         self.interpreter.queue(Event('floorSelected', floor=4))
         self.interpreter.execute()
 
+
+class IncrementalInvariantsTests(unittest.TestCase):
+    def setUp(self):
+        with open('docs/examples/elevator_contract.yaml') as f:
+            self.sc = io.import_from_yaml(f)
+        self.interpreter = Interpreter(self.sc, evaluator_klass=partial(PythonEvaluator, incremental_invariants=True))
+
+    def test_no_error(self):
+        self.interpreter.queue(Event('floorSelected', floor=4))
+        self.interpreter.execute()
+        self.interpreter.time += 10
+        self.interpreter.execute()
+        self.assertEqual(self.interpreter.context['current'], 0)
+
+    def test_state_invariant(self):
+        self.sc.state_for('active').invariants.append('current < 3')
+        self.interpreter.queue(Event('floorSelected', floor=4))
+        with self.assertRaises(InvariantError) as cm:
+            self.interpreter.execute()
+        self.assertEqual(cm.exception.obj, self.sc.state_for('active'))
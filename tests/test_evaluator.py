@@ -2,7 +2,9 @@ import unittest
 from unittest.mock import MagicMock
 from sismic import code
 from sismic import exceptions
-from sismic.model import Event, InternalEvent
+from sismic import io
+from sismic.interpreter import Interpreter
+from sismic.model import Event, InternalEvent, BasicState, Transition
 
 
 class DummyEvaluatorTests(unittest.TestCase):
@@ -72,6 +74,175 @@ class PythonEvaluatorTests(unittest.TestCase):
         self.evaluator._execute_code('a = 1\nassert a == 1')
         self.assertTrue(self.evaluator._evaluate_code('a == 1'))
 
+    def test_compiled_code_is_cached(self):
+        self.evaluator._evaluate_code('x == 1')
+        compiled = self.evaluator._compiled_lru[('x == 1', 'eval')]
+        self.assertIs(self.evaluator._compile_code('x == 1', 'eval'), compiled)
+
+    def test_compiled_code_cache_is_bounded(self):
+        self.evaluator.code_cache_size = 2
+        for i in range(5):
+            self.assertTrue(self.evaluator._evaluate_code('x == {}'.format(1 if i == 0 else 'x')))
+        self.assertEqual(len(self.evaluator._compiled_lru), 2)
+
+    def test_compiled_code_cache_can_be_disabled(self):
+        self.evaluator.code_cache_size = 0
+        for _ in range(2):
+            self.assertTrue(self.evaluator._evaluate_code('x == 1'))
+        self.evaluator._execute_code('y = x')
+        self.assertEqual(len(self.evaluator._compiled_lru), 0)
+
+    def test_invalid_syntax(self):
+        with self.assertRaises(exceptions.CodeEvaluationError):
+            self.evaluator._evaluate_code('x ==')
+
     @unittest.skip('http://stackoverflow.com/questions/32894942/listcomp-unable-to-access-locals-defined-in-code-called-by-exec-if-nested-in-fun')
     def test_access_outer_scope(self):
-        self.evaluator._execute_code('a = 1\nd = [x for x in range(10) if x!=a]')
\ No newline at end of file
+        self.evaluator._execute_code('a = 1\nd = [x for x in range(10) if x!=a]')
+
+
+class PythonEvaluatorMemoryTests(unittest.TestCase):
+    def setUp(self):
+        interpreter = MagicMock(name='Interpreter')
+        interpreter.time = 0
+        self.evaluator = code.PythonEvaluator(interpreter=interpreter, initial_context={'x': [1], 'y': [2]})
+        self.state = BasicState('s')
+
+    def test_no_memory_without_old(self):
+        self.state.postconditions.append('x == [1]')
+        self.evaluator.execute_onentry(self.state)
+        self.assertNotIn(id(self.state), self.evaluator._memory)
+
+    def test_selective_memory(self):
+        self.state.postconditions.append('__old__.x == x')
+        self.state.invariants.append('len(__old__.x) <= len(x)')
+        self.evaluator.execute_onentry(self.state)
+        self.evaluator._execute_code('x.append(3)')
+
+        memory = self.evaluator._memory[id(self.state)]
+        self.assertEqual(memory.x, [1])
+        with self.assertRaises(AttributeError):
+            _ = memory.y
+
+        self.assertEqual(list(self.evaluator.evaluate_postconditions(self.state)), ['__old__.x == x'])
+        self.assertEqual(list(self.evaluator.evaluate_invariants(self.state)), [])
+
+    def test_full_memory(self):
+        self.state.postconditions.append('getattr(__old__, "y") == y')
+        self.evaluator.execute_onentry(self.state)
+
+        memory = self.evaluator._memory[id(self.state)]
+        self.assertEqual(memory.x, [1])
+        self.assertEqual(memory.y, [2])
+        self.assertEqual(list(self.evaluator.evaluate_postconditions(self.state)), [])
+
+
+class PythonEvaluatorIncrementalInvariantsTests(unittest.TestCase):
+    def setUp(self):
+        interpreter = MagicMock(name='Interpreter')
+        interpreter.time = 0
+        self.evaluator = code.PythonEvaluator(interpreter=interpreter, initial_context={'x': 1, 'y': [2]},
+                                              incremental_invariants=True)
+        self.evaluator._evaluate_code = MagicMock(wraps=self.evaluator._evaluate_code)
+        self.state = BasicState('s')
+        self.state.invariants.append('x > 0')
+
+    def check(self):
+        return list(self.evaluator.evaluate_invariants(self.state))
+
+    def test_skip_unchanged(self):
+        self.evaluator.execute_onentry(self.state)
+        self.assertEqual(self.check(), [])
+        self.evaluator._execute_code('y.append(3)')
+        self.assertEqual(self.check(), [])
+        self.assertEqual(self.evaluator._evaluate_code.call_count, 1)
+
+    def test_check_written(self):
+        self.evaluator.execute_onentry(self.state)
+        self.assertEqual(self.check(), [])
+        self.evaluator._execute_code('x = x - 1')
+        self.assertEqual(self.check(), ['x > 0'])
+        self.assertEqual(self.evaluator._evaluate_code.call_count, 2)
+
+    def test_check_entered(self):
+        self.evaluator.execute_onentry(self.state)
+        self.assertEqual(self.check(), [])
+        self.evaluator.execute_onentry(self.state)
+        self.assertEqual(self.check(), [])
+        self.assertEqual(self.evaluator._evaluate_code.call_count, 2)
+
+    def test_check_unknown_writes(self):
+        self.evaluator.execute_onentry(self.state)
+        self.assertEqual(self.check(), [])
+        self.evaluator._execute_code('exec("x = 0")')
+        self.assertEqual(self.check(), ['x > 0'])
+
+    def test_check_volatile(self):
+        self.state.invariants[0] = 'time >= 0'
+        self.evaluator.execute_onentry(self.state)
+        self.assertEqual(self.check(), [])
+        self.assertEqual(self.check(), [])
+        self.assertEqual(self.evaluator._evaluate_code.call_count, 2)
+
+    def test_full_check(self):
+        self.evaluator.incremental_invariants = False
+        self.evaluator.execute_onentry(self.state)
+        self.assertEqual(self.check(), [])
+        self.assertEqual(self.check(), [])
+        self.assertEqual(self.evaluator._evaluate_code.call_count, 2)
+
+
+class PythonEvaluatorDeadlineTests(unittest.TestCase):
+    def setUp(self):
+        self.interpreter = MagicMock(name='Interpreter')
+        self.interpreter.time = 0
+        self.evaluator = code.PythonEvaluator(interpreter=self.interpreter)
+        self.evaluator.execute_onentry(BasicState('s'))
+
+    def test_timers(self):
+        self.assertEqual(self.evaluator._timers_for('x > 0'), set())
+        self.assertEqual(self.evaluator._timers_for('after(3) and not idle(2.5)'), {('after', 3), ('idle', 2.5)})
+        self.assertIsNone(self.evaluator._timers_for('time > 3'))
+        self.assertIsNone(self.evaluator._timers_for('after(x)'))
+        self.assertIsNone(self.evaluator._timers_for('any(map(after, [1, 2]))'))
+
+    def test_deadline(self):
+        self.assertEqual(self.evaluator.deadline_for(Transition('s')), float('inf'))
+        self.assertEqual(self.evaluator.deadline_for(Transition('s', guard='x > 0')), float('inf'))
+        self.assertEqual(self.evaluator.deadline_for(Transition('s', guard='after(3) or idle(2)')), 2)
+        self.assertIsNone(self.evaluator.deadline_for(Transition('s', guard='time > 3')))
+
+        self.interpreter.time = 2
+        self.assertEqual(self.evaluator.deadline_for(Transition('s', guard='after(3) or idle(2)')), 3)
+        self.evaluator.execute_action(Transition('s', 's'), None)
+        self.assertEqual(self.evaluator.deadline_for(Transition('s', guard='idle(2)')), 4)
+
+        self.interpreter.time = 5
+        self.assertEqual(self.evaluator.deadline_for(Transition('s', guard='after(3) or idle(2)')), float('inf'))
+
+    def test_dummy_evaluator(self):
+        evaluator = code.DummyEvaluator(interpreter=self.interpreter)
+        self.assertEqual(evaluator.deadline_for(Transition('s', guard='time > 3')), float('inf'))
+
+
+class PythonEvaluatorCompilationTests(unittest.TestCase):
+    def setUp(self):
+        with open('docs/examples/elevator.yaml') as f:
+            self.sc = io.import_from_yaml(f)
+
+    def test_statechart_code_is_compiled(self):
+        interpreter = Interpreter(self.sc)
+        transition = self.sc.transitions_from('floorSelecting')[0]
+        self.assertIn((transition.action, 'exec'), interpreter._evaluator._compiled)
+
+    def test_invalid_code_reported_on_load(self):
+        self.sc.state_for('movingUp').on_entry = 'current = '
+        with self.assertRaises(exceptions.CodeEvaluationError) as cm:
+            Interpreter(self.sc)
+        self.assertIn('movingUp', str(cm.exception))
+
+    def test_invalid_guard_reported_on_load(self):
+        self.sc.transitions_from('floorSelecting')[0].guard = 'floor ='
+        with self.assertRaises(exceptions.CodeEvaluationError) as cm:
+            Interpreter(self.sc)
+        self.assertIn('floorSelecting', str(cm.exception))
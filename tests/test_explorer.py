@@ -0,0 +1,157 @@
+import hashlib
+import types
+import unittest
+from unittest import mock
+from sismic import io
+from sismic import explorer
+from sismic.explorer import explore
+from sismic.model import Event
+
+
+COUNTERS = """
+statechart:
+  name: Counters
+  preamble: x, y = 0, 0
+  root state:
+    name: root
+    initial: s
+    states:
+      - name: s
+        transitions:
+          - target: s
+            event: incx
+            guard: x < 3
+            action: x += 1
+          - target: s
+            event: incy
+            guard: y < 2
+            action: y += 1
+"""
+
+DEADLOCK = """
+statechart:
+  name: Deadlock
+  root state:
+    name: root
+    initial: s1
+    states:
+      - name: s1
+        transitions:
+          - target: s2
+            event: go
+          - target: end
+            event: stop
+      - name: s2
+      - name: s3
+        transitions:
+          - target: s1
+            event: go
+      - name: end
+        type: final
+"""
+
+COLLECTIONS = """
+statechart:
+  name: Collections
+  preamble: d, s = {}, set()
+  root state:
+    name: root
+    initial: s
+    states:
+      - name: s
+        transitions:
+          - target: s
+            event: a
+            guard: "'a' not in d"
+            action: "d['a'] = {'x': 1, 'y': {1}}; s.add('a')"
+          - target: s
+            event: b
+            guard: "'b' not in d"
+            action: "d['b'] = {'y': {2, 1}, 'x': 2}; s.add('b')"
+"""
+
+
+class ExploreTests(unittest.TestCase):
+    def test_history(self):
+        with open('tests/yaml/history.yaml') as f:
+            sc = io.import_from_yaml(f)
+        report = explore(sc)
+        self.assertTrue(report.complete)
+        self.assertEqual(report.unreachable_states, [])
+        self.assertEqual(report.entered_states, sorted(sc.states))
+        self.assertEqual(report.deadlocks, [])
+        self.assertEqual(report.failures, [])
+        self.assertIn(['root', 'pause'], report.configurations)
+        # The memory of the history state distinguishes situations with a same configuration
+        self.assertGreater(report.situations, len(report.configurations))
+
+    def test_context(self):
+        sc = io.import_from_yaml(COUNTERS)
+        self.assertEqual(explore(sc).situations, 4 * 3)
+        self.assertEqual(explore(sc, events=['incx']).situations, 4)
+        self.assertEqual(explore(sc, abstraction=lambda context: context['y']).situations, 3)
+        self.assertEqual(explore(sc, events=[Event('incx')], abstraction=lambda context: 0).situations, 1)
+        self.assertEqual(explore(sc).configurations, [['root', 's']])
+
+    def test_canonical_context(self):
+        # Equal dictionaries and sets are the same situation, whatever the order of their items
+        sc = io.import_from_yaml(COLLECTIONS)
+        self.assertEqual(explore(sc).situations, 4)
+        self.assertEqual(explore(sc, abstraction=lambda context: context['d']).situations, 4)
+
+    def test_digest_without_blake2b(self):
+        sc = io.import_from_yaml(COUNTERS)
+        with mock.patch.object(explorer, 'hashlib', types.SimpleNamespace(sha512=hashlib.sha512)):
+            self.assertEqual(explore(sc, digest_size=8).situations, 4 * 3)
+
+    def test_max_situations(self):
+        sc = io.import_from_yaml(COUNTERS)
+        report = explore(sc, max_situations=5)
+        self.assertFalse(report.complete)
+        self.assertEqual(report.situations, 5)
+
+    def test_processes(self):
+        sc = io.import_from_yaml(COUNTERS)
+        report = explore(sc, max_workers=2, chunksize=2)
+        self.assertTrue(report.complete)
+        self.assertEqual(report.situations, 4 * 3)
+
+    def test_deadlocks_and_unreachable_states(self):
+        sc = io.import_from_yaml(DEADLOCK)
+        report = explore(sc)
+        self.assertEqual(report.situations, 3)
+        self.assertEqual(report.unreachable_states, ['s3'])
+        self.assertEqual(len(report.deadlocks), 1)
+        self.assertEqual(report.deadlocks[0].story, [Event('go')])
+        self.assertEqual(report.deadlocks[0].configuration, ['root', 's2'])
+
+    def test_contract_violation(self):
+        with open('docs/examples/elevator_contract.yaml') as f:
+            sc = io.import_from_yaml(f)
+        events = [Event('floorSelected', floor=floor) for floor in range(5)]
+        report = explore(sc, events)
+        self.assertEqual(report.situations, 5)
+        self.assertEqual(report.failures, [])
+
+        sc.state_for('movingUp').preconditions[0] = 'current > destination'
+        report = explore(sc, events)
+        self.assertEqual(report.situations, 1)
+        self.assertEqual(len(report.failures), 1)
+        failure = report.failures[0]
+        self.assertEqual(failure.signature, ('PreconditionError', 'BasicState(movingUp)', 'current > destination'))
+        self.assertEqual(failure.count, 4)
+        self.assertEqual(failure.story, [Event('floorSelected', floor=1)])
+        self.assertEqual(report.unreachable_states, ['moving', 'movingDown', 'movingUp'])  # doorsClosed was entered
+
+        # Ignored contract
+        report = explore(sc, events, ignore_contract=True)
+        self.assertEqual(report.failures, [])
+        self.assertEqual(report.unreachable_states, [])
+
+    def test_initial_failure(self):
+        with open('tests/yaml/nondeterministic.yaml') as f:
+            sc = io.import_from_yaml(f)
+        report = explore(sc)
+        self.assertEqual(report.situations, 0)
+        self.assertEqual([failure.signature[0] for failure in report.failures], ['NonDeterminismError'])
+        self.assertEqual(report.failures[0].story, [])
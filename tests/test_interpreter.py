@@ -1,9 +1,15 @@
+import gc
+import pickle
+import threading
 import unittest
+from collections import deque
 from sismic import io
-from sismic.interpreter import Interpreter, run_in_background, log_trace
+from sismic.interpreter import Interpreter, InterpreterPool
+from sismic.interpreter import run_in_background, log_trace, log_compact_trace
 from sismic import exceptions
 from sismic.code import DummyEvaluator
-from sismic.model import Event, InternalEvent
+from sismic import model
+from sismic.model import Event, InternalEvent, Transition
 
 
 class LogTraceTests(unittest.TestCase):
@@ -26,6 +32,34 @@ class LogTraceTests(unittest.TestCase):
         self.assertSequenceEqual(self.steps, steps)
 
 
+class CompactTraceTests(unittest.TestCase):
+    def setUp(self):
+        with open('docs/examples/elevator.yaml') as f:
+            sc = io.import_from_yaml(f)
+        self.tested = Interpreter(sc)
+        self.steps = log_compact_trace(self.tested)
+
+    def test_empty_trace(self):
+        self.assertEqual(len(self.steps), 0)
+        with self.assertRaises(IndexError):
+            self.steps[0]
+
+    def test_trace_content(self):
+        self.tested.queue(Event('floorSelected', floor=4)).queue(InternalEvent('floorSelected', floor=4))
+        self.tested.time = 2.5
+        self.tested.queue(Event('floorSelected', floor=2, tags=['unhashable'])).queue(Event('floorSelected', floor=4))
+        steps = self.tested.execute()
+        self.assertSequenceEqual(self.steps, steps)
+        self.assertEqual(self.steps[-1], steps[-1])
+        self.assertEqual(self.steps[1:3], steps[1:3])
+        self.assertEqual([step.time for step in self.steps], [step.time for step in steps])
+        self.assertIsInstance(self.steps[1].event, InternalEvent)
+
+        # Interned values
+        self.assertEqual(len(self.steps._event_values), 3)
+        self.assertEqual(len(self.steps._state_values), len(set(self.steps._state_values)))
+
+
 class RunInBackgroundTests(unittest.TestCase):
     def test_run_in_background(self):
         with open('tests/yaml/simple.yaml') as f:
@@ -38,6 +72,147 @@ class RunInBackgroundTests(unittest.TestCase):
         self.assertTrue(interpreter.final)
 
 
+class TerminateTests(unittest.TestCase):
+    def setUp(self):
+        with open('tests/yaml/simple.yaml') as f:
+            self.sc = io.import_from_yaml(f)
+        self.interpreter = Interpreter(self.sc)
+
+    def test_terminate(self):
+        self.interpreter.execute()
+        step = self.interpreter.terminate()
+        self.assertEqual(step.exited_states, ['s1', 'root'])
+        self.assertTrue(self.interpreter.final)
+        self.assertIsNone(self.interpreter.terminate())
+
+
+class NextDeadlineTests(unittest.TestCase):
+    def setUp(self):
+        with open('tests/yaml/timer.yaml') as f:
+            self.sc = io.import_from_yaml(f)
+        self.interpreter = Interpreter(self.sc)
+
+    def test_not_initialized(self):
+        self.interpreter.time = 1
+        self.assertEqual(self.interpreter.next_deadline(), 1)
+
+    def test_jump_to_deadlines(self):
+        self.interpreter.execute()
+        deadlines = []
+        while not self.interpreter.final:
+            deadlines.append(self.interpreter.next_deadline())
+            self.interpreter.time = deadlines[-1]
+            self.interpreter.execute()
+        self.assertEqual(deadlines, [3, 5, 7])
+        self.assertEqual(self.interpreter.next_deadline(), float('inf'))
+
+    def test_unknown_deadline(self):
+        self.sc.transitions_from('s1')[0].guard = 'time >= 3'
+        interpreter = Interpreter(self.sc)
+        interpreter.execute()
+        self.assertIsNone(interpreter.next_deadline())
+
+    def test_transitions_with_event(self):
+        with open('tests/yaml/simple.yaml') as f:
+            interpreter = Interpreter(io.import_from_yaml(f))
+        interpreter.execute()
+        self.assertEqual(interpreter.next_deadline(), float('inf'))
+
+
+class ThreadSafeQueueTests(unittest.TestCase):
+    def setUp(self):
+        self.sc = io.import_from_yaml("""
+            statechart:
+              name: counter
+              preamble: x = 0
+              root state:
+                name: root
+                transitions:
+                  - event: inc
+                    action: x += 1
+        """)
+
+    def test_producers(self):
+        interpreter = Interpreter(self.sc, thread_safe=True, capacity=8)
+        producers = [threading.Thread(target=lambda: [interpreter.queue(Event('inc')) for _ in range(100)])
+                     for _ in range(16)]
+        for producer in producers:
+            producer.start()
+
+        while interpreter.context['x'] < 1600:
+            self.assertTrue(interpreter.wait(5))
+            interpreter.execute()
+        for producer in producers:
+            producer.join()
+        self.assertEqual(interpreter.context['x'], 1600)
+
+    def test_capacity(self):
+        interpreter = Interpreter(self.sc, thread_safe=True, capacity=2)
+        interpreter.queue(Event('inc')).queue(Event('inc'))
+        producer = threading.Thread(target=interpreter.queue, args=(Event('inc'),))
+        producer.start()
+        producer.join(0.05)
+        self.assertTrue(producer.is_alive())
+        self.assertEqual(len(interpreter._events), 2)
+
+        interpreter.execute(max_steps=2)
+        producer.join(5)
+        self.assertFalse(producer.is_alive())
+        interpreter.execute()
+        self.assertEqual(interpreter.context['x'], 3)
+
+    def test_capacity_requires_thread_safety(self):
+        with self.assertRaises(ValueError):
+            Interpreter(self.sc, capacity=2)
+
+    def test_extend_capacity(self):
+        interpreter = Interpreter(self.sc, thread_safe=True, capacity=2)
+        producer = threading.Thread(target=interpreter._events.extend, args=([Event('inc')] * 3,))
+        producer.start()
+        producer.join(0.05)
+        self.assertTrue(producer.is_alive())
+        self.assertEqual(len(interpreter._events), 2)
+
+        snapshot = interpreter.snapshot()
+        interpreter.execute(max_steps=2)
+        producer.join(5)
+        self.assertFalse(producer.is_alive())
+        interpreter.execute()
+        self.assertEqual(interpreter.context['x'], 3)
+
+        interpreter = Interpreter(self.sc, thread_safe=True, capacity=1)
+        interpreter.restore(snapshot)  # Does not block, even if the snapshot exceeds the capacity
+        self.assertEqual(len(interpreter._events), 2)
+        interpreter.execute()
+        self.assertEqual(interpreter.context['x'], 2)
+
+    def test_wait(self):
+        interpreter = Interpreter(self.sc, thread_safe=True)
+        self.assertFalse(interpreter.wait(0.01))
+        threading.Timer(0.01, interpreter.queue, args=(Event('inc'),)).start()
+        self.assertTrue(interpreter.wait(5))
+
+        self.assertFalse(Interpreter(self.sc).wait(60))
+
+    def test_internal_events(self):
+        with open('tests/yaml/internal.yaml') as f:
+            sc = io.import_from_yaml(f)
+        self.assertEqual(Interpreter(sc, thread_safe=True).execute(), Interpreter(sc).execute())
+
+    def test_fork_and_snapshot(self):
+        interpreter = Interpreter(self.sc, thread_safe=True, capacity=4)
+        interpreter.queue(Event('inc'))
+        forked = interpreter.fork()
+        self.assertTrue(forked.thread_safe)
+        self.assertEqual(forked._events.capacity, 4)
+        forked.execute()
+        self.assertEqual(len(interpreter._events), 1)
+
+        interpreter.restore(forked.snapshot())
+        self.assertTrue(interpreter.thread_safe)
+        self.assertEqual(len(interpreter._events), 0)
+
+
 class SimulatorSimpleTests(unittest.TestCase):
     def setUp(self):
         with open('tests/yaml/simple.yaml') as f:
@@ -167,7 +342,8 @@ class SimulatorDeepHistoryTests(unittest.TestCase):
         self.interpreter.queue(Event('error1'))
         self.interpreter.execute()
         self.assertEqual(self.interpreter.configuration, ['root', 'pause'])
-        self.assertEqual(sorted(self.interpreter._memory['active.H*']), ['concurrent_processes', 'process_1', 'process_2', 's12', 's22'])
+        memory = self.interpreter.statechart._hierarchy.names_for(self.interpreter._memory['active.H*'])
+        self.assertEqual(sorted(memory), ['concurrent_processes', 'process_1', 'process_2', 's12', 's22'])
 
         self.interpreter.queue(Event('continue'))
         self.interpreter.execute()
@@ -236,6 +412,28 @@ class InfiniteExecutionTests(unittest.TestCase):
         self.assertTrue(self.interpreter.final)
         self.assertEqual(self.interpreter.context['x'], 100)
 
+    def test_iterexecute_is_lazy(self):
+        steps = self.interpreter.iterexecute()
+        next(steps)
+        self.assertEqual(self.interpreter.configuration, ['root', 's2'])
+        next(steps)
+        self.assertEqual(self.interpreter.configuration, ['root', 's1'])
+        self.assertEqual(self.interpreter.context['x'], 2)
+
+        for _ in steps:
+            pass
+        self.assertTrue(self.interpreter.final)
+
+    def test_iterexecute_max_steps(self):
+        self.assertEqual(len(list(self.interpreter.iterexecute(max_steps=3))), 3)
+        self.assertEqual(self.interpreter.configuration, ['root', 's2'])
+
+    def test_iterexecute_timeout(self):
+        self.assertEqual(len(list(self.interpreter.iterexecute(timeout=0))), 1)
+        self.assertEqual(self.interpreter.configuration, ['root', 's2'])
+        self.assertEqual(len(list(self.interpreter.iterexecute(timeout=60))), 198)
+        self.assertTrue(self.interpreter.final)
+
 
 class ParallelExecutionTests(unittest.TestCase):
     def setUp(self):
@@ -399,4 +597,373 @@ class BindTests(unittest.TestCase):
 
         self.interpreter.queue(InternalEvent('test'))
         self.assertTrue(self.interpreter._events.pop(), Event('test'))
-        self.assertTrue(other_interpreter._events.pop(), Event('test'))
\ No newline at end of file
+        self.assertTrue(other_interpreter._events.pop(), Event('test'))
+
+
+class TransitionPlanCacheTests(unittest.TestCase):
+    def setUp(self):
+        with open('tests/yaml/simple.yaml') as f:
+            self.sc = io.import_from_yaml(f)
+        self.interpreter = Interpreter(self.sc, DummyEvaluator)
+        self.interpreter.execute_once()
+
+    def test_plans_are_reused(self):
+        self.interpreter.queue(Event('goto s2')).execute()  # s1 -> s2 -> s3
+        self.interpreter.queue(Event('goto s2')).execute()  # s3 -> s2 -> s3
+        plan = self.interpreter._transition_plan('goto s2')
+        self.assertIn(plan, self.interpreter._transition_plans.values())
+        self.assertEqual([t for _, t in plan.candidates], self.sc.transitions_for('s3', 'goto s2'))
+
+        size = len(self.interpreter._transition_plans)
+        self.interpreter.queue(Event('goto s2')).execute()
+        self.assertEqual(len(self.interpreter._transition_plans), size)
+        self.assertEqual(self.interpreter.configuration, ['root', 's3'])
+
+    def test_cache_size(self):
+        self.interpreter.transition_cache_size = 1
+        self.interpreter.queue(Event('goto s2')).queue(Event('goto s1')).queue(Event('goto s2')).execute()
+        self.assertEqual(len(self.interpreter._transition_plans), 1)
+
+        self.interpreter.transition_cache_size = 0
+        self.interpreter._transition_plans.clear()
+        self.interpreter.queue(Event('goto s1')).execute()
+        self.assertEqual(len(self.interpreter._transition_plans), 0)
+        self.assertEqual(self.interpreter.configuration, ['root', 's1'])
+
+    def test_statechart_changes(self):
+        self.interpreter.queue(Event('goto s3')).execute()
+        self.assertEqual(self.interpreter.configuration, ['root', 's1'])
+
+        self.sc.add_transition(Transition('s1', 's3', event='goto s3'))
+        self.interpreter.queue(Event('goto s3')).execute()
+        self.assertEqual(self.interpreter.configuration, ['root', 's3'])
+
+        self.sc.remove_transition(self.sc.transitions_for('s3', 'goto s1')[0])
+        self.interpreter.queue(Event('goto s1')).execute()
+        self.assertEqual(self.interpreter.configuration, ['root', 's3'])
+
+
+class StabilizationCacheTests(unittest.TestCase):
+    def setUp(self):
+        with open('tests/yaml/history.yaml') as f:
+            sc = io.import_from_yaml(f)
+        self.interpreter = Interpreter(sc, DummyEvaluator)
+        self.interpreter.execute_once()
+
+    def test_cached_steps(self):
+        self.assertIn(self.interpreter._configuration, self.interpreter._stabilization_steps)
+        self.assertIsNone(self.interpreter._stabilization_steps[self.interpreter._configuration])
+
+        reference = Interpreter(self.interpreter.statechart, DummyEvaluator)
+        reference.stabilization_cache_size = 0
+        reference.execute_once()
+        for interpreter in [self.interpreter, reference]:
+            for _ in range(2):
+                interpreter.queue(Event('next')).queue(Event('pause')).queue(Event('continue'))
+        self.assertEqual(self.interpreter.execute(), reference.execute())
+        self.assertEqual(reference._stabilization_steps, {})
+
+    def test_history_is_not_cached(self):
+        self.interpreter.queue(Event('next')).queue(Event('pause')).queue(Event('continue')).execute()
+        history = self.interpreter.statechart._hierarchy.bit['loop.H']
+        self.assertTrue(self.interpreter._stabilization_steps)
+        for configuration in self.interpreter._stabilization_steps:
+            self.assertFalse(configuration & history)
+
+        self.interpreter.queue(Event('next')).queue(Event('pause')).queue(Event('continue')).execute()
+        self.assertEqual(sorted(self.interpreter.configuration), ['loop', 'root', 's3'])
+
+
+class IngestTests(unittest.TestCase):
+    def setUp(self):
+        with open('docs/examples/elevator.yaml') as f:
+            self.sc = io.import_from_yaml(f)
+        self.events = [Event('floorSelected', floor=4), Event('unknown'), Event('floorSelected', floor=1)]
+
+    def test_same_as_queue_and_execute(self):
+        interpreter = Interpreter(self.sc)
+        steps = []
+        for i, event in enumerate(self.events):
+            interpreter.time = i * 10
+            steps.extend(interpreter.queue(event).execute())
+
+        other = Interpreter(self.sc)
+        self.assertEqual(other.ingest((i * 10, event) for i, event in enumerate(self.events)), steps)
+        self.assertEqual(other.time, 20)
+        self.assertEqual(other.configuration, interpreter.configuration)
+        self.assertEqual(other.context['current'], interpreter.context['current'])
+
+    def test_summary(self):
+        interpreter = Interpreter(self.sc)
+        steps = interpreter.ingest(self.events)
+
+        summary = Interpreter(self.sc).ingest(self.events, summary=True)
+        self.assertEqual(summary['events'], 3)
+        self.assertEqual(summary['macro_steps'], len(steps))
+        self.assertEqual(summary['micro_steps'], sum(len(step.steps) for step in steps))
+        self.assertEqual(summary['transitions'], sum(len(step.transitions) for step in steps))
+        self.assertEqual(summary['ignored_events'], 1)
+
+    def test_internal_events(self):
+        interpreter = Interpreter(self.sc)
+        other = Interpreter(self.sc)
+        interpreter.bind(other)
+        interpreter.ingest([InternalEvent('floorSelected', floor=2)])
+        self.assertEqual(list(other._events), [Event('floorSelected', floor=2)])
+
+    def test_invalid_event(self):
+        with self.assertRaises(ValueError):
+            Interpreter(self.sc).ingest(['floorSelected'])
+
+
+class SnapshotTests(unittest.TestCase):
+    def setUp(self):
+        with open('docs/examples/elevator_contract.yaml') as f:
+            self.sc = io.import_from_yaml(f)
+        self.interpreter = Interpreter(self.sc)
+        self.interpreter.queue(Event('floorSelected', floor=4)).execute(max_steps=3)
+        self.interpreter.time = 10
+
+    def test_rewind(self):
+        snapshot = self.interpreter.snapshot()
+        self.interpreter.queue(Event('floorSelected', floor=1))
+        steps = self.interpreter.execute()
+        context = dict(self.interpreter.context)
+
+        self.interpreter.restore(snapshot)
+        self.assertEqual(self.interpreter.time, 10)
+        self.interpreter.queue(Event('floorSelected', floor=1))
+        self.assertEqual(self.interpreter.execute(), steps)
+        self.assertEqual(self.interpreter.context, context)
+
+    def test_other_interpreter(self):
+        self.interpreter.queue(Event('floorSelected', floor=1))
+        snapshot = self.interpreter.snapshot()
+
+        with open('docs/examples/elevator_contract.yaml') as f:
+            other = Interpreter(io.import_from_yaml(f)).restore(snapshot)
+        self.assertEqual(other.configuration, self.interpreter.configuration)
+        self.assertEqual(list(other._events), list(self.interpreter._events))
+        self.assertEqual(other.execute(), self.interpreter.execute())
+
+    def test_history(self):
+        with open('tests/yaml/deep_history.yaml') as f:
+            interpreter = Interpreter(io.import_from_yaml(f))
+        interpreter.queue(Event('next1')).queue(Event('pause')).execute()
+        snapshot = interpreter.snapshot()
+        interpreter.queue(Event('continue')).execute()
+        configuration = interpreter.configuration
+
+        interpreter.restore(snapshot)
+        self.assertEqual(interpreter.configuration, ['root', 'pause'])
+        interpreter.queue(Event('continue')).execute()
+        self.assertEqual(interpreter.configuration, configuration)
+
+    def test_persistent_values(self):
+        self.interpreter.context['f'] = lambda x: x
+        with self.assertRaises((pickle.PicklingError, AttributeError)):
+            self.interpreter.snapshot()
+
+        f = self.interpreter.context['f']
+        snapshot = self.interpreter.snapshot(lambda obj: 'f' if obj is f else None)
+        with self.assertRaises(pickle.UnpicklingError):
+            self.interpreter.restore(snapshot)
+        self.interpreter.restore(snapshot, {'f': f}.get)
+        self.assertIs(self.interpreter.context['f'], f)
+
+    def test_invalid_snapshot(self):
+        with self.assertRaises(ValueError):
+            self.interpreter.restore(pickle.dumps(('unknown format',)))
+
+
+class ForkTests(unittest.TestCase):
+    def setUp(self):
+        with open('docs/examples/elevator_contract.yaml') as f:
+            self.sc = io.import_from_yaml(f)
+        self.interpreter = Interpreter(self.sc, initial_context={'floors': [0]})
+        self.interpreter.execute()
+
+    def test_independent_executions(self):
+        forked = self.interpreter.fork()
+        self.assertIs(forked.statechart, self.interpreter.statechart)
+
+        forked.queue(Event('floorSelected', floor=4))
+        forked.time = 10
+        forked.execute()
+        self.assertEqual(forked.context['current'], 4)
+        self.assertEqual(self.interpreter.context['current'], 0)
+        self.assertEqual(self.interpreter.time, 0)
+        self.assertEqual(len(self.interpreter._events), 0)
+
+        # Same execution
+        self.interpreter.queue(Event('floorSelected', floor=4))
+        self.interpreter.time = 10
+        self.interpreter.execute()
+        self.assertEqual(self.interpreter.configuration, forked.configuration)
+
+    def test_copy_on_access(self):
+        forked = self.interpreter.fork()
+        self.assertNotIn('floors', forked.context._own)
+        forked.context['floors'].append(4)
+        del forked.context['destination']
+        self.assertEqual(self.interpreter.context['floors'], [0])
+        self.assertIn('destination', self.interpreter.context)
+        self.assertNotIn('destination', forked.context)
+        self.assertEqual(len(forked.context), len(self.interpreter.context) - 1)
+
+    def test_peek_items(self):
+        forked = self.interpreter.fork()
+        forked.context['current'] = 4
+        items = dict(forked.context.peek_items())
+        self.assertIs(items['floors'], self.interpreter.context['floors'])
+        self.assertNotIn('floors', forked.context._own)
+        self.assertEqual(items, dict(forked.context.items()))
+
+    def test_parent_modifications(self):
+        forked = self.interpreter.fork()
+        other = self.interpreter.fork()
+        self.assertEqual(other.context['floors'], [0])
+
+        self.interpreter._evaluator.execute_statechart(model.Statechart('test', preamble='floors.append(1)'))
+        self.assertEqual(self.interpreter.context['floors'], [0, 1])
+        self.assertEqual(forked.context['floors'], [0])
+        self.assertEqual(other.context['floors'], [0])
+
+    def test_collected_forks_are_forgotten(self):
+        for _ in range(100):
+            self.interpreter.fork().queue(Event('floorSelected', floor=4)).execute()
+        forked = self.interpreter.fork()
+        gc.collect()  # Interpreters and their evaluator reference each other
+        self.assertEqual(len(self.interpreter._evaluator._forks), 1)
+
+        del forked
+        gc.collect()
+        self.assertEqual(len(self.interpreter._evaluator._forks), 0)
+
+    def test_fork_of_fork(self):
+        forked = self.interpreter.fork()
+        forked_twice = forked.fork()
+        steps = forked.queue(Event('floorSelected', floor=4)).execute()
+        self.assertEqual(forked_twice.context['current'], 0)
+        self.assertEqual(forked_twice.queue(Event('floorSelected', floor=4)).execute(), steps)
+
+    def test_no_observers(self):
+        trace = log_trace(self.interpreter)
+        other = Interpreter(self.sc)
+        self.interpreter.bind(other)
+
+        forked = self.interpreter.fork()
+        forked.queue(InternalEvent('floorSelected', floor=4)).execute()
+        self.assertEqual(trace, [])
+        self.assertEqual(len(other._events), 0)
+
+    def test_snapshot(self):
+        forked = self.interpreter.fork()
+        forked.context['floors'].append(4)
+        snapshot = forked.snapshot()
+        self.assertEqual(Interpreter(self.sc).restore(snapshot).context['floors'], [0, 4])
+
+
+class InterpreterPoolTests(unittest.TestCase):
+    def setUp(self):
+        with open('docs/examples/elevator_contract.yaml') as f:
+            self.sc = io.import_from_yaml(f)
+        self.pool = InterpreterPool(self.sc)
+        self.pool.add('a').add('b', initial_context={'floors': [0]})
+
+    def test_sessions(self):
+        self.assertEqual(len(self.pool), 2)
+        self.assertIn('a', self.pool)
+        self.assertEqual(set(self.pool), {'a', 'b'})
+        with self.assertRaises(KeyError):
+            self.pool.add('a')
+
+        self.pool.remove('a')
+        self.assertNotIn('a', self.pool)
+        with self.assertRaises(KeyError):
+            self.pool.remove('a')
+
+    def test_same_execution(self):
+        interpreter = Interpreter(self.sc)
+        for floor in [4, 1]:
+            interpreter.queue(Event('floorSelected', floor=floor))
+            self.pool.queue('a', Event('floorSelected', floor=floor))
+            self.assertEqual(self.pool.execute('a'), interpreter.execute())
+
+        with self.pool.session('a') as pooled:
+            self.assertEqual(pooled.configuration, interpreter.configuration)
+            self.assertEqual(pooled.context['current'], interpreter.context['current'])
+
+    def test_isolated_sessions(self):
+        self.pool.queue('a', Event('floorSelected', floor=4))
+        self.pool.execute('a')
+        with self.pool.session('a') as interpreter:
+            self.assertEqual(interpreter.context['current'], 4)
+            interpreter.time = 10
+        with self.pool.session('b') as interpreter:
+            self.assertEqual(interpreter.context['current'], 0)
+            self.assertEqual(interpreter.context['floors'], [0])
+            self.assertEqual(interpreter.time, 0)
+            self.assertEqual(len(interpreter._events), 0)
+        with self.pool.session('a') as interpreter:
+            self.assertEqual(interpreter.time, 10)
+
+    def test_internal_events(self):
+        with open('tests/yaml/internal.yaml') as f:
+            sc = io.import_from_yaml(f)
+        pool = InterpreterPool(sc).add(1).add(2)
+        steps = pool.execute(1, max_steps=1)
+        with pool.session(2) as interpreter:
+            self.assertEqual(len(interpreter._events), 0)
+        self.assertEqual(pool.execute(1), Interpreter(sc).execute()[len(steps):])
+
+    def test_history_memory(self):
+        with open('tests/yaml/deep_history.yaml') as f:
+            sc = io.import_from_yaml(f)
+        pool = InterpreterPool(sc).add(1).add(2)
+        pool.execute(1)
+        pool.execute(2)
+        for event in ['next1', 'next2', 'pause']:
+            pool.queue(1, Event(event))
+        pool.execute(1)
+        pool.queue(2, Event('pause'))
+        pool.execute(2)
+        for key in [1, 2]:
+            pool.queue(key, Event('continue'))
+            pool.execute(key)
+
+        with pool.session(1) as interpreter:
+            first = interpreter.configuration
+        with pool.session(2) as interpreter:
+            second = interpreter.configuration
+        self.assertNotEqual(first, second)
+
+    def test_nested_sessions(self):
+        with self.pool.session('a'):
+            with self.assertRaises(ValueError):
+                self.pool.execute('b')
+            with self.assertRaises(ValueError):
+                self.pool.remove('a')
+            with self.assertRaises(ValueError):
+                self.pool.add('c')
+        self.assertNotIn('c', self.pool)
+        self.pool.execute('b')
+
+    def test_unshared_containers(self):
+        pool = InterpreterPool(self.sc).add(1).add(2)
+        first, second = pool._sessions[1], pool._sessions[2]
+        for value in pool._initial_session:
+            if isinstance(value, (dict, deque, list, set)):
+                self.assertFalse(any(value is other for other in first + second))
+        for value in first:
+            if isinstance(value, (dict, deque, list, set)):
+                self.assertFalse(any(value is other for other in second))
+
+    def test_shared_compiled_code(self):
+        compiled = self.pool._interpreter._evaluator._compiled
+        self.pool.add('c')
+        self.assertIs(self.pool._interpreter._evaluator._compiled, compiled)
+
+    def test_compact_sessions(self):
+        self.pool.execute('a')
+        self.assertIsNone(self.pool._sessions['a'][self.pool._interpreter_attributes.index('_events')])
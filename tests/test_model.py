@@ -1,3 +1,6 @@
+import copy
+import pickle
+import tracemalloc
 import unittest
 from sismic import io
 from sismic import model
@@ -31,6 +34,50 @@ class EventTests(unittest.TestCase):
             _ = event.data['d']
 
 
+class SlotsTests(unittest.TestCase):
+    def setUp(self):
+        event = model.Event('test', a=1)
+        transition = model.Transition('s1', 's2', event='test')
+        self.instances = [
+            event, model.InternalEvent('test'), transition,
+            model.MicroStep(event, transition, ['s2'], ['s1']), model.MacroStep(0, []),
+            model.BasicState('s'), model.CompoundState('s', 'i'), model.OrthogonalState('s'),
+            model.ShallowHistoryState('s'), model.DeepHistoryState('s'), model.FinalState('s'),
+        ]
+
+    def test_no_dict(self):
+        for instance in self.instances:
+            with self.subTest(klass=type(instance).__name__):
+                self.assertFalse(hasattr(instance, '__dict__'))
+
+    def test_copy_and_pickle(self):
+        for instance in self.instances:
+            with self.subTest(klass=type(instance).__name__):
+                self.assertEqual(copy.deepcopy(instance), instance)
+                self.assertEqual(pickle.loads(pickle.dumps(instance)), instance)
+        self.assertEqual(copy.copy(self.instances[0]).a, 1)
+
+    def test_memory(self):
+        # Same classes, but with a __dict__
+        klasses = [(model.Event, lambda k: k('test', a=1)),
+                   (model.MicroStep, lambda k: k(None, None, ['s2'], ['s1'])),
+                   (model.Transition, lambda k: k('s1', 's2', event='test')),
+                   (model.BasicState, lambda k: k('s'))]
+
+        def allocated(factory, n=1000):
+            tracemalloc.start()
+            instances = [factory() for _ in range(n)]
+            size = tracemalloc.get_traced_memory()[0] / n
+            tracemalloc.stop()
+            del instances
+            return size
+
+        for klass, factory in klasses:
+            with self.subTest(klass=klass.__name__):
+                with_dict = type(klass.__name__, (klass,), {})
+                self.assertLess(allocated(lambda: factory(klass)), allocated(lambda: factory(with_dict)))
+
+
 class TraversalTests(unittest.TestCase):
     def setUp(self):
         with open('tests/yaml/composite.yaml') as f:
@@ -74,6 +121,22 @@ class TraversalTests(unittest.TestCase):
         self.assertEqual(self.sc.least_common_ancestor('s1a', 's1b'), 's1')
         self.assertEqual(self.sc.least_common_ancestor('s1a', 's1b1'), 's1')
 
+    def test_hierarchy_update(self):
+        self.assertEqual(self.sc.depth_for('s2'), 2)
+        self.sc.move_state('s2', 's1b')
+        self.assertEqual(self.sc.depth_for('s2'), 4)
+        self.assertEqual(self.sc.ancestors_for('s2'), ['s1b', 's1', 'root'])
+        self.assertEqual(self.sc.least_common_ancestor('s2', 's1b1'), 's1b')
+
+        self.sc.add_state(model.BasicState('s3'), 's1b')
+        self.assertIn('s3', self.sc.descendants_for('s1'))
+
+        self.sc.rename_state('s1b', 'new s1b')
+        self.assertEqual(self.sc.ancestors_for('s3'), ['new s1b', 's1', 'root'])
+
+        self.sc.remove_state('new s1b')
+        self.assertEqual(self.sc.descendants_for('s1'), ['s1a'])
+
     def test_leaf(self):
         self.assertEqual(self.sc.leaf_for([]), [])
         self.assertEqual(self.sc.leaf_for(['s1']), ['s1'])
@@ -81,6 +144,17 @@ class TraversalTests(unittest.TestCase):
         self.assertEqual(self.sc.leaf_for(['s1', 's1b1', 's2']), ['s1b1', 's2'])
         self.assertEqual(self.sc.leaf_for(['s1', 's1b', 's1b1']), ['s1b1'])
 
+    def test_leaf_after_changes(self):
+        self.sc.rename_state('s1b1', 'new s1b1')
+        self.assertEqual(self.sc.leaf_for(['s1', 's1b', 'new s1b1']), ['new s1b1'])
+
+        self.sc.move_state('s2', 's1b')
+        self.assertEqual(self.sc.leaf_for(['s1', 's1b', 's2']), ['s2'])
+
+        self.sc.remove_state('s2')
+        self.sc.add_state(model.BasicState('s2'), 'root')
+        self.assertEqual(self.sc.leaf_for(['root', 's1b', 's2']), ['s1b', 's2'])
+
     def test_events(self):
         self.assertEqual(self.sc.events_for(), ['click', 'close', 'validate'])
         self.assertEqual(self.sc.events_for('s1b1'), ['validate'])
@@ -204,6 +278,95 @@ class TransitionsTests(unittest.TestCase):
         self.assertEqual(len(self.sc.transitions_with('unknown')), 0)
 
 
+class TransitionIndexTests(unittest.TestCase):
+    def setUp(self):
+        with open('tests/yaml/internal.yaml') as f:
+            self.sc = io.import_from_yaml(f)
+
+    def assertIndexConsistent(self):
+        for state in self.sc.states:
+            for event in [None] + self.sc.events_for():
+                expected = [t for t in self.sc.transitions_from(state) if t.event == event]
+                self.assertEqual(self.sc.transitions_for(state, event), expected)
+
+    def test_transitions_for(self):
+        self.assertEqual(self.sc.transitions_for('s1', 'next'), [])
+        self.assertEqual(len(self.sc.transitions_for('active', 'next')), 1)
+        self.assertIndexConsistent()
+
+        with self.assertRaises(exceptions.StatechartError):
+            self.sc.transitions_for('unknown')
+
+    def test_transitions_for_returns_a_copy(self):
+        self.sc.transitions_for('active', 'next').clear()
+        self.assertEqual(len(self.sc.transitions_for('active', 'next')), 1)
+
+    def test_add_and_remove(self):
+        transition = model.Transition('s1', 's2', event='click')
+        self.sc.add_transition(transition)
+        self.assertEqual(self.sc.transitions_for('s1', 'click'), [transition])
+        self.assertIndexConsistent()
+
+        self.sc.remove_transition(transition)
+        self.assertEqual(self.sc.transitions_for('s1', 'click'), [])
+        self.assertIndexConsistent()
+
+    def test_event_is_read_only(self):
+        transition = next(t for t in self.sc.transitions if t.event)
+        with self.assertRaises(AttributeError):
+            transition.event = 'other'
+        self.assertIndexConsistent()
+
+    def test_rotate(self):
+        tr = next(t for t in self.sc.transitions if t.source == 's1')
+        self.sc.rotate_transition(tr, new_source='active')
+        self.assertIn(tr, self.sc.transitions_for('active', tr.event))
+        self.assertNotIn(tr, self.sc.transitions_for('s1', tr.event))
+        self.assertIndexConsistent()
+
+        with self.assertRaises(exceptions.StatechartError):
+            self.sc.rotate_transition(tr, new_source='unknown')
+        self.assertIndexConsistent()
+
+    def test_rename_and_remove_state(self):
+        self.sc.rename_state('active', 'new active')
+        self.assertEqual(len(self.sc.transitions_for('new active', 'next')), 1)
+        self.assertIndexConsistent()
+
+        self.sc.remove_state('new active')
+        self.assertIndexConsistent()
+
+
+class TransitionIdsTests(unittest.TestCase):
+    def setUp(self):
+        with open('tests/yaml/internal.yaml') as f:
+            self.sc = io.import_from_yaml(f)
+
+    def ids(self, statechart):
+        return [transition._id for transition in statechart.transitions]
+
+    def test_ids(self):
+        ids = self.ids(self.sc)
+        self.assertEqual(sorted(ids), list(range(len(ids))))
+
+    def test_stable_ids(self):
+        ids = self.ids(self.sc)
+        removed = self.sc.transitions[0]
+        self.sc.remove_transition(removed)
+        self.assertIsNone(removed._id)
+
+        transition = model.Transition('s1', 's2', event='new')
+        self.sc.add_transition(transition)
+        self.assertEqual(self.ids(self.sc), ids[1:] + [len(ids)])
+
+        self.sc.rotate_transition(transition, new_target='s1')
+        self.assertEqual(self.ids(self.sc), ids[1:] + [len(ids)])
+
+    def test_copy_and_pickle(self):
+        for other in [copy.deepcopy(self.sc), pickle.loads(pickle.dumps(self.sc))]:
+            self.assertEqual(self.ids(other), self.ids(self.sc))
+
+
 class TransitionRotationTests(unittest.TestCase):
     def setUp(self):
         with open('tests/yaml/internal.yaml') as f:
@@ -1,5 +1,6 @@
 import unittest
 from sismic import io
+from sismic import exceptions
 from sismic.interpreter import Interpreter
 from sismic.model import MacroStep, MicroStep, Event, InternalEvent
 from sismic.stories import *
@@ -27,6 +28,21 @@ class StoryTests(unittest.TestCase):
         self.assertEqual(interpreter.time, 5)
         self.assertEqual(len(trace), 4)
 
+    def test_itertell(self):
+        story = Story([Event('goto s2'), Pause(5), Event('goto final')])
+        with open('tests/yaml/simple.yaml') as f:
+            sc = io.import_from_yaml(f)
+
+        interpreter = Interpreter(sc)
+        teller = story.itertell(interpreter)
+        self.assertIsInstance(next(teller), MacroStep)  # Initialization
+        self.assertEqual(interpreter.configuration, ['root', 's1'])
+        self.assertEqual(len(interpreter._events), 1)
+
+        self.assertEqual(len(list(teller)), 3)
+        self.assertTrue(interpreter.final)
+        self.assertEqual(interpreter.time, 5)
+
     def test_tell_by_step(self):
         story = Story([Event('goto s2'), Pause(5), Event('goto final')])
         with open('tests/yaml/simple.yaml') as f:
@@ -109,4 +125,122 @@ class StoryFromTraceTests(unittest.TestCase):
         ]
         self.assertListEqual(story_from_trace(trace), [
             Pause(2), Event('a'), Pause(3), Event('b'), Pause(4), Pause(5), Event('d')
-        ])
\ No newline at end of file
+        ])
+
+
+class TellStoriesTests(unittest.TestCase):
+    def setUp(self):
+        with open('docs/examples/elevator_contract.yaml') as f:
+            self.sc = io.import_from_yaml(f)
+        items = [Event('floorSelected', floor=floor) for floor in range(5)] + [Pause(5), Pause(10)]
+        self.stories = list(random_stories_generator(items, length=6, number=20))
+
+    def test_same_results(self):
+        results = list(tell_stories(self.sc, self.stories, traces=True, max_workers=2, chunksize=3))
+        self.assertEqual(len(results), len(self.stories))
+        for story, result in zip(self.stories, results):
+            interpreter = Interpreter(self.sc)
+            trace = story.tell(interpreter)
+            self.assertEqual(result.configuration, interpreter.configuration)
+            self.assertEqual(result.trace, trace)
+            self.assertIsNone(result.violation)
+
+    def test_no_trace(self):
+        results = list(tell_stories(self.sc, self.stories[:2], max_workers=1))
+        self.assertEqual([result.trace for result in results], [None, None])
+
+    def test_contract_violation(self):
+        self.sc.state_for('movingUp').preconditions[0] = 'current > destination'
+        stories = [Story([Event('floorSelected', floor=4)]), Story([Event('floorSelected', floor=0)])]
+        first, second = tell_stories(self.sc, stories, max_workers=1)
+        self.assertIn('PreconditionError', first.violation)
+        self.assertIn('movingUp', first.violation)
+        self.assertIsNone(second.violation)
+
+        results = list(tell_stories(self.sc, stories, ignore_contract=True, max_workers=1))
+        self.assertEqual([result.violation for result in results], [None, None])
+
+
+class FuzzTests(unittest.TestCase):
+    def setUp(self):
+        with open('docs/examples/elevator_contract.yaml') as f:
+            self.sc = io.import_from_yaml(f)
+        self.items = [Event('floorSelected', floor=floor) for floor in range(5)] + [Pause(5)]
+
+    def test_seeded_generator(self):
+        first = list(random_stories_generator(self.items, 5, 3, seed='a'))
+        self.assertEqual(first, list(random_stories_generator(self.items, 5, 3, seed='a')))
+        self.assertNotEqual(first, list(random_stories_generator(self.items, 5, 3, seed='b')))
+
+    def test_no_failure(self):
+        report = fuzz(self.sc, self.items, length=4, number=50, max_workers=2, chunksize=8)
+        self.assertEqual(report.stories, 50)
+        self.assertEqual(report.failures, [])
+        self.assertGreater(report.stories_per_second, 0)
+
+    def test_contract_failures(self):
+        self.sc.state_for('movingUp').preconditions[0] = 'current > destination'
+        report = fuzz(self.sc, self.items, length=4, number=50, max_workers=2, chunksize=8)
+        self.assertEqual(len(report.failures), 1)
+        failure = report.failures[0]
+        self.assertEqual(failure.signature, ('PreconditionError', 'BasicState(movingUp)', 'current > destination'))
+        self.assertGreater(failure.count, 1)
+
+        # Reproducible
+        story = next(random_stories_generator(self.items, 4, 1, failure.seed))
+        self.assertEqual(story, failure.story)
+        with self.assertRaises(exceptions.PreconditionError):
+            story.tell(Interpreter(self.sc))
+
+    def test_execution_failures(self):
+        with open('tests/yaml/nondeterministic.yaml') as f:
+            sc = io.import_from_yaml(f)
+        report = fuzz(sc, [Event('e')], number=4, max_workers=1)
+        self.assertEqual(report.stories, 4)
+        self.assertEqual([failure.signature[0] for failure in report.failures], ['NonDeterminismError'])
+        self.assertEqual(report.failures[0].count, 4)
+
+    def test_duration(self):
+        report = fuzz(self.sc, self.items, length=2, duration=0.2, max_workers=1, chunksize=4)
+        self.assertGreater(report.stories, 0)
+        self.assertEqual(report.stories % 4, 0)
+
+
+class CoverageGuidedTests(unittest.TestCase):
+    def setUp(self):
+        with open('docs/examples/elevator_contract.yaml') as f:
+            self.sc = io.import_from_yaml(f)
+        self.items = [Event('floorSelected', floor=floor) for floor in range(5)] + [Pause(5), Pause(10)]
+
+    def test_complete_coverage(self):
+        generator = CoverageGuidedGenerator(self.sc, self.items, length=10, seed=1)
+        corpus = list(generator)
+        self.assertTrue(generator.complete)
+        self.assertEqual(corpus, generator.corpus)
+        self.assertEqual(generator.entered_states, sorted(self.sc.states))
+        self.assertEqual(len(generator.processed_transitions), len(self.sc.transitions))
+
+        # The corpus alone covers everything
+        other = CoverageGuidedGenerator(self.sc, self.items)
+        for story in corpus:
+            self.assertTrue(other.execute(story))
+        self.assertTrue(other.complete)
+
+    def test_reproducible(self):
+        first = list(CoverageGuidedGenerator(self.sc, self.items, length=10, seed='a'))
+        self.assertEqual(first, list(CoverageGuidedGenerator(self.sc, self.items, length=10, seed='a')))
+
+    def test_patience(self):
+        # The elevator never moves if the ground floor is the only one to be selected
+        generator = CoverageGuidedGenerator(self.sc, self.items[:1] + self.items[5:], patience=20, seed=1)
+        self.assertEqual(list(generator), generator.corpus)
+        self.assertFalse(generator.complete)
+        self.assertNotIn('moving', generator.entered_states)
+        self.assertGreaterEqual(generator.executions, 20)
+
+    def test_contract_violation(self):
+        self.sc.state_for('movingUp').preconditions[0] = 'current > destination'
+        generator = CoverageGuidedGenerator(self.sc, self.items, patience=50, seed=1)
+        list(generator)
+        self.assertIn('doorsClosed', generator.entered_states)
+        self.assertNotIn('movingUp', generator.entered_states)
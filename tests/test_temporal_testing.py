@@ -3,6 +3,9 @@ from sismic.temporal_testing import *
 from sismic.interpreter import Interpreter
 from sismic.model import Event, Statechart, CompoundState, BasicState, Transition
 from sismic.testing import teststory_from_trace
+from sismic.stories import Story, Pause
+from sismic.exceptions import ConflictingTransitionsError, NonDeterminismError
+from sismic import io
 
 
 class UniqueIdProviderTest(unittest.TestCase):
@@ -125,7 +128,6 @@ class PropertiesTests(unittest.TestCase):
             ('event', TransitionProcess(source='foo')),
             ('event', TransitionProcess(target='foo')),
             ('event', TransitionProcess(event='')),
-
         ]:
             with self.subTest(condition=condition):
                 self.generic_test(self.sequential_statechart, [Event(event)], condition, False, False)
@@ -192,6 +194,23 @@ class PropertiesTests(unittest.TestCase):
                           True,
                           False)
 
+    def test_consume_any_event_but_forbidden_event(self):
+        # Regression: the generated guard ignored the forbidden events, as they were not formatted into it
+        for condition in [ConsumeAnyEventBut('foo'), ConsumeAnyEventBut('bar', 'foo')]:
+            with self.subTest(condition=condition):
+                self.generic_test(self.sequential_statechart, [Event('foo')], condition, False, False)
+
+    def test_transition_process_wrong_eventless(self):
+        # Regression: the generated guard accessed the name of the event of eventless transitions
+        self.sequential_statechart.remove_transition(Transition(source='a_state', target='b_state', event='event'))
+        self.sequential_statechart.add_transition(Transition(source='a_state', target='b_state'))
+
+        self.generic_test(self.sequential_statechart,
+                          [Event('event')],
+                          TransitionProcess(event='event'),
+                          False,
+                          False)
+
     def test_active_state_right(self):
         self.sequential_statechart.remove_transition(Transition(source='a_state', target='b_state', event='event'))
 
@@ -471,6 +490,13 @@ class TemporalTests(unittest.TestCase):
 
         self.assertEqual(len(interpreter.configuration) == 0, accept_after)
 
+        monitor = expression.generate_monitor()
+        for event in story:
+            monitor.queue(event)
+        monitor.execute()
+
+        self.assertEqual(monitor.final, accept_after)
+
     def test_temporal_success(self):
         for condition in [
             FirstTime(True, TrueCondition(), TrueCondition()),
@@ -554,4 +580,87 @@ class TemporalTests(unittest.TestCase):
             AtLeastOnce(False, UndeterminedCondition(), UndeterminedCondition())
         ]:
             with self.subTest(condition=condition):
-                self.generic_temporal_test(condition, self.story, False)
\ No newline at end of file
+                self.generic_temporal_test(condition, self.story, False)
+
+
+class MonitorTests(unittest.TestCase):
+    def setUp(self):
+        with open('tests/yaml/simple.yaml') as f:
+            self.tested = Interpreter(io.import_from_yaml(f))
+        trace = Story([Pause(2), Event('goto s2'), Pause(3)]).tell(self.tested)
+        self.story = teststory_from_trace(trace)
+
+    def verdicts(self, expression: TemporalExpression, initial_context: dict=None):
+        tester = Interpreter(expression.generate_statechart(), initial_context=initial_context)
+        self.story.tell(tester)
+        monitor = expression.generate_monitor(initial_context)
+        self.story.tell(monitor)
+        return tester.final, monitor.final
+
+    def test_same_verdicts(self):
+        for expression, expected in [
+            (FirstTime(True, EnterState('s1'), ExitState('s1')), True),
+            (FirstTime(True, EnterState('s1'), EnterState('s1')), False),
+            (FirstTime(False, EnterState('s1'), EnterState('s1')), True),
+            (EveryTime(True, ConsumeAnyEvent(), TransitionProcess(target='s3', event='')), True),
+            (EveryTime(True, EnterAnyState(), ExitAnyState()), False),
+            (LastTime(True, EnterAnyState(), Then(ExitState('s2'), EnterState('s3'))), False),
+            (AtLeastOnce(True, EnterState('s2'), EnterState('s3')), True),
+            (AtLeastOnce(True, EnterState('s3'), EnterState('s2')), False),
+            (FirstTime(True, ExecutionStart(), During(EnterState('s2'), 0, 1)), True),
+            (FirstTime(True, ExecutionStart(), During(EnterState('s2'), 1, 5)), False),
+            (FirstTime(True, ExecutionStart(), DelayedCondition(ConsumeEvent('goto s2'), 0)), True),
+            (FirstTime(True, ExecutionStart(), DelayedCondition(ConsumeEvent('goto s2'), 1)), False),
+            (FirstTime(True, EnterState('s2'), ActiveState('s2')), True),
+            (FirstTime(True, EnterState('s2'), InactiveState('s2')), False),
+            (FirstTime(True, StartStep(), Xor(EnterState('s1'), EndStep())), False),
+            (FirstTime(True, StartStep(), Or(EnterState('s3'), And(EnterState('s2'), EndStep()))), True),
+            (FirstTime(True, StartStep(), IfElse(EnterState('s2'), EndStep(), FalseCondition())), True),
+        ]:
+            with self.subTest(expression=expression):
+                self.assertEqual(self.verdicts(expression), (expected, expected))
+
+    def test_check_guard(self):
+        expression = FirstTime(True, EnterState('s2'), CheckGuard('x > 1 and time == 2'))
+        self.assertEqual(self.verdicts(expression, {'x': 2}), (True, True))
+        self.assertEqual(self.verdicts(expression, {'x': 1}), (False, False))
+
+    def test_simultaneous_before(self):
+        # Both conditions are verified at the same depth: a tester statechart is not deterministic
+        monitor = FirstTime(True, ExecutionStart(), Before(EnterState('s2'), EnterAnyState())).generate_monitor()
+        self.story.tell(monitor)
+        self.assertFalse(monitor.final)
+
+        # Otherwise, the deepest condition is considered first
+        expression = FirstTime(True, ExecutionStart(), Before(Not(Not(EnterState('s2'))), EnterAnyState()))
+        self.assertEqual(self.verdicts(expression), (False, False))
+        expression = FirstTime(True, ExecutionStart(), Before(EnterState('s2'), Not(Not(EnterAnyState()))))
+        self.assertEqual(self.verdicts(expression), (True, True))
+
+    def test_errors(self):
+        for expression, error in [
+            (FirstTime(True, ExecutionStart(), ExecutionStop()), NonDeterminismError),
+            (AtLeastOnce(True, ExecutionStop(), TrueCondition()), ConflictingTransitionsError),
+            (LastTime(True, Or(ExecutionStop(), EnterState('s3')), UndeterminedCondition()),
+             ConflictingTransitionsError),
+            (LastTime(True, EnterAnyState(), ExecutionStop()), NonDeterminismError),
+            (FirstTime(True, Or(ExecutionStart(), ActiveState('s2')), EnterState('s2')), ConflictingTransitionsError),
+        ]:
+            with self.subTest(expression=expression):
+                with self.assertRaises(error):
+                    self.story.tell(Interpreter(expression.generate_statechart()))
+                with self.assertRaises(error):
+                    self.story.tell(expression.generate_monitor())
+
+    def test_unsupported_condition(self):
+        class CustomCondition(Condition):
+            pass
+
+        expression = FirstTime(True, CustomCondition(), TrueCondition())
+        expression.generate_statechart()
+        with self.assertRaises(NotImplementedError):
+            expression.generate_monitor()
+
+    def test_repr(self):
+        expression = FirstTime(True, TrueCondition(), TrueCondition())
+        self.assertEqual(repr(expression.generate_monitor()), 'Monitor({})'.format(expression))
@@ -4,6 +4,7 @@ from sismic.interpreter import Interpreter
 from sismic.stories import Story, Pause, Event
 from sismic.testing import teststory_from_trace
 from sismic.testing.tester import ExecutionWatcher
+from sismic.temporal_testing import FirstTime, EveryTime, EnterState, ExitState, CheckGuard
 
 
 class StoryFromTraceTests(unittest.TestCase):
@@ -148,4 +149,42 @@ class WatchElevatorTests(unittest.TestCase):
         # Stop watching. The tester must be in a final state
         watcher.stop()
 
-        self.assertTrue(tester.final)
\ No newline at end of file
+        self.assertTrue(tester.final)
+
+
+class MonitorElevatorTests(unittest.TestCase):
+    def setUp(self):
+        with open('docs/examples/elevator.yaml') as f:
+            sc = io.import_from_yaml(f)
+        self.tested = Interpreter(sc)
+        self.watcher = ExecutionWatcher(self.tested)
+
+    def test_moves_after_doors_closed(self):
+        expression = EveryTime(True, EnterState('doorsClosed'), EnterState('movingUp', 'movingDown'))
+
+        for max_steps, expected in [(-1, True), (3, False)]:
+            with self.subTest(max_steps=max_steps):
+                self.setUp()
+                monitor = self.watcher.monitor_with(expression)
+                tester = self.watcher.watch_with(expression.generate_statechart())
+                self.watcher.start()
+
+                self.tested.queue(Event('floorSelected', floor=4)).execute(max_steps=max_steps)
+                self.watcher.stop()
+                self.assertEqual(monitor.final, expected)
+                self.assertEqual(tester.final, expected)
+
+    def test_context_is_exposed(self):
+        expression = FirstTime(True, ExitState('doorsOpen'), CheckGuard('context.destination == 4'))
+
+        for floor, expected in [(4, True), (7, False)]:
+            with self.subTest(floor=floor):
+                self.setUp()
+                monitor = self.watcher.monitor_with(expression)
+                tester = self.watcher.watch_with(expression.generate_statechart())
+                self.watcher.start()
+
+                self.tested.queue(Event('floorSelected', floor=floor)).execute()
+                self.watcher.stop()
+                self.assertEqual(monitor.final, expected)
+                self.assertEqual(tester.final, expected)